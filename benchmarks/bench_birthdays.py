@@ -0,0 +1,46 @@
+"""upcoming_birthdays: per-contact next-birthday scan vs day-of-year index.
+
+    python benchmarks/bench_birthdays.py --size 500000
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from common import synthetic_contacts, timed
+from contactbook import ContactStorage, next_birthday
+
+
+def scan(storage, today, days):
+    end_date = today + timedelta(days=days)
+    return {
+        id: contact for id, contact in storage.data.items()
+        if today <= next_birthday(contact.dob, today).date() < end_date
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    storage = ContactStorage(dict(synthetic_contacts(args.size)))
+    print(f"built {args.size} contacts with indexes in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    queries = [(date(2025, 12, 28), 7), (date(2025, 6, 1), 1),
+               (date(2024, 2, 25), 10), (date(2025, 3, 1), 30)]
+    for today, days in queries:
+        assert set(scan(storage, today, days)) == set(
+            storage.birthdays(today, days)
+        )
+
+    scan_time = timed(lambda q: scan(storage, *q), queries)
+    index_time = timed(lambda q: storage.birthdays(*q), queries * 50)
+    print(f"scan:  {scan_time * 1e3:10.3f} ms/query")
+    print(f"index: {index_time * 1e3:10.3f} ms/query")
+    print(f"speedup: {scan_time / index_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
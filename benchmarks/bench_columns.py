@@ -0,0 +1,86 @@
+"""Whole-book queries: row loop vs columnar mirror (NumPy and plain arrays).
+
+    python benchmarks/bench_columns.py --size 1000000
+"""
+import argparse
+import time
+from collections import Counter
+from datetime import date
+
+from common import synthetic_contacts, timed
+import indexes
+from contactbook import ContactStorage
+
+
+def loop_born_between(storage, first, last):
+    return [
+        id for id, contact in storage.data.items()
+        if first <= contact.dob.year <= last
+    ]
+
+
+def loop_age_histogram(storage, today, width):
+    key = (today.month, today.day)
+    counts = Counter(
+        (today.year - c.dob.year - ((c.dob.month, c.dob.day) > key)) // width
+        for c in storage.data.values()
+    )
+    return [(b * width, counts[b]) for b in sorted(counts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    storage = ContactStorage(dict(synthetic_contacts(args.size)), columns=True)
+    print(f"built {args.size} contacts with columns in "
+          f"{time.perf_counter() - start:.2f}s")
+    plain = ContactStorage(storage.data)
+    today = date(2025, 3, 1)
+
+    vectorized = indexes._numpy() is not None
+    modes = [("numpy", indexes._numpy)] if vectorized else []
+    modes.append(("arrays", lambda: None))
+
+    assert sorted(loop_born_between(storage, 1980, 1989)) == list(
+        storage.born_between(1980, 1989)
+    )
+    assert loop_age_histogram(storage, today, 10) == storage.age_histogram(
+        today, 10
+    )
+
+    rows = [
+        ("upcoming birthdays (30d)", "index",
+         timed(lambda q: plain.birthdays(*q), [(today, 30)] * 5)),
+        ("born 1980-1989", "row loop",
+         timed(lambda q: loop_born_between(storage, *q), [(1980, 1989)])),
+        ("age histogram", "row loop",
+         timed(lambda q: loop_age_histogram(storage, *q), [(today, 10)])),
+    ]
+    numpy = indexes._numpy
+    for mode, source in modes:
+        indexes._numpy = source
+        rows += [
+            ("upcoming birthdays (30d)", mode,
+             timed(lambda q: storage.birthdays(*q), [(today, 30)] * 5)),
+            ("born 1980-1989", mode,
+             timed(lambda q: storage.born_between(*q), [(1980, 1989)] * 5)),
+            ("age histogram", mode,
+             timed(lambda q: storage.age_histogram(*q), [(today, 10)] * 5)),
+        ]
+    indexes._numpy = numpy
+
+    for query, mode, elapsed in sorted(rows, key=lambda row: row[0]):
+        print(f"{query:26} {mode:9} {elapsed * 1e3:10.2f} ms/query")
+
+    contact = storage[1]
+    columns = storage.columns
+    update = timed(lambda id: (columns.remove(id), columns.add(id, contact)),
+                   range(1, 100_001))
+    print(f"columns update: {update * 1e6:.2f} us/contact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Load test of the HTTP/JSON API: requests per second and latency.
+
+Starts the API in-process on a free port over a synthetic book and runs
+keep-alive client threads against a read-mostly request mix.
+
+    python benchmarks/bench_http_api.py --size 100000 --clients 8
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+
+from common import synthetic_contacts
+import config
+import contactbook
+from commands import BotCommands
+from contactbook import ContactStorage
+from http_api import ApiServer
+
+
+def requests_mix(rnd, size, writes):
+    names = [f"Name{i}" for i in range(10)]
+    while True:
+        if rnd.random() < writes:
+            yield "PATCH", f"/contacts/{rnd.randint(1, size)}", {
+                "addr": f"Street {rnd.randint(1, 999)}"
+            }
+            continue
+        yield rnd.choice([
+            ("GET", f"/contacts/{rnd.randint(1, size)}", None),
+            ("GET", f"/contacts?name={rnd.choice(names)}", None),
+            ("GET", f"/contacts/search?field=phone&value="
+                    f"{rnd.randrange(10**6):06d}", None),
+            ("GET", "/contacts/birthdays?days=3", None),
+        ])
+
+
+def client(address, seconds, size, writes, seed, latencies, errors):
+    rnd = random.Random(seed)
+    conn = HTTPConnection(*address, timeout=30)
+    deadline = time.perf_counter() + seconds
+    for method, path, body in requests_mix(rnd, size, writes):
+        start = time.perf_counter()
+        if start > deadline:
+            break
+        data = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, data)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 500:
+            errors.append(response.status)
+    conn.close()
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writes", type=float, default=0.05,
+                        help="share of write requests (0-1)")
+    args = parser.parse_args()
+
+    # keep the benchmark's writes away from storage/
+    tmp = Path(tempfile.mkdtemp())
+    contactbook.PHONEBOOK_STORAGE = str(tmp / "phonebook.pkl")
+    contactbook.PHONEBOOK_JOURNAL = str(tmp / "phonebook.journal")
+    config.NOTES_STORAGE = str(tmp / "notes.pkl")
+    commands = BotCommands()
+    commands.contactbook.storage = ContactStorage(
+        dict(synthetic_contacts(args.size))
+    )
+    server = ApiServer(("127.0.0.1", 0), commands, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=client, args=(
+            server.server_address[:2], args.seconds, args.size, args.writes,
+            seed, latencies, errors,
+        ))
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    commands.flush()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients "
+          f"in {elapsed:.2f}s, {len(errors)} errors")
+    print(f"{len(latencies) / elapsed:.0f} req/s")
+    for p in (50, 95, 99):
+        print(f"p{p}: {percentile(latencies, p) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""import_contacts validation throughput per number of worker processes.
+
+With --book, also times whole imports into an empty in-memory book at
+a quarter, half and all of --size rows; rows/s stays flat when the
+import scales linearly.
+
+    python benchmarks/bench_import.py --size 1000000 --workers 1 2 4 8
+    python benchmarks/bench_import.py --size 400000 --workers 1 --book
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import synthetic_contacts
+import contactbook
+from config import DOB_FORMAT
+from contactbook import Contactbook
+from importers import batches, checked_batches, read_csv
+
+
+def write_csv(path, size):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("name,phone,email,dob,addr\n")
+        for id, contact in synthetic_contacts(size):
+            # every 20th row has a bad email and goes to the rejects
+            email = "broken" if id % 20 == 0 else contact.email
+            f.write(
+                f"{contact.name},{contact.phone[4:]},{email},"
+                f"{contact.dob.strftime(DOB_FORMAT)},{contact.addr}\n"
+            )
+
+
+def time_book_imports(tmp, size):
+    contactbook.PHONEBOOK_STORAGE = os.path.join(tmp, "phonebook.pkl")
+    contactbook.PHONEBOOK_JOURNAL = os.path.join(tmp, "phonebook.journal")
+    contactbook.PHONEBOOK_BACKEND = "pickle"
+    for rows in (size // 4, size // 2, size):
+        for name in ("phonebook.pkl", "phonebook.journal"):
+            if os.path.exists(os.path.join(tmp, name)):
+                os.remove(os.path.join(tmp, name))
+        path = os.path.join(tmp, f"book{rows}.csv")
+        write_csv(path, rows)
+        book = Contactbook()
+        start = time.perf_counter()
+        book.import_contacts(path)
+        elapsed = time.perf_counter() - start
+        print(f"book import {rows:10,} rows {elapsed:8.2f} s"
+              f" {rows / elapsed:12,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    parser.add_argument("--book", action="store_true",
+                        help="also time whole imports into a contact book")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contacts.csv")
+        write_csv(path, args.size)
+        print(f"{args.size:,} rows, batches of {args.batch}, "
+              f"{os.cpu_count()} CPUs")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            accepted = 0
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = batches(read_csv(f), args.batch)
+                for ok, _ in checked_batches(rows, workers):
+                    accepted += len(ok)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:3} workers {args.size / elapsed:12,.0f} rows/s"
+                  f"  {baseline / elapsed:5.2f}x  ({accepted:,} accepted)")
+        if args.book:
+            time_book_imports(tmp, args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Memory and pickle size per contact: the old dict-based Contact vs slots.
+
+    python benchmarks/bench_memory.py --size 1000000
+"""
+import argparse
+import gc
+import pickle
+import tracemalloc
+from datetime import datetime
+
+from common import synthetic_contacts
+from contactbook import Contact
+
+
+class LegacyContact:
+    """The Contact layout before slots: __dict__ holding a `_data` dict."""
+
+    def __init__(self, fields):
+        self._data = dict(fields)
+        # every unpickled contact has its own datetime
+        self._data["dob"] = datetime.fromordinal(fields["dob"].toordinal())
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    contacts = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return contacts, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # the same field values for both layouts, so only records differ
+    fields = [c.fields() for _, c in synthetic_contacts(args.size)]
+
+    results = []
+    for label, build in (
+        ("dict + datetime", lambda: {
+            i: LegacyContact(f) for i, f in enumerate(fields, 1)
+        }),
+        ("slots + ordinal", lambda: {
+            i: Contact._restore(f) for i, f in enumerate(fields, 1)
+        }),
+    ):
+        contacts, used = measure(build)
+        pickled = len(pickle.dumps(contacts, pickle.HIGHEST_PROTOCOL))
+        results.append((label, used, pickled))
+        del contacts
+
+    print(f"{args.size:,} contacts (field strings are shared, "
+          "so memory is the records themselves)")
+    for label, used, pickled in results:
+        print(f"{label:16} {used / args.size:8.1f} B/contact in memory  "
+              f"{pickled / args.size:8.1f} B/contact pickled")
+    (_, old_used, old_pickled), (_, new_used, new_pickled) = results
+    print(f"memory: {old_used / new_used:.1f}x smaller, "
+          f"pickle: {old_pickled / new_pickled:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
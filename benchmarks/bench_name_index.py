@@ -0,0 +1,44 @@
+"""Name lookup: full scan of the book vs the maintained name index.
+
+    python benchmarks/bench_name_index.py --size 500000
+"""
+import argparse
+import random
+import time
+
+from common import synthetic_contacts, timed
+from contactbook import ContactStorage
+
+
+def scan(storage, name):
+    return {
+        id: contact for id, contact in storage.data.items()
+        if contact.name == name
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    storage = ContactStorage(dict(synthetic_contacts(args.size)))
+    print(f"built {args.size} contacts with index in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    names = [contact.name for contact in storage.data.values()]
+    queries = random.Random(2).sample(names, min(args.queries, len(names)))
+    for query in queries:
+        assert scan(storage, query) == storage.find_by_name(query)
+
+    scan_time = timed(lambda q: scan(storage, q), queries[:20])
+    index_time = timed(storage.find_by_name, queries)
+    print(f"scan:  {scan_time * 1e3:10.3f} ms/lookup")
+    print(f"index: {index_time * 1e3:10.3f} ms/lookup")
+    print(f"speedup: {scan_time / index_time:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""search_contact: lower-case `in` scan vs per-field trigram index.
+
+    python benchmarks/bench_search.py --size 1000000 --field email
+"""
+import argparse
+import random
+import time
+
+from common import synthetic_contacts, timed
+from contactbook import ContactStorage
+
+
+def scan(storage, key, value):
+    value = value.lower()
+    return {
+        id: contact for id, contact in storage.data.items()
+        if value in str(getattr(contact, key)).lower()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--field", default="email")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    storage = ContactStorage(dict(synthetic_contacts(args.size)))
+    print(f"built {args.size} contacts in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    rnd = random.Random(3)
+    selective = []
+    for _ in range(args.queries):
+        contact = storage.data[rnd.randint(1, args.size)]
+        value = str(getattr(contact, args.field))
+        # substrings of the distinctive part, e.g. the email local part
+        value = value.split("@")[0]
+        start_at = rnd.randrange(max(1, len(value) - 4))
+        selective.append(value[start_at:start_at + rnd.randint(4, 6)])
+    # a substring shared by most of the book gives the index nothing
+    # to prune, the result set is as large as the scan's
+    common = ["example", "street"]
+
+    start = time.perf_counter()
+    storage.search(args.field, selective[0])
+    print(f"trigram index for '{args.field}' built in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    for query in selective[:5] + common:
+        assert set(scan(storage, args.field, query)) == set(
+            storage.search(args.field, query)
+        )
+
+    for label, queries in [("selective", selective), ("common", common)]:
+        scan_time = timed(lambda q: scan(storage, args.field, q),
+                          queries[:5])
+        index_time = timed(lambda q: storage.search(args.field, q), queries)
+        print(f"{label} queries:")
+        print(f"  scan:  {scan_time * 1e3:10.3f} ms/query")
+        print(f"  index: {index_time * 1e3:10.3f} ms/query")
+        print(f"  speedup: {scan_time / index_time:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
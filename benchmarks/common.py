@@ -0,0 +1,31 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from contactbook import Contact  # noqa: E402
+
+
+def synthetic_contacts(size, seed=1):
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for contact_id in range(1, size + 1):
+        name = "".join(rnd.choice(letters) for _ in range(8)).title()
+        yield contact_id, Contact._restore({
+            "name": name,
+            "phone": f"+380{rnd.randrange(10**9):09d}",
+            "email": f"{name.lower()}@example.com",
+            "dob": datetime(rnd.randint(1950, 2010), rnd.randint(1, 12),
+                            rnd.randint(1, 28)),
+            "addr": f"Street {rnd.randint(1, 999)}",
+        })
+
+
+def timed(func, queries):
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries)
@@ -0,0 +1,67 @@
+import argparse
+import json
+import socket
+import config
+
+
+class BotClient:
+    """Blocking client for the cli-bot server (see server.BotServer)."""
+
+    def __init__(self, path=None, host=None, port=None):
+        if port is not None:
+            self.sock = socket.create_connection(
+                (host or config.SERVER_HOST, port)
+            )
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path or config.SERVER_SOCKET)
+        self.stream = self.sock.makefile("rwb")
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def send(self, line):
+        """Send a command line or an answer, return the server reply."""
+        self.stream.write(
+            json.dumps({"input": line}, ensure_ascii=False).encode() + b"\n"
+        )
+        self.stream.flush()
+        reply = self.stream.readline()
+        if not reply:
+            raise ConnectionError("Server closed the connection")
+        return json.loads(reply)
+
+    def run(self, line, ask=input):
+        """Run one command, answering its prompts with ask()."""
+        reply = self.send(line)
+        while "prompt" in reply:
+            reply = self.send(ask(reply["prompt"]))
+        return reply
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli-bot-client")
+    parser.add_argument("--socket", metavar="PATH")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args(argv)
+
+    client = BotClient(args.socket, args.host, args.port)
+    try:
+        done = False
+        while not done:
+            console_line = ""
+            while console_line == "":
+                console_line = input(">")
+            reply = client.run(console_line)
+            print(reply["output"])
+            done = reply["done"]
+    except (EOFError, KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
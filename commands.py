@@ -1,61 +1,120 @@
+import json
+import time
+from contextlib import ExitStack, contextmanager
+from functools import cached_property, partial, wraps
+import config
 from contactbook import Contactbook, Contact
+from metrics import Metrics
 from notes import Notes
-from Levenshtein import distance
-from colorama import Fore, Style
+from registry import CommandSet, read_only
+from results import parse_paging
 
 
-class BotCommands():
+PAGING_ERROR = "Invalid paging options, use --limit N and --offset N"
+
+
+class BotCommands(CommandSet):
 
     done = False
+    aliases = {
+        "quit": "exit",
+    }
+
+    STORES = ("contactbook", "notes")
+    _batch = None
+
+    def __init__(
+        self, contactbook=None, notes=None, shared=None, read_only=False
+    ):
+        # stores are loaded on first use; server sessions take them from
+        # the `shared` BotCommands, so they load once for all sessions
+        self.shared = shared
+        self.read_only = read_only
+        self.load_times = {}
+        if shared is not None:
+            self.metrics = shared.metrics
+        else:
+            self.metrics = Metrics() if config.METRICS_ENABLED else None
+        if contactbook is not None:
+            self.contactbook = self._observe("contactbook", contactbook)
+        if notes is not None:
+            self.notes = self._observe("notes", notes)
+
+    @cached_property
+    def contactbook(self):
+        if self.shared is not None:
+            # own last_id, so del_last acts on what this session showed
+            return self.shared.contactbook.session()
+        return self._load("contactbook", Contactbook)
+
+    @cached_property
+    def notes(self):
+        if self.shared is not None:
+            return self.shared.notes
+        return self._load("notes", Notes)
+
+    def _load(self, name, store_cls):
+        start = time.perf_counter()
+        store = store_cls(read_only=self.read_only)
+        self.load_times[name] = time.perf_counter() - start
+        if self._batch is not None:
+            self._batch.enter_context(store.deferred_writes())
+        return self._observe(name, store)
+
+    def _observe(self, name, store):
+        writer = getattr(store, "writer", None)
+        if self.metrics is not None and writer is not None:
+            writer.observe = partial(self.metrics.record_save, name)
+        return store
+
+    def loaded_stores(self):
+        return [
+            self.__dict__[name] for name in self.STORES
+            if name in self.__dict__
+        ]
 
-    def __init__(self):
-        self.notes = Notes()
-        self.contactbook = Contactbook()
+    def flush(self):
+        for store in self.loaded_stores():
+            store.flush()
+
+    @contextmanager
+    def batch(self):
+        # every store write inside the block is done once, on exit;
+        # stores loaded inside the block are deferred as they load
+        with ExitStack() as stack:
+            for store in self.loaded_stores():
+                stack.enter_context(store.deferred_writes())
+            self._batch = stack
+            try:
+                yield self
+            finally:
+                self._batch = None
 
     def input_validator(func):
-        def inner(self, params):
-            command = func.__name__.removesuffix('_handler')
-            command_params = []
-            command_helper = self.get_helper(command)
-            if command_helper is not None:
-                command_params = command_helper()
-                params_validation = {}
-                help_string = ""
-                i = 0
-                for param_name, value in command_params.items():
-                    if param_name != 'help':
-                        if callable(value):
-                            params_validation[param_name] = (
-                                value(params[i]) if len(params) > i
-                                else False
-                            )
-                        else:
-                            params_validation[param_name] = (
-                                True if len(params) > i else False
-                            )
-                        i += 1
-                    else:
-                        help_string = (
-                            f"{Fore.RED}{command}{Style.RESET_ALL} "
-                            f"command: {value}"
-                        )
+        command = func.__name__.removesuffix('_handler')
 
+        @wraps(func)
+        def inner(self, params):
+            spec = self.registry.get(command)
+            if spec is not None and spec.params is not None:
                 validation_errors = [
-                    field for field, value in params_validation.items()
-                    if not value
+                    param for i, (param, validator) in enumerate(spec.params)
+                    if not (
+                        len(params) > i
+                        and (validator is None or validator(params[i]))
+                    )
                 ]
                 if validation_errors:
-                    error_in_fields = (
-                        "Invalid fields: " + " ".join(validation_errors)
-                    )
-                    usage = (
-                        f"{help_string}\nCommand usage: {command} <"
-                        + "> <".join(params_validation.keys())
-                        + f">\n{error_in_fields}"
+                    if self.metrics is not None:
+                        self.metrics.record_error(command)
+                    return (
+                        f"{spec.usage}\nInvalid fields: "
+                        + " ".join(validation_errors)
                     )
-                    return usage
             else:
                 if len(params) > 1:
+                    if self.metrics is not None:
+                        self.metrics.record_error(command)
                     return f"Usage: {command}"
             return func(self, params)
         return inner
@@ -70,6 +129,7 @@ class BotCommands():
             'name': None,
         }
 
+    @read_only
     @input_validator
     def upcoming_birthdays_handler(self, params):
         try:
@@ -84,6 +144,48 @@ class BotCommands():
             'days': None,
         }
 
+    @read_only
+    @input_validator
+    def born_between_handler(self, params):
+        try:
+            first, last = int(params[0]), int(params[1])
+        except ValueError:
+            return "Invalid year format"
+        return self.contactbook.born_between(first, last)
+
+    def born_between_helper(self):
+        return {
+            'help': "contacts born in a range of years",
+            'from_year': None,
+            'to_year': None,
+        }
+
+    @read_only
+    @input_validator
+    def age_stats_handler(self, params):
+        try:
+            width = int(params[0]) if params else 10
+        except ValueError:
+            width = 0
+        if width <= 0:
+            return "Invalid bracket width"
+        return self.contactbook.age_histogram(width)
+
+    def age_stats_helper(self):
+        return {
+            'help': "number of contacts by age (age_stats [bracket_years])",
+        }
+
+    @input_validator
+    def import_contacts_handler(self, params):
+        return self.contactbook.import_contacts(params[0])
+
+    def import_contacts_helper(self):
+        return {
+            'help': "import contacts from a .csv, .jsonl or .vcf file",
+            'file': None,
+        }
+
     @input_validator
     def edit_contact_handler(self, params):
         return self.contactbook.edit_by_name(params[0])
@@ -117,6 +219,7 @@ class BotCommands():
             'help': "edit last contact",
         }
 
+    @read_only
     @input_validator
     def search_contact_handler(self, params):
         key = params[0]
@@ -131,6 +234,7 @@ class BotCommands():
                 'value': None
             }
 
+    @read_only
     @input_validator
     def get_contact_handler(self, params):
         return self.contactbook.get_contact(params[0])
@@ -141,6 +245,25 @@ class BotCommands():
             'name': None,
         }
 
+    @read_only
+    @input_validator
+    def find_contact_handler(self, params):
+        try:
+            limit = int(params[1]) if len(params) > 1 else None
+            cutoff = float(params[2]) if len(params) > 2 else None
+        except ValueError:
+            return "Invalid limit or cutoff format"
+        return self.contactbook.find_contact(params[0], limit, cutoff)
+
+    def find_contact_helper(self):
+        return {
+            'help': (
+                "find contacts with similar names "
+                "(find_contact <name> [limit] [min_score])"
+            ),
+            'name': None,
+        }
+
     @input_validator
     def del_contact_handler(self, params):
         return self.contactbook.del_contact(params[0])
@@ -168,15 +291,24 @@ class BotCommands():
             'help': "delete last contact",
         }
 
-    @input_validator
+    @read_only
     def all_contacts_handler(self, params):
-        return self.contactbook.all_contacts()
+        try:
+            limit, offset, rest = parse_paging(params)
+        except ValueError:
+            return PAGING_ERROR
+        if rest:
+            return PAGING_ERROR
+        if limit is None and not offset:
+            return self.contactbook.all_contacts()
+        return self.contactbook.all_contacts(limit, offset)
 
     def all_contacts_helper(self):
         return {
-            'help': "print all contacts",
+            'help': "print all contacts ([--limit N] [--offset N])",
         }
 
+    @read_only
     @input_validator
     def exit_handler(self, params):
         self.done = True
@@ -187,6 +319,7 @@ class BotCommands():
             'help': "exit application",
         }
 
+    @read_only
     def close_handler(self, params):
         return self.exit_handler(params)
 
@@ -205,6 +338,7 @@ class BotCommands():
             ),
         }
 
+    @read_only
     @input_validator
     def show_note_handler(self, params):
         return self.notes.get_note(params[0])
@@ -215,13 +349,21 @@ class BotCommands():
             'title': Notes.title_validator,
         }
 
-    @input_validator
+    @read_only
     def list_notes_handler(self, params):
-        return self.notes.list_all_notes()
+        try:
+            limit, offset, rest = parse_paging(params)
+        except ValueError:
+            return PAGING_ERROR
+        if rest:
+            return PAGING_ERROR
+        if limit is None and not offset:
+            return self.notes.list_all_notes()
+        return self.notes.list_all_notes(limit, offset)
 
     def list_notes_helper(self):
         return {
-            'help': "list all notes",
+            'help': "list all notes ([--limit N] [--offset N])",
         }
 
     @input_validator
@@ -266,6 +408,7 @@ class BotCommands():
             'tags': None,
         }
 
+    @read_only
     @input_validator
     def search_notes_by_tag_handler(self, params):
         return self.notes.search_notes_by_tag(params[0])
@@ -276,6 +419,7 @@ class BotCommands():
             'tag': None,
         }
 
+    @read_only
     @input_validator
     def search_notes_by_tags_handler(self, params):
         return self.notes.search_notes_by_tags_from_command(params)
@@ -289,6 +433,7 @@ class BotCommands():
             'tags': None,
         }
 
+    @read_only
     @input_validator
     def list_all_tags_handler(self, params):
         return self.notes.list_all_tags()
@@ -298,6 +443,7 @@ class BotCommands():
             'help': "list all tags with counts",
         }
 
+    @read_only
     @input_validator
     def sort_notes_by_tag_handler(self, params):
         return self.notes.sort_notes_by_tag(params[0])
@@ -308,25 +454,41 @@ class BotCommands():
             'tag': None,
         }
 
+    @read_only
     @input_validator
-    def help_handler(self, params):
-        all_commands = sorted(self.get_avail_commands())
-        help = {}
-        for command in all_commands:
-            helper = self.get_helper(command)
-            if helper is not None:
-                params = helper()
-                help[command] = params['help'] if 'help' in params else ""
-            else:
-                help[command] = ""
+    def search_notes_handler(self, params):
+        return self.notes.search_notes(" ".join(params))
+
+    def search_notes_helper(self):
+        return {
+            'help': "full-text search in notes, best matches first",
+            'query': None,
+        }
 
-        txt = ""
-        for command, help_txt in help.items():
-            txt += (
-                f"    {Fore.RED}{command.ljust(20)}"
-                f"{Style.RESET_ALL}{help_txt}\n"
+    @read_only
+    def stats_handler(self, params):
+        if params not in ([], ["--json"]):
+            return "Usage: stats [--json]"
+        if self.metrics is None:
+            return "Metrics are disabled (METRICS_ENABLED in config.py)"
+        if params:
+            return json.dumps(
+                self.metrics.summary(),
+                indent=config.JSON_INDENT,
+                ensure_ascii=config.JSON_ENSURE_ASCII,
             )
-        return f"Available comands:\n{txt}"
+        return self.metrics.report()
+
+    def stats_helper(self):
+        return {
+            'help': "command latency p50/p95/p99 and store save times "
+                    "(stats [--json])",
+        }
+
+    @read_only
+    @input_validator
+    def help_handler(self, params):
+        return f"Available comands:\n{self.registry.help_text}"
 
     def help_helper(self):
         return {
@@ -334,31 +496,19 @@ class BotCommands():
         }
 
     def get_avail_commands(self):
-        return [
-            func.replace("_handler", "")
-            for func in dir(self)
-            if func.endswith("_handler")
-        ]
+        return list(self.registry)
+
+    def handler_for(self, command):
+        spec = self.registry.get(command)
+        if spec is None:
+            return None
+        return getattr(self, spec.handler)
 
     def get_helper(self, command):
-        helper_name = command + "_helper"
-        if helper_name in dir(self):
-            return getattr(self, helper_name)
-        return None
+        spec = self.registry.get(command)
+        if spec is None or spec.helper is None:
+            return None
+        return getattr(self, spec.helper)
 
     def find_similar(self, command):
-        all_commands = self.get_avail_commands()
-        similarity = {
-            cmd: (
-                1 if cmd.startswith(command)
-                else (2 if command in cmd else distance(command, cmd))
-            )
-            for cmd in all_commands
-        }
-        best_similarity = min(similarity.values())
-        if len(command) < best_similarity:
-            return []
-        return [
-            cmd for cmd, sm in similarity.items()
-            if sm == best_similarity
-        ]
+        return self.registry.suggest(command)
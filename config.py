@@ -1,6 +1,58 @@
 
 NOTES_STORAGE = "storage/notes.pkl"
 PHONEBOOK_STORAGE = "storage/phonebook.pkl"
+PHONEBOOK_JOURNAL = "storage/phonebook.journal"
+
+# Append mutations to the journal instead of rewriting the whole snapshot.
+# The journal is folded back into the snapshot once it grows past the limit.
+# An existing journal is replayed on load either way, so the mode can be
+# switched at any time.
+PHONEBOOK_JOURNAL_MODE = False
+PHONEBOOK_JOURNAL_MAX_SIZE = 1024 * 1024
+
+# Contact storage backend: "pickle" keeps the whole book in memory,
+# "sqlite" keeps it in PHONEBOOK_SQLITE and answers lookups with
+# indexed queries
+PHONEBOOK_BACKEND = "pickle"
+PHONEBOOK_SQLITE = "storage/phonebook.db"
+
+# Keep a columnar mirror of birthdays (pickle backend) for whole-book
+# queries: upcoming birthdays, age brackets, birth year ranges. Queries
+# are vectorized with NumPy when it is installed.
+PHONEBOOK_COLUMNS = False
+
+# import_contacts reads and validates files this many rows at a time;
+# with more than one worker the batches are validated in that many
+# processes (worth it for files of hundreds of thousands of rows)
+IMPORT_BATCH_SIZE = 1000
+IMPORT_WORKERS = 1
+
+# Notes storage backend: "pickle" or "sqlite" (FTS5 full-text index)
+NOTES_BACKEND = "pickle"
+NOTES_SQLITE = "storage/notes.db"
+NOTES_SEARCH_LIMIT = 10
+
+# find_contact: how many matches to show and the minimal score (0-100)
+FUZZY_LIMIT = 5
+FUZZY_SCORE_CUTOFF = 60
+
+# Saves requested within this many seconds are coalesced into one
+# background write; pending changes are always flushed on exit.
+# 0 writes synchronously on every change.
+WRITE_BEHIND_DELAY = 0.5
+
+# Record per-command latency and store save times for the `stats`
+# command; False leaves a single attribute check on the command path.
+METRICS_ENABLED = True
+
+# Multi-session server (cli-bot --serve): a unix socket by default,
+# or localhost TCP when a port is given
+SERVER_SOCKET = "storage/cli-bot.sock"
+SERVER_HOST = "127.0.0.1"
+
+# Local HTTP/JSON API (cli-bot --api)
+API_HOST = "127.0.0.1"
+API_PORT = 8080
 
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 DOB_FORMAT = "%Y.%m.%d"
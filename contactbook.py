@@ -1,11 +1,31 @@
+import copy
+import os
 import pickle
+from contextlib import ExitStack, contextmanager
 from pickle import UnpicklingError
+from collections import UserDict, deque
 from datetime import datetime, date, timedelta
 from calendar import isleap
+from itertools import islice
 import re
-from colorama import Fore, Style
+import threading
+from indexes import ContactColumns, NameIndex, BirthdayIndex, TrigramIndex
+from persistence import IdAllocator, Journal, WriteBehind, atomic_dump
+from results import AgeBrackets, ContactList, ScoredContactList, page
 from config import (
     PHONEBOOK_STORAGE,
+    PHONEBOOK_JOURNAL,
+    PHONEBOOK_JOURNAL_MODE,
+    PHONEBOOK_JOURNAL_MAX_SIZE,
+    PHONEBOOK_BACKEND,
+    PHONEBOOK_SQLITE,
+    PHONEBOOK_COLUMNS,
+    WRITE_BEHIND_DELAY,
+    IMPORT_BATCH_SIZE,
+    IMPORT_WORKERS,
+    FILE_ENCODING,
+    FUZZY_LIMIT,
+    FUZZY_SCORE_CUTOFF,
     DOB_FORMAT,
     PHONE_FORMAT,
     EMAIL_FORMAT,
@@ -14,19 +34,108 @@ from config import (
 )
 
 
+def birthday_for_year(dob: date, year: int):
+    if dob.month == 2 and dob.day == 29 and not isleap(year):
+        return dob.replace(year=year, day=28)
+    return dob.replace(year=year)
+
+
+def next_birthday(dob: date, today: date):
+    birthday = birthday_for_year(dob, today.year)
+    if birthday.date() < today:
+        birthday = birthday_for_year(dob, today.year + 1)
+    return birthday
+
+
+def birthday_windows(start: date, days: int):
+    """Inclusive (month, day) ranges covered by [start, start + days).
+
+    One range per calendar year touched, so a window crossing New Year
+    is split in two. Feb 29 birthdays fall on Feb 28 in non-leap years,
+    the same way birthday_for_year does it.
+    """
+    windows = []
+    if days <= 0:
+        return windows
+    end = start + timedelta(days=days - 1)
+    year = start.year
+    while True:
+        first = start if year == start.year else date(year, 1, 1)
+        last = min(end, date(year, 12, 31))
+        low, high = (first.month, first.day), (last.month, last.day)
+        if not isleap(year) and high == (2, 28):
+            high = (2, 29)
+        windows.append((low, high))
+        if last == end:
+            return windows
+        year += 1
+
+
 class Contact():
+    """A contact record.
+
+    Fields live in slots (no per-instance __dict__) and the birthday is
+    kept as a date ordinal; the properties below give the public API.
+    A field that was never set is None in its slot.
+    """
+
     name: str
     addr: str
     email: str
     phone: str
     dob: datetime
 
+    __slots__ = ("_name", "_addr", "_email", "_phone", "_dob")
+
     def __init__(self, **kwargs):
-        self._data = {}
+        self._name = self._addr = self._email = self._phone = None
+        self._dob = None
         for field in Contact.__annotations__:
             if field in kwargs:
                 setattr(self, field, kwargs[field])
 
+    @classmethod
+    def _restore(cls, fields):
+        # fields come from already validated data (journal records)
+        contact = cls.__new__(cls)
+        dob = fields.get("dob")
+        contact.__setstate__((
+            fields.get("name"),
+            fields.get("addr"),
+            fields.get("email"),
+            fields.get("phone"),
+            None if dob is None else dob.toordinal(),
+        ))
+        return contact
+
+    def _update(self, fields):
+        for field, value in fields.items():
+            if field == "dob" and value is not None:
+                value = value.toordinal()
+            setattr(self, f"_{field}", value)
+
+    def fields(self):
+        """The fields that are set, as {field: value}."""
+        fields = {
+            field: getattr(self, f"_{field}")
+            for field in Contact.__annotations__
+            if getattr(self, f"_{field}") is not None
+        }
+        if "dob" in fields:
+            fields["dob"] = datetime.fromordinal(fields["dob"])
+        return fields
+
+    def __getstate__(self):
+        return (self._name, self._addr, self._email, self._phone, self._dob)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # pickled before slots: {'_data': {field: value}}
+            self.__init__()
+            self._update(state["_data"])
+            return
+        self._name, self._addr, self._email, self._phone, self._dob = state
+
     @staticmethod
     def name_validator(name):
         return name.isalpha() and len(name) > 0 and len(name) <= MAX_NAME_LEN
@@ -69,52 +178,76 @@ class Contact():
     def field_validator(field):
         return field in Contact.__annotations__
 
+    @classmethod
+    def invalid_fields(cls, fields):
+        return [
+            field for field, value in fields.items()
+            if not cls.field_validator(field)
+            or not isinstance(value, str)
+            or not getattr(cls, f"{field}_validator")(value)
+        ]
+
+    @classmethod
+    def rejected_fields(cls, fields):
+        """Invalid and missing fields of a new contact; addr is optional."""
+        return cls.invalid_fields(fields) + [
+            field for field in cls.__annotations__
+            if field not in fields and field != "addr"
+        ]
+
     @property
     def name(self):
-        if 'name' in self._data:
-            return self._data['name']
+        return self._name
 
     @name.setter
     def name(self, name):
         if self.name_validator(name):
-            self._data['name'] = name
+            self._name = name
 
     @property
     def addr(self):
-        return self._data['addr']
+        if self._addr is None:
+            raise KeyError('addr')
+        return self._addr
 
     @addr.setter
     def addr(self, addr):
         if self.addr_validator(addr):
-            self._data['addr'] = addr
+            self._addr = addr
 
     @property
     def email(self):
-        return self._data['email']
+        if self._email is None:
+            raise KeyError('email')
+        return self._email
 
     @email.setter
     def email(self, email):
         if self.email_validator(email):
-            self._data['email'] = email
+            self._email = email
 
     @property
     def phone(self):
-        return self._data['phone']
+        if self._phone is None:
+            raise KeyError('phone')
+        return self._phone
 
     @phone.setter
     def phone(self, phone):
         pure_phone = self.phone_normalize(phone)
         if self.phone_validator(pure_phone):
-            self._data['phone'] = phone
+            self._phone = phone
 
     @property
     def dob(self):
-        return self._data['dob']
+        if self._dob is None:
+            raise KeyError('dob')
+        return datetime.fromordinal(self._dob)
 
     @dob.setter
     def dob(self, dob_str):
         if self.dob_validator(dob_str):
-            self._data['dob'] = datetime.strptime(dob_str, DOB_FORMAT)
+            self._dob = datetime.strptime(dob_str, DOB_FORMAT).toordinal()
         else:
             raise ValueError(
                 "Invalid date format. Date must be like "
@@ -122,30 +255,264 @@ class Contact():
                 )
 
 
+class ContactStorage(UserDict):
+    """In-memory {id: Contact} mapping with the lookups Contactbook uses.
+
+    Every assignment and deletion goes through the secondary indexes, so
+    re-assigning a contact after editing it in place re-indexes it.
+    With `columns` a ContactColumns mirror is kept as one more index and
+    answers the birthday queries. Inside bulk() the indexes are left
+    alone and rebuilt once when the block exits.
+    """
+
+    def __init__(self, contacts=None, columns=False):
+        self.names = NameIndex()
+        self.birthday_index = BirthdayIndex()
+        self.indexes = [self.names, self.birthday_index]
+        self.columns = ContactColumns() if columns else None
+        if self.columns is not None:
+            self.indexes.append(self.columns)
+        self.trigrams = {}
+        self._build_lock = threading.Lock()
+        self._bulk = False
+        super().__init__()
+        if contacts:
+            # one bulk build instead of an incremental insert per contact
+            self.data.update(contacts)
+            self._rebuild()
+
+    def _rebuild(self):
+        for index in self.indexes:
+            index.rebuild(self.data.items())
+
+    @contextmanager
+    def bulk(self):
+        """Add many contacts with a single index rebuild at the end.
+
+        An insert into the birthday index is O(n), so indexing contacts
+        one by one makes a large import quadratic. Lookups inside the
+        block see stale indexes.
+        """
+        self._bulk = True
+        try:
+            yield self
+        finally:
+            self._bulk = False
+            self._rebuild()
+
+    def __setitem__(self, contact_id, contact):
+        if self._bulk:
+            self.data[contact_id] = contact
+            return
+        if contact_id in self.data:
+            self._unindex(contact_id)
+        self.data[contact_id] = contact
+        for index in self.indexes:
+            index.add(contact_id, contact)
+
+    def __delitem__(self, contact_id):
+        del self.data[contact_id]
+        if not self._bulk:
+            self._unindex(contact_id)
+
+    def _unindex(self, contact_id):
+        for index in self.indexes:
+            index.remove(contact_id)
+
+    def find_by_name(self, name, ignore_case=False):
+        ids = self.names.lookup(name, ignore_case)
+        return {id: self.data[id] for id in sorted(ids)}
+
+    def find_similar_names(self, name, limit, score_cutoff):
+        return self.names.fuzzy.match(name, limit, score_cutoff)
+
+    def search(self, key, value):
+        if not Contact.field_validator(key):
+            return {}
+        index = self.trigrams.get(key)
+        if index is None:
+            # built on the first search of a field, maintained afterwards;
+            # concurrent readers may race to build it
+            with self._build_lock:
+                index = self.trigrams.get(key)
+                if index is None:
+                    index = TrigramIndex(key)
+                    index.rebuild(self.data.items())
+                    self.indexes.append(index)
+                    self.trigrams[key] = index
+        ids = index.search(str(value).lower())
+        return {id: self.data[id] for id in ids}
+
+    def birthdays(self, today: date, days: int):
+        windows = birthday_windows(today, days)
+        if self.columns is not None:
+            ids = self.columns.birthdays(windows)
+        else:
+            ids = (
+                id for low, high in windows
+                for id in self.birthday_index.between(low, high)
+            )
+        found = {}
+        for id in ids:
+            if id not in found:
+                found[id] = self.data[id]
+        return found
+
+    def _columns(self):
+        if self.columns is not None:
+            return self.columns
+        # without the mirror, whole-book queries build a throwaway one
+        columns = ContactColumns()
+        columns.rebuild(self.data.items())
+        return columns
+
+    def born_between(self, first: int, last: int):
+        return {
+            id: self.data[id]
+            for id in self._columns().born_between(first, last)
+        }
+
+    def age_histogram(self, today: date, width: int):
+        return self._columns().age_histogram(today, width)
+
+
 class Contactbook():
 
     NOT_FOUND = "Contact doesn't exists"
+    # change record asking the next write for a snapshot, not the journal
+    SNAPSHOT = ("snapshot", None, None)
 
     storage = {}
     last_id = 0
 
-    def __init__(self):
+    def __init__(self, read_only=False):
+        # read-only books never write: no journal repair, no first-run
+        # import into sqlite and no save path
+        self.read_only = read_only
         self.storage = {}
         self.last_id = 0
-        phonebook = self._load_data()
-        if phonebook:
-            self.storage = phonebook
+        self._changes = deque()
+        self.backend = PHONEBOOK_BACKEND
+        self.storage_file = PHONEBOOK_STORAGE
+        self.journal = Journal(PHONEBOOK_JOURNAL)
+        self.writer = WriteBehind(self._write, WRITE_BEHIND_DELAY)
+        self.ids = IdAllocator()
+        if self.backend == "sqlite":
+            self.storage = self._open_sqlite()
+        else:
+            self.storage = ContactStorage(
+                self._load_data(), columns=PHONEBOOK_COLUMNS
+            )
+
+    def session(self):
+        """A view of this book with its own last_id, for one session.
+
+        Storage, journal, id counter and writer stay shared; only the
+        "last contact" that edit_last_contact and del_last act on is
+        per session.
+        """
+        view = copy.copy(self)
+        view.last_id = 0
+        return view
+
+    def _open_sqlite(self):
+        from sqlite_storage import SqliteContactStorage
+
+        if self.read_only:
+            if not os.path.exists(PHONEBOOK_SQLITE):
+                # not imported yet, the pickled book is the current one
+                return ContactStorage(
+                    self._load_data(), columns=PHONEBOOK_COLUMNS
+                )
+            storage = SqliteContactStorage(PHONEBOOK_SQLITE, read_only=True)
+            self.ids.seen(storage.next_id - 1)
+            return storage
+        storage = SqliteContactStorage(PHONEBOOK_SQLITE)
+        if not storage and os.path.exists(self.storage_file):
+            # first run on the sqlite backend: import the pickled book
+            storage.update(self._load_data())
+            storage.next_id = self.ids.next_id
+            storage.commit()
+        self.ids.seen(storage.next_id - 1)
+        return storage
 
     def _load_data(self):
         try:
-            with open(PHONEBOOK_STORAGE, "rb") as f:
-                return pickle.load(f)
+            with open(self.storage_file, "rb") as f:
+                snapshot = pickle.load(f)
         except (FileNotFoundError, EOFError, UnpicklingError):
-            return {}
+            snapshot = {}
+        if "contacts" in snapshot:
+            phonebook = snapshot["contacts"]
+            self.ids.seen(snapshot["next_id"] - 1)
+        else:
+            # snapshots written before the id counter are plain dicts
+            phonebook = snapshot
+            if phonebook:
+                self.ids.seen(max(phonebook))
+        replay = self.journal.replay(repair=not self.read_only)
+        for op, contact_id, fields in replay:
+            if op == "add":
+                phonebook[contact_id] = Contact._restore(fields)
+                self.ids.seen(contact_id)
+            elif op == "edit" and contact_id in phonebook:
+                phonebook[contact_id]._update(fields)
+            elif op == "delete":
+                phonebook.pop(contact_id, None)
+            elif op == "reserve":
+                # highest id of a reserved block
+                self.ids.seen(contact_id)
+        return phonebook
+
+    def _log_change(self, op, contact_id, fields=None):
+        self._changes.append((op, contact_id, fields))
 
     def _save_to_file(self):
-        with open(PHONEBOOK_STORAGE, 'wb') as f:
-            pickle.dump(self.storage, f)
+        if self.read_only:
+            raise RuntimeError("Contact book is opened read-only")
+        self.writer.schedule()
+
+    def flush(self):
+        self.writer.flush()
+
+    def deferred_writes(self):
+        return self.writer.deferred()
+
+    def _write(self):
+        # runs on the write-behind thread, see persistence.WriteBehind
+        if self.backend == "sqlite":
+            self._changes.clear()
+            self.storage.commit()
+            return
+        if not PHONEBOOK_JOURNAL_MODE:
+            self.compact()
+            return
+        changes = []
+        while self._changes:
+            changes.append(self._changes.popleft())
+        try:
+            if self.SNAPSHOT in changes:
+                # after a bulk import, see import_contacts
+                self.compact()
+                return
+            self.journal.append(changes)
+        except BaseException:
+            # requeue for the retry; a failed append leaves the journal
+            # as it was, see Journal.append
+            self._changes.extendleft(reversed(changes))
+            raise
+        if self.journal.size() > PHONEBOOK_JOURNAL_MAX_SIZE:
+            self.compact()
+
+    def compact(self):
+        # changes logged after clear() are already in the copy and
+        # replaying them again later is harmless
+        self._changes.clear()
+        contacts = self.storage.data.copy()
+        # read after the copy, so it covers every id in it
+        snapshot = {"next_id": self.ids.next_id, "contacts": contacts}
+        atomic_dump(snapshot, self.storage_file)
+        self.journal.clear()
 
     def add_contact(self, name):
         suggest = ""
@@ -182,11 +549,133 @@ class Contactbook():
             dob=dob,
             addr=addr
             )
-        contact_id = 1 if not self.storage else max(self.storage.keys()) + 1
+        self._insert(contact)
+        return "Contact added"
+
+    def _insert(self, contact, contact_id=None):
+        # contact_id comes from reserve_ids() for bulk imports
+        if contact_id is None:
+            contact_id = self.ids.allocate()
+            self._store_next_id()
         self.storage[contact_id] = contact
-        self.last_id = len(self.storage)
+        self.last_id = contact_id
+        self._log_change("add", contact_id, contact.fields())
+        self._save_to_file()
+        return contact_id
+
+    def reserve_ids(self, count):
+        """Reserve `count` new ids for a bulk import, as a range.
+
+        The reservation is saved right away, so the ids are not handed
+        out again even if the import stops halfway.
+        """
+        ids = self.ids.reserve(count)
+        if ids:
+            self._store_next_id()
+            self._log_change("reserve", ids[-1])
+            self._save_to_file()
+        return ids
+
+    def _store_next_id(self):
+        # the journal's add/reserve records carry the pickle backend's
+        # counter; sqlite keeps it in its meta table
+        if self.backend == "sqlite":
+            self.storage.next_id = self.ids.next_id
+
+    def create_contact(self, fields):
+        """Add a contact from a dict of field values, return its id.
+
+        Non-interactive counterpart of add_contact; raises ValueError
+        naming the missing or invalid fields.
+        """
+        fields = {"addr": "", **fields}
+        invalid = Contact.rejected_fields(fields)
+        if invalid:
+            raise ValueError("Invalid fields: " + " ".join(invalid))
+        fields["phone"] = Contact.phone_normalize(fields["phone"])
+        return self._insert(Contact(**fields))
+
+    def import_contacts(self, path):
+        """Add the contacts of a CSV, JSON Lines or vCard file.
+
+        The file is streamed and validated IMPORT_BATCH_SIZE rows at a
+        time, in IMPORT_WORKERS processes; rows failing the Contact
+        validators are written to `<path>.rejects` as JSON Lines.
+        Accepted contacts are saved in a single write: a snapshot (or
+        an sqlite commit) rather than a journal record per contact.
+        """
+        from importers import (
+            READ_ERRORS, batches, checked_batches, reader_for, write_rejects,
+        )
+
+        read = reader_for(path)
+        if read is None:
+            return "Unknown file format, use .csv, .jsonl or .vcf"
+        rejects_path = path + ".rejects"
+        imported = rejected = 0
+        stopped = ""
+        with ExitStack() as stack:
+            try:
+                f = stack.enter_context(
+                    open(path, encoding=FILE_ENCODING, newline="")
+                )
+            except OSError as e:
+                return f"Cannot open {path}: {e.strerror}"
+            stack.enter_context(self.writer.deferred())
+            stack.enter_context(self.storage.bulk())
+            rejects = None
+            try:
+                rows = batches(read(f), IMPORT_BATCH_SIZE)
+                for accepted, failed in checked_batches(rows, IMPORT_WORKERS):
+                    # rows are not journaled one by one, which would
+                    # hold every record in memory until the write
+                    for contact_id, fields in zip(
+                        self.reserve_ids(len(accepted)), accepted
+                    ):
+                        self.storage[contact_id] = Contact._restore(fields)
+                        self.last_id = contact_id
+                    imported += len(accepted)
+                    if failed:
+                        if rejects is None:
+                            rejects = stack.enter_context(open(
+                                rejects_path, "w", encoding=FILE_ENCODING
+                            ))
+                        write_rejects(rejects, failed)
+                        rejected += len(failed)
+            except READ_ERRORS as e:
+                stopped = f"Import stopped: {e}\n"
+            finally:
+                if imported:
+                    # the single write on leaving deferred() saves a
+                    # snapshot with every imported contact
+                    self._changes.append(self.SNAPSHOT)
+                    self._save_to_file()
+        message = f"{stopped}Imported {imported} contacts"
+        if rejected:
+            message += f", {rejected} rejected (see {rejects_path})"
+        return message
+
+    def update_contact(self, contact_id, fields):
+        """Change the given fields of a contact.
+
+        Raises KeyError for an unknown id and ValueError naming the
+        invalid fields.
+        """
+        contact = self.storage[contact_id]
+        invalid = Contact.invalid_fields(fields)
+        if invalid:
+            raise ValueError("Invalid fields: " + " ".join(invalid))
+        if "phone" in fields:
+            phone = Contact.phone_normalize(fields["phone"])
+            fields = {**fields, "phone": phone}
+        self._store_edit(contact_id, contact, fields)
+        return contact
+
+    def remove_contact(self, contact_id):
+        """Delete a contact without confirmation; KeyError if unknown."""
+        del self.storage[contact_id]
+        self._log_change("delete", contact_id)
         self._save_to_file()
-        return "Contact added"
 
     def edit_last_contact(self):
         if self.last_id in self.storage:
@@ -197,19 +686,29 @@ class Contactbook():
         contact = self.storage.get(id)
         if not contact:
             return f"No contact found with id: '{id}'"
-        return (yield from self.edit_contact(contact))
+        return (yield from self.edit_contact(contact, id))
 
     def edit_by_name(self, name):
         contacts = self._get_contacts_by_name(name)
         if not contacts:
             return f"No contact found with name '{name}'"
 
-        contact = yield from self._handle_multi_choice(contacts)
-        if contact is None:
+        contact_id = yield from self._handle_multi_choice(contacts)
+        if contact_id is None:
             return
-        return (yield from self.edit_contact(contact=contact))
+        return (yield from self.edit_contact(
+            self.storage[contact_id], contact_id
+        ))
+
+    def edit_contact(self, contact: Contact, contact_id=None):
+        if contact_id is None:
+            contact_id = next(
+                (id for id, c in self.storage.items() if c is contact), None
+            )
+        # answers are applied only when all prompts are done, so an
+        # aborted edit leaves the contact as it was
+        fields = {}
 
-    def edit_contact(self, contact: Contact):
         # Setting new phone number
         suggest = ""
         while True:
@@ -220,7 +719,7 @@ class Contactbook():
             if phone == "":
                 break
             if Contact.phone_validator(phone):
-                contact.phone = Contact.phone_normalize(phone)
+                fields["phone"] = Contact.phone_normalize(phone)
                 break
             suggest = "Invalid phone format. Example: +380987654321\n"
 
@@ -234,7 +733,7 @@ class Contactbook():
             if email == "":
                 break
             if Contact.email_validator(email):
-                contact.email = email
+                fields["email"] = email
                 break
             suggest = "Invalid email format. Example: name@domain.tld\n"
 
@@ -248,7 +747,7 @@ class Contactbook():
             if dob == "":
                 break
             if Contact.dob_validator(dob):
-                contact.dob = dob
+                fields["dob"] = dob
                 break
             suggest = (
                 "Invalid date format. Should be like "
@@ -261,14 +760,35 @@ class Contactbook():
             "New address: "
         )
         if addr != "":
-            contact.addr = addr
+            fields["addr"] = addr
+
+        if contact_id is not None:
+            # the stored contact, with edits other sessions made while
+            # this one was at a prompt; if it was deleted meanwhile,
+            # writing it back would resurrect it
+            contact = self.storage.get(contact_id)
+            if contact is None:
+                return "Contact was deleted meanwhile, changes discarded"
+        self._store_edit(contact_id, contact, fields)
+        return "Contact updated"
 
+    def _store_edit(self, contact_id, contact, fields):
+        before = contact.fields()
+        for field, value in fields.items():
+            setattr(contact, field, value)
+        changed = {
+            field: value for field, value in contact.fields().items()
+            if before.get(field) != value
+        }
+        if changed and contact_id is not None:
+            self._log_change("edit", contact_id, changed)
+            # write back for backends that hand out copies
+            self.storage[contact_id] = contact
         self._save_to_file()
-        return "Contact updated"
 
     def _handle_multi_choice(self, contacts: dict):
         if len(contacts) == 1:
-            return next(iter(contacts.values()))
+            return next(iter(contacts))
 
         txt = self.print_contacts(contacts)
 
@@ -283,7 +803,7 @@ class Contactbook():
                     return None
                 choice_id = int(choice_id)
                 if choice_id in self.storage.keys():
-                    return self.storage[choice_id]
+                    return choice_id
                 suggest = ("Invalid number. "
                            "Please enter one of the shown numbers.\n")
             except ValueError:
@@ -291,17 +811,28 @@ class Contactbook():
 
     def get_contact(self, name):
         found = self._get_contacts_by_name(name)
-        return self.print_contacts(found)
+        return self.contact_list(found.items())
 
     def _get_contacts_by_name(self, name):
-        found = {}
-        for id, contact in self.storage.items():
-            if contact.name == name:
-                found[id] = contact
-        return found
+        return self.storage.find_by_name(name)
+
+    def find_contact(self, name, limit=None, score_cutoff=None):
+        limit = limit or FUZZY_LIMIT
+        if score_cutoff is None:
+            score_cutoff = FUZZY_SCORE_CUTOFF
+        matches = self.storage.find_similar_names(name, limit, score_cutoff)
+        found = (
+            (id, contact, score)
+            for match, score in matches
+            for id, contact in self.storage.find_by_name(match).items()
+        )
+        return ScoredContactList(
+            self._shown(islice(found, limit)),
+            empty=f"No contacts similar to '{name}'",
+        )
 
-    def all_contacts(self):
-        return self.print_contacts(self.storage)
+    def all_contacts(self, limit=None, offset=0):
+        return self.contact_list(page(self.storage.items(), limit, offset))
 
     def del_contact(self, name):
         found = self._get_contacts_by_name(name)
@@ -318,9 +849,12 @@ class Contactbook():
         if delete_all.lower() == 'y':
             for id in iter(found):
                 del self.storage[id]
+                self._log_change("delete", id)
             self._save_to_file()
             return "Contacts deleted"
         else:
+            from colorama import Fore, Style
+
             return (
                 "Contact not deleted. You can use command "
                 f"{Fore.RED}del_contact_id{Style.RESET_ALL} "
@@ -340,82 +874,63 @@ class Contactbook():
         if id not in self.storage:
             return "Contact doesn't exists"
         confirm_msg = (
-            self.print_contacts({self.last_id: self.storage[self.last_id]}) +
+            self.print_contacts({id: self.storage[id]}) +
             "Are you sure to delete this contact (y/N)?"
         )
         confirm_del = yield (confirm_msg)
         if confirm_del.lower() == 'y':
-            del self.storage[self.last_id]
+            del self.storage[id]
+            self._log_change("delete", id)
             self._save_to_file()
             return "Contact deleted"
         return "Operation canceled"
 
     def search_contacts(self, key, value):
-        value = str(value).lower()
-        found = {}
-
-        for contact_id, contact in self.storage.items():
-            if not hasattr(contact, key):
-                continue
+        found = self.storage.search(key, value)
 
-            attr_val = str(getattr(contact, key)).lower()
-            if value in attr_val:
-                found[contact_id] = contact
-
-        if not found:
-            return "No contacts found matching the given criteria."
-
-        return self.print_contacts(found)
+        return self.contact_list(
+            found.items(),
+            empty="No contacts found matching the given criteria.",
+        )
 
     def upcoming_birthdays(self, days):
         found = self._get_birthdays(days)
-        return (
-            f"Contacts having birthdays in {days} days:\n"
-            + self.print_contacts(found)
+        header = f"Contacts having birthdays in {days} days:\n"
+        return self.contact_list(found.items(), header=header, empty=header)
+
+    def born_between(self, first, last):
+        found = self.storage.born_between(first, last)
+        return self.contact_list(
+            found.items(),
+            header=f"Contacts born in {first}-{last}:\n",
+            empty=f"No contacts born in {first}-{last}",
         )
 
-    def _get_birthdays(self, days: int) -> list[Contact]:
-        upcoming_birthday_contacts = {}
-        today = datetime.now().date()
-        end_date = today + timedelta(days=days)
-
-        for id, contact in self.storage.items():
-            dob = getattr(contact, "dob", None)
-            if not dob:
-                continue
-
-            birthday = self._next_birthday(dob, today)
-
-            if today <= birthday.date() < end_date:
-                upcoming_birthday_contacts[id] = contact
+    def age_histogram(self, width=10):
+        return AgeBrackets(
+            self.storage.age_histogram(datetime.now().date(), width),
+            width,
+            header="Contacts by age:\n",
+            empty="No contacts with a date of birth",
+        )
 
-        return upcoming_birthday_contacts
+    def _get_birthdays(self, days: int) -> dict[int, Contact]:
+        return self.storage.birthdays(datetime.now().date(), days)
 
     def _next_birthday(self, dob: date, today: date):
-        year = today.year
-        birthday = self._birthday_for_year(dob, year)
-
-        if birthday.date() < today:
-            birthday = self._birthday_for_year(dob, year + 1)
-
-        return birthday
+        return next_birthday(dob, today)
 
     def _birthday_for_year(self, dob: date, year: int):
-        if dob.month == 2 and dob.day == 29 and not isleap(year):
-            return dob.replace(year=year, day=28)
-        return dob.replace(year=year)
+        return birthday_for_year(dob, year)
 
     def print_contacts(self, contacts):
-        txt = ""
-        for id, contact in contacts.items():
-            txt += (
-                f"{id}\t"
-                f"{contact.name}\t"
-                f"{contact.dob.strftime('%Y.%m.%d')}\t"
-                f"{contact.email}\t"
-                f"{contact.phone}\t"
-                f"{contact.addr}\n"
-            )
-            self.last_id = id
+        return str(self.contact_list(contacts.items()))
+
+    def contact_list(self, items, header="", empty=""):
+        return ContactList(self._shown(items), header, empty)
 
-        return txt
+    def _shown(self, items):
+        # the last contact shown is the one del_last removes
+        for item in items:
+            self.last_id = item[0]
+            yield item
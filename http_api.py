@@ -0,0 +1,444 @@
+import json
+import re
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+import config
+from commands import BotCommands
+from notes import Notes
+from results import contact_json, note_json
+
+
+# /contacts/birthdays looks at most a year ahead
+MAX_BIRTHDAY_DAYS = 366
+
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer.
+
+    Waiting writers block new readers, so a steady stream of reads
+    cannot starve writes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over the contact book and notes.
+
+    GET    /contacts[?name=]            GET    /notes[?tag=&tag=&all=1]
+    POST   /contacts                    POST   /notes
+    GET    /contacts/search?field=&value=
+    GET    /contacts/birthdays?days=    GET    /notes/search?q=[&limit=]
+    GET    /contacts/<id>               GET    /notes/<title>
+    PATCH  /contacts/<id>               PATCH  /notes/<title>
+    DELETE /contacts/<id>               DELETE /notes/<title>
+                                        GET    /tags
+    """
+
+    protocol_version = "HTTP/1.1"
+    # keep-alive: headers and body go out in separate writes, without
+    # this each response waits for the client's delayed ACK
+    disable_nagle_algorithm = True
+    # (method, path pattern, handler, writes)
+    ROUTES = [
+        ("GET", r"/contacts", "list_contacts", False),
+        ("POST", r"/contacts", "create_contact", True),
+        ("GET", r"/contacts/search", "search_contacts", False),
+        ("GET", r"/contacts/birthdays", "birthdays", False),
+        ("GET", r"/contacts/(\d+)", "get_contact", False),
+        ("PATCH", r"/contacts/(\d+)", "update_contact", True),
+        ("PUT", r"/contacts/(\d+)", "update_contact", True),
+        ("DELETE", r"/contacts/(\d+)", "delete_contact", True),
+        ("GET", r"/notes", "list_notes", False),
+        ("POST", r"/notes", "create_note", True),
+        ("GET", r"/notes/search", "search_notes", False),
+        ("GET", r"/notes/([^/]+)", "get_note", False),
+        ("PATCH", r"/notes/([^/]+)", "update_note", True),
+        ("PUT", r"/notes/([^/]+)", "update_note", True),
+        ("DELETE", r"/notes/([^/]+)", "delete_note", True),
+        ("GET", r"/tags", "list_tags", False),
+    ]
+    ROUTES = [
+        (method, re.compile(pattern + "/?"), name, writes)
+        for method, pattern, name, writes in ROUTES
+    ]
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    @property
+    def contactbook(self):
+        return self.server.commands.contactbook
+
+    @property
+    def notes(self):
+        return self.server.commands.notes
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        self.query = parse_qs(url.query)
+        try:
+            body = self._read_body()
+            route, args = self._route(method, url.path)
+            _, _, name, writes = route
+            lock = self.server.lock.write if writes else self.server.lock.read
+            with lock():
+                status, payload = getattr(self, name)(*args, body=body)
+            if writes:
+                self.server.changed()
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            payload = {"error": f"Unexpected error occurred: {e}"}
+        self._send(status, payload)
+
+    def _route(self, method, path):
+        allowed = False
+        for route in self.ROUTES:
+            match = route[1].fullmatch(path)
+            if match:
+                if route[0] == method:
+                    return route, [unquote(arg) for arg in match.groups()]
+                allowed = True
+        if allowed:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown path '{path}'")
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be an object")
+        return body
+
+    def _send(self, status, payload):
+        data = json.dumps(
+            payload,
+            indent=self.server.indent,
+            ensure_ascii=config.JSON_ENSURE_ASCII,
+        ).encode(config.FILE_ENCODING)
+        self.send_response(status)
+        self.send_header(
+            "Content-Type", f"application/json; charset={config.FILE_ENCODING}"
+        )
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def _int_param(self, name, default=None):
+        value = self._param(name)
+        if value is None:
+            if default is None:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing '{name}'")
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid '{name}'")
+
+    # ---- contacts ----
+
+    def list_contacts(self, body):
+        name = self._param("name")
+        storage = self.contactbook.storage
+        found = storage.find_by_name(name).items() if name else storage.items()
+        return HTTPStatus.OK, [contact_json(*item) for item in found]
+
+    def create_contact(self, body):
+        try:
+            contact_id = self.contactbook.create_contact(body)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+        contact = self.contactbook.storage[contact_id]
+        return HTTPStatus.CREATED, contact_json(contact_id, contact)
+
+    def search_contacts(self, body):
+        field = self._param("field")
+        value = self._param("value")
+        if field is None or value is None:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, "Missing 'field' or 'value'"
+            )
+        found = self.contactbook.storage.search(field, value)
+        return HTTPStatus.OK, [contact_json(*item) for item in found.items()]
+
+    def birthdays(self, body):
+        days = self._int_param("days")
+        if not 0 <= days <= MAX_BIRTHDAY_DAYS:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"'days' must be between 0 and {MAX_BIRTHDAY_DAYS}",
+            )
+        found = self.contactbook._get_birthdays(days)
+        return HTTPStatus.OK, [contact_json(*item) for item in found.items()]
+
+    def _contact(self, contact_id):
+        contact_id = int(contact_id)
+        contact = self.contactbook.storage.get(contact_id)
+        if contact is None:
+            raise ApiError(
+                HTTPStatus.NOT_FOUND,
+                f"No contact found with id: '{contact_id}'",
+            )
+        return contact_id, contact
+
+    def get_contact(self, contact_id, body):
+        return HTTPStatus.OK, contact_json(*self._contact(contact_id))
+
+    def update_contact(self, contact_id, body):
+        contact_id, _ = self._contact(contact_id)
+        try:
+            contact = self.contactbook.update_contact(contact_id, body)
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+        return HTTPStatus.OK, contact_json(contact_id, contact)
+
+    def delete_contact(self, contact_id, body):
+        contact_id, _ = self._contact(contact_id)
+        self.contactbook.remove_contact(contact_id)
+        return HTTPStatus.OK, {"deleted": contact_id}
+
+    # ---- notes ----
+
+    def list_notes(self, body):
+        tags = self.query.get("tag")
+        if tags:
+            found = self.notes.notes.with_tags(
+                {tag.lower() for tag in tags}, self._param("all") == "1"
+            )
+        else:
+            found = self.notes.notes.items()
+        return HTTPStatus.OK, [note_json(*item) for item in found]
+
+    @staticmethod
+    def _tags(body):
+        tags = body.get("tags", "")
+        return ", ".join(tags) if isinstance(tags, list) else tags
+
+    @staticmethod
+    def _check_note(body, fields):
+        """Raise 400 naming the `fields` of a note body that are invalid.
+
+        Tags are a string of tags or a list of tag strings.
+        """
+        invalid = []
+        for field in fields:
+            value = body.get(field)
+            if field == "tags" and isinstance(value, list):
+                if not all(isinstance(tag, str) for tag in value):
+                    invalid.append(field)
+                    continue
+                value = ", ".join(value)
+            validator = getattr(Notes, f"{field}_validator")
+            if not isinstance(value, str) or not validator(value):
+                invalid.append(field)
+        if invalid:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST, "Invalid fields: " + " ".join(invalid)
+            )
+
+    def create_note(self, body):
+        title = body.get("title")
+        content = body.get("content")
+        self._check_note(
+            body, ("title", "content") + (("tags",) if "tags" in body else ())
+        )
+        if title in self.notes.notes:
+            raise ApiError(
+                HTTPStatus.CONFLICT, f"Note '{title}' already exists"
+            )
+        self.notes.add_note(title, content, self._tags(body))
+        return HTTPStatus.CREATED, note_json(title, self.notes.notes[title])
+
+    def search_notes(self, body):
+        query = self._param("q")
+        if not query:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Missing 'q'")
+        limit = self._int_param("limit", config.NOTES_SEARCH_LIMIT)
+        return HTTPStatus.OK, [
+            {"title": title, "snippet": snippet, "score": score}
+            for title, snippet, score in self.notes.notes.search(query, limit)
+        ]
+
+    def _note_key(self, title):
+        found_key = self.notes._find_note_key(title)
+        if found_key is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Note '{title}' not found")
+        return found_key
+
+    def get_note(self, title, body):
+        found_key = self._note_key(title)
+        return HTTPStatus.OK, note_json(found_key, self.notes.notes[found_key])
+
+    def update_note(self, title, body):
+        found_key = self._note_key(title)
+        new_title = body.get("title")
+        # fields left out or null are not changed
+        self._check_note(body, [
+            field for field in ("title", "content", "tags")
+            if body.get(field) is not None
+        ])
+        if new_title is not None and (
+            self.notes._find_note_key(new_title) not in (None, found_key)
+        ):
+            raise ApiError(
+                HTTPStatus.CONFLICT, f"Note '{new_title}' already exists"
+            )
+        self.notes.edit_note(
+            found_key,
+            new_title=new_title,
+            new_content=body.get("content"),
+            new_tags=self._tags(body) if body.get("tags") is not None
+            else None,
+        )
+        key = new_title if new_title is not None else found_key
+        return HTTPStatus.OK, note_json(key, self.notes.notes[key])
+
+    def delete_note(self, title, body):
+        found_key = self._note_key(title)
+        self.notes.delete_note(found_key)
+        return HTTPStatus.OK, {"deleted": found_key}
+
+    def list_tags(self, body):
+        return HTTPStatus.OK, self.notes.notes.tag_counts()
+
+
+class ApiServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer sharing one BotCommands between request threads.
+
+    Reads run concurrently under the read side of `lock`, mutations
+    take the write side. While serving, stores only save through a
+    writer thread that flushes them `delay` seconds after changes,
+    holding the write side too: a commit must not land between the
+    statements of one mutation.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address=None, commands=None, quiet=False, indent=None,
+        delay=None,
+    ):
+        address = address or (config.API_HOST, config.API_PORT)
+        self.commands = commands if commands is not None else BotCommands()
+        # load the stores up front, request threads would race to load them
+        for name in BotCommands.STORES:
+            getattr(self.commands, name)
+        self.lock = ReadWriteLock()
+        self.quiet = quiet
+        self.indent = config.JSON_INDENT if indent is None else indent
+        self.delay = config.WRITE_BEHIND_DELAY if delay is None else delay
+        self._dirty = threading.Event()
+        self._stopping = threading.Event()
+        super().__init__(address, ApiHandler)
+
+    def changed(self):
+        self._dirty.set()
+
+    def _flush(self):
+        with self.lock.write():
+            self.commands.flush()
+
+    def _writer(self):
+        while True:
+            self._dirty.wait()
+            # coalesce the changes of requests arriving meanwhile
+            if self._stopping.wait(self.delay):
+                return
+            self._dirty.clear()
+            self._flush()
+
+    def serve_forever(self, poll_interval=0.5):
+        with self.commands.batch():
+            writer = threading.Thread(target=self._writer, daemon=True)
+            writer.start()
+            try:
+                super().serve_forever(poll_interval)
+            finally:
+                self._stopping.set()
+                self._dirty.set()
+                writer.join()
+                self._flush()
+
+
+def run_api(host=None, port=None, ready=None):
+    server = ApiServer((host or config.API_HOST, port or config.API_PORT))
+    host, port = server.server_address[:2]
+    print(f"Serving HTTP API on http://{host}:{port}, press Ctrl+C to stop")
+    if ready is not None:
+        ready()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.commands.flush()
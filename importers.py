@@ -0,0 +1,196 @@
+import csv
+import json
+import os
+import re
+from collections import deque
+from datetime import date, datetime
+from itertools import islice
+from config import DOB_FORMAT
+from contactbook import Contact
+
+
+# unparseable rows are rejected with this in place of field names
+BAD_ROW = "format"
+
+# errors that stop an import: undecodable bytes, broken CSV quoting
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+# vCard property -> contact field; only the first value of each is kept
+VCARD_FIELDS = {
+    "FN": "name",
+    "TEL": "phone",
+    "EMAIL": "email",
+    "BDAY": "dob",
+    "ADR": "addr",
+}
+VCARD_SPLIT_RE = re.compile(r"(?<!\\)[;,]")
+VCARD_ESCAPES = {"\\n": " ", "\\N": " ", "\\,": ",", "\\;": ";", "\\\\": "\\"}
+VCARD_ESCAPE_RE = re.compile(r"\\[nN,;\\]")
+
+
+def _known(row):
+    # unknown columns (an exported id, say) are ignored
+    return {
+        field: value for field, value in row.items()
+        if field in Contact.__annotations__ and value is not None
+    }
+
+
+def read_csv(f):
+    """(line, fields) pairs of a CSV file with a header of field names."""
+    reader = csv.DictReader(f)
+    if reader.fieldnames is not None:
+        reader.fieldnames = [
+            name.strip().lower() for name in reader.fieldnames
+        ]
+    for row in reader:
+        yield reader.line_num, _known(row)
+
+
+def read_jsonl(f):
+    """(line, fields) pairs of a file with one JSON object per line."""
+    for line, text in enumerate(f, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            yield line, None
+            continue
+        yield line, _known(row) if isinstance(row, dict) else None
+
+
+def _vcard_lines(f):
+    # unfold continuation lines, which start with a space or a tab
+    start, logical = 0, None
+    for line, text in enumerate(f, 1):
+        text = text.rstrip("\r\n")
+        if text[:1] in (" ", "\t") and logical is not None:
+            logical += text[1:]
+            continue
+        if logical is not None:
+            yield start, logical
+        start, logical = line, text
+    if logical is not None:
+        yield start, logical
+
+
+def _unescape(text):
+    return VCARD_ESCAPE_RE.sub(lambda m: VCARD_ESCAPES[m.group()], text)
+
+
+def _vcard_value(field, value):
+    if field == "addr":
+        # ;;street;city;region;code;country, empty parts are dropped
+        parts = (
+            _unescape(part).strip() for part in VCARD_SPLIT_RE.split(value)
+        )
+        return ", ".join(part for part in parts if part)
+    value = _unescape(value).strip()
+    if field == "dob":
+        try:
+            # 1990-05-17, 19900517, optionally with a time part
+            value = date.fromisoformat(value.split("T")[0]).strftime(
+                DOB_FORMAT
+            )
+        except ValueError:
+            pass
+    return value
+
+
+def read_vcard(f):
+    """(line, fields) pairs of the cards in a vCard (.vcf) file."""
+    fields = None
+    for line, text in _vcard_lines(f):
+        name, _, value = text.partition(":")
+        # drop the group prefix and parameters: item1.TEL;TYPE=cell
+        name = name.split(";")[0].rpartition(".")[2].upper()
+        if name == "BEGIN" and value.upper() == "VCARD":
+            start, fields = line, {}
+        elif fields is None:
+            continue
+        elif name == "END" and value.upper() == "VCARD":
+            yield start, fields
+            fields = None
+        elif name in VCARD_FIELDS and VCARD_FIELDS[name] not in fields:
+            field = VCARD_FIELDS[name]
+            fields[field] = _vcard_value(field, value)
+
+
+READERS = {
+    ".csv": read_csv,
+    ".jsonl": read_jsonl,
+    ".ndjson": read_jsonl,
+    ".vcf": read_vcard,
+    ".vcard": read_vcard,
+}
+
+
+def reader_for(path):
+    """The reader for a file by its extension, or None."""
+    return READERS.get(os.path.splitext(path)[1].lower())
+
+
+def batches(rows, size):
+    """Lists of at most `size` rows, read lazily."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def check_batch(rows):
+    """Validate and normalize a batch of (line, fields) rows.
+
+    Returns (accepted, rejected): fields ready for Contact._restore,
+    with a normalized phone and the birthday as a datetime, and
+    (line, fields, invalid field names) for the rows that fail the
+    Contact validators.
+    """
+    accepted, rejected = [], []
+    for line, fields in rows:
+        invalid = (
+            [BAD_ROW] if fields is None else Contact.rejected_fields(fields)
+        )
+        if invalid:
+            rejected.append((line, fields, invalid))
+            continue
+        fields = {"addr": "", **fields}
+        fields["phone"] = Contact.phone_normalize(fields["phone"])
+        fields["dob"] = datetime.strptime(fields["dob"], DOB_FORMAT)
+        accepted.append(fields)
+    return accepted, rejected
+
+
+def checked_batches(batches, workers=1):
+    """check_batch() results of `batches`, in input order.
+
+    With more than one worker the batches are checked in a pool of
+    processes. At most two batches per worker are in flight, so memory
+    stays bounded however long the input is, and results are yielded
+    in submission order, so ids follow the order of the file.
+    """
+    if workers <= 1:
+        yield from map(check_batch, batches)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append(pool.submit(check_batch, batch))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # the import stopped early: don't wait for queued batches
+            for future in pending:
+                future.cancel()
+
+
+def write_rejects(f, rejected):
+    """Append rejected rows to an open file as JSON Lines."""
+    for line, fields, invalid in rejected:
+        record = {"line": line, "invalid": invalid, "row": fields}
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,385 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from functools import cache
+
+
+class FuzzyMatcher:
+    """Fuzzy name matching over a cached, pre-processed list of names.
+
+    The list is rebuilt from `source` (a callable returning the distinct
+    names) on the first query after invalidate().
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._names = None
+        self._choices = None
+
+    def invalidate(self):
+        self._names = self._choices = None
+
+    def match(self, query, limit, score_cutoff):
+        # imported on first use to keep startup fast
+        from rapidfuzz import fuzz, process, utils
+
+        if self._choices is None:
+            self._names = list(self.source())
+            self._choices = [utils.default_process(n) for n in self._names]
+        matches = process.extract(
+            utils.default_process(query),
+            self._choices,
+            scorer=fuzz.WRatio,
+            processor=None,
+            limit=limit,
+            score_cutoff=score_cutoff,
+        )
+        return [(self._names[i], score) for _, score, i in matches]
+
+
+class NameIndex:
+    """name -> ids map, exact and case-folded, for constant-time lookups.
+
+    Keeps the name each id was indexed under, so an entry can be removed
+    even after the contact object itself has been modified in place.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.folded = {}
+        self._names = {}
+        self.fuzzy = FuzzyMatcher(self.exact.keys)
+
+    def add(self, contact_id, contact):
+        name = contact.name
+        if name is None:
+            return
+        self._names[contact_id] = name
+        if name not in self.exact:
+            self.fuzzy.invalidate()
+        self.exact.setdefault(name, set()).add(contact_id)
+        self.folded.setdefault(name.casefold(), set()).add(contact_id)
+
+    def remove(self, contact_id):
+        name = self._names.pop(contact_id, None)
+        if name is None:
+            return
+        _discard(self.exact, name, contact_id)
+        _discard(self.folded, name.casefold(), contact_id)
+        if name not in self.exact:
+            self.fuzzy.invalidate()
+
+    def rebuild(self, items):
+        self.__init__()
+        for contact_id, contact in items:
+            self.add(contact_id, contact)
+
+    def lookup(self, name, ignore_case=False):
+        if ignore_case:
+            return self.folded.get(name.casefold(), set())
+        return self.exact.get(name, set())
+
+
+class BirthdayIndex:
+    """Sorted (month, day, id) keys for day-of-year range queries.
+
+    Feb 29 is stored as is; birthday_windows() stretches Feb 28 ranges
+    of non-leap years to cover it.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self._keys = {}
+
+    def add(self, contact_id, contact):
+        dob = _field(contact, "dob")
+        if dob is None:
+            return
+        key = (dob.month, dob.day, contact_id)
+        self._keys[contact_id] = key
+        insort(self.keys, key)
+
+    def remove(self, contact_id):
+        key = self._keys.pop(contact_id, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+    def rebuild(self, items):
+        self.__init__()
+        for contact_id, contact in items:
+            dob = _field(contact, "dob")
+            if dob is not None:
+                self._keys[contact_id] = (dob.month, dob.day, contact_id)
+        self.keys = sorted(self._keys.values())
+
+    def between(self, low, high):
+        """Ids with (month, day) in the inclusive range [low, high]."""
+        start = bisect_left(self.keys, low)
+        end = bisect_left(self.keys, (high[0], high[1] + 1))
+        return [key[2] for key in self.keys[start:end]]
+
+
+class ContactColumns:
+    """Columnar mirror of birthdays: parallel arrays of contact ids and
+    birth years, months and days.
+
+    Whole-book queries (birthdays in a window, age brackets, birth year
+    ranges) run as vectorized masks over the columns with NumPy when it
+    is installed and as a loop over the same arrays otherwise. Removing
+    a contact moves the last row into its place, so updates are O(1).
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.years = array("h")
+        self.months = array("b")
+        self.days = array("b")
+        self._rows = {}
+
+    def _columns(self):
+        return self.ids, self.years, self.months, self.days
+
+    def add(self, contact_id, contact):
+        dob = _field(contact, "dob")
+        if dob is None:
+            return
+        row = self._rows.get(contact_id)
+        values = (contact_id, dob.year, dob.month, dob.day)
+        if row is None:
+            self._rows[contact_id] = len(self.ids)
+            for column, value in zip(self._columns(), values):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns(), values):
+                column[row] = value
+
+    def remove(self, contact_id):
+        row = self._rows.pop(contact_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            self._rows[self.ids[last]] = row
+            for column in self._columns():
+                column[row] = column[last]
+        for column in self._columns():
+            column.pop()
+
+    def rebuild(self, items):
+        self.__init__()
+        for contact_id, contact in items:
+            self.add(contact_id, contact)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _views(self, np):
+        # zero-copy views; they must not outlive the query, as arrays
+        # cannot grow while a buffer is exported
+        return (
+            np.frombuffer(self.ids, dtype=np.int64),
+            np.frombuffer(self.years, dtype=np.int16),
+            np.frombuffer(self.months, dtype=np.int8).astype(np.int16),
+            np.frombuffer(self.days, dtype=np.int8).astype(np.int16),
+        )
+
+    def birthdays(self, windows):
+        """Ids with birthdays in the inclusive (month, day) windows,
+        ordered by window, then date, then id."""
+        np = _numpy()
+        found = []
+        if np is None or not self.ids:
+            for low, high in windows:
+                found += [row[2] for row in sorted(
+                    row for row in zip(self.months, self.days, self.ids)
+                    if low <= row[:2] <= high
+                )]
+            return found
+        ids, _, months, days = self._views(np)
+        keys = months * 32 + days
+        for low, high in windows:
+            mask = (keys >= low[0] * 32 + low[1])
+            mask &= keys <= high[0] * 32 + high[1]
+            selected = ids[mask]
+            order = np.lexsort((selected, keys[mask]))
+            found += selected[order].tolist()
+        return found
+
+    def born_between(self, first, last):
+        """Sorted ids of contacts born in years first..last."""
+        np = _numpy()
+        if np is None or not self.ids:
+            return sorted(
+                id for id, year in zip(self.ids, self.years)
+                if first <= year <= last
+            )
+        ids, years, _, _ = self._views(np)
+        return np.sort(ids[(years >= first) & (years <= last)]).tolist()
+
+    def age_histogram(self, today, width):
+        """[(first age of bracket, contacts)] for non-empty brackets."""
+        np = _numpy()
+        today_key = (today.month, today.day)
+        if np is None or not self.ids:
+            counts = Counter()
+            for year, month, day in zip(self.years, self.months, self.days):
+                age = today.year - year - ((month, day) > today_key)
+                counts[max(age, 0) // width] += 1
+            return [(b * width, counts[b]) for b in sorted(counts)]
+        _, years, months, days = self._views(np)
+        later = (months > today.month) | (
+            (months == today.month) & (days > today.day)
+        )
+        ages = np.maximum(today.year - years.astype(np.int32) - later, 0)
+        counts = np.bincount(ages // width)
+        return [
+            (int(b) * width, int(counts[b])) for b in np.flatnonzero(counts)
+        ]
+
+
+class TrigramIndex:
+    """Trigram -> ids postings for substring search over one field.
+
+    Candidates are the intersection of the query's trigram postings and
+    are then verified against the stored lower-cased value, so results
+    are the same as a plain `in` check over every contact.
+    """
+
+    N = 3
+
+    def __init__(self, field):
+        self.field = field
+        self.postings = {}
+        self.values = {}
+
+    def add(self, contact_id, contact):
+        value = _field(contact, self.field)
+        if value is None:
+            return
+        text = str(value).lower()
+        self.values[contact_id] = text
+        for gram in _trigrams(text):
+            self.postings.setdefault(gram, set()).add(contact_id)
+
+    def remove(self, contact_id):
+        text = self.values.pop(contact_id, None)
+        if text is None:
+            return
+        for gram in _trigrams(text):
+            _discard(self.postings, gram, contact_id)
+
+    def rebuild(self, items):
+        self.__init__(self.field)
+        for contact_id, contact in items:
+            self.add(contact_id, contact)
+
+    def search(self, value):
+        """Sorted ids whose field contains value (already lower-cased)."""
+        if len(value) < self.N:
+            candidates = self.values.keys()
+        else:
+            postings = sorted(
+                (self.postings.get(gram, ()) for gram in _trigrams(value)),
+                key=len,
+            )
+            if not postings[0]:
+                return []
+            candidates = postings[0].intersection(*postings[1:])
+        values = self.values
+        return sorted(id for id in candidates if value in values[id])
+
+
+class TitleIndex:
+    """lower-cased title -> titles, for case-insensitive note lookup."""
+
+    def __init__(self):
+        self.titles = {}
+
+    def add(self, title, note):
+        self.titles.setdefault(title.lower(), set()).add(title)
+
+    def remove(self, title):
+        _discard(self.titles, title.lower(), title)
+
+    def rebuild(self, items):
+        self.__init__()
+        for title, note in items:
+            self.add(title, note)
+
+    def lookup(self, title):
+        return self.titles.get(title.lower(), set())
+
+
+class TagIndex:
+    """lower-cased tag -> note titles, plus live usage count of each tag.
+
+    Counts are kept per tag as written, the way list_all_tags shows them.
+    """
+
+    def __init__(self):
+        self.titles = {}
+        self.counts = Counter()
+        self._tags = {}
+
+    def add(self, title, note):
+        tags = list(note.get('tags', []))
+        self._tags[title] = tags
+        self.counts.update(tags)
+        for tag in {tag.lower() for tag in tags}:
+            self.titles.setdefault(tag, set()).add(title)
+
+    def remove(self, title):
+        tags = self._tags.pop(title, None)
+        if tags is None:
+            return
+        self.counts.subtract(tags)
+        for tag in tags:
+            if self.counts[tag] <= 0:
+                del self.counts[tag]
+        for tag in {tag.lower() for tag in tags}:
+            _discard(self.titles, tag, title)
+
+    def rebuild(self, items):
+        self.__init__()
+        for title, note in items:
+            self.add(title, note)
+
+    def lookup(self, tags, match_all=False):
+        """Titles having all (or any) of the lower-cased tags."""
+        postings = [self.titles.get(tag, set()) for tag in tags]
+        if not postings:
+            return set()
+        if match_all:
+            postings.sort(key=len)
+            return postings[0].intersection(*postings[1:])
+        return set().union(*postings)
+
+
+@cache
+def _numpy():
+    # optional, imported on the first columnar query
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _field(contact, field):
+    try:
+        return getattr(contact, field)
+    except (AttributeError, KeyError):
+        return None
+
+
+def _discard(index, key, value):
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.discard(value)
+    if not ids:
+        del index[key]
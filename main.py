@@ -1,49 +1,329 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+from collections.abc import Generator
 from commands import BotCommands
-from colorama import Fore, Style
-from typing import Generator
+from metrics import Stopwatch
+from results import Listing, RENDERERS, render
 
+MORE_PROMPT = "-- more (Enter: next page, q: quit) --"
 
-def main():
+# modules whose import time --startup-profile reports, dependencies first
+PROFILED_MODULES = (
+    "config", "persistence", "indexes", "contactbook", "notes", "registry",
+    "results", "metrics", "commands",
+)
+
+
+def main(argv=None):
+    global _profile_started
+    args = parse_args(argv)
+    if args.startup_profile:
+        _profile_started = time.perf_counter()
+    try:
+        return _main(args)
+    finally:
+        # one-shot commands and scripts are ready only when done
+        startup_done()
+
+
+def _main(args):
+    if args.command:
+        return run_once(args.command, args.format)
+    if args.api:
+        from http_api import run_api
+
+        run_api(args.host, args.port, ready=startup_done)
+        return
+    if args.serve:
+        from server import run_server
+
+        run_server(args.socket, args.host, args.port, ready=startup_done)
+        return
+    if args.script is not None:
+        with open(args.script, encoding="utf-8") as script:
+            _profiled.append(run_script(script, output_format=args.format))
+        return
+    if not sys.stdin.isatty():
+        _profiled.append(run_script(sys.stdin, output_format=args.format))
+        return
     print(
         "Hello! This is CLI bot. Please enter command.\n"
         "Type 'help' for available commands list"
     )
     command_processor = BotCommands()
+    _profiled.append(command_processor)
+    startup_done()
     while not command_processor.done:
         console_line = ""
         while console_line == "":
             console_line = input(">")
-        command, params = parse_input(console_line)
-        handler_name = command + "_handler"
-        if handler_name in dir(command_processor):
-            handler = getattr(command_processor, handler_name)
+        run_command(
+            command_processor, console_line, input, terminal_page_size(),
+            args.format,
+        )
+    command_processor.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="cli-bot")
+    parser.add_argument(
+        "--script", metavar="FILE",
+        help="run commands from FILE instead of the interactive prompt",
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="serve sessions over a unix socket (or TCP with --port)",
+    )
+    parser.add_argument(
+        "--api", action="store_true",
+        help="serve the HTTP/JSON API (on --host/--port)",
+    )
+    parser.add_argument(
+        "--startup-profile", action="store_true",
+        help="print import and initialization times",
+    )
+    parser.add_argument(
+        "--format", choices=RENDERERS, default="table",
+        help="output format of command results (default: table)",
+    )
+    parser.add_argument("--socket", metavar="PATH")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument(
+        "command", nargs=argparse.REMAINDER,
+        help="run a single command and exit, e.g. upcoming_birthdays 7",
+    )
+    return parser.parse_args(argv)
+
+
+# BotCommands instances whose store load times are profiled
+_profiled = []
+# perf_counter() at the start of main() while a profile is pending
+_profile_started = None
+
+
+def startup_done():
+    """Print the --startup-profile report, if one is pending.
+
+    Called at the first prompt and when serving starts, so the report
+    covers startup rather than the whole session.
+    """
+    global _profile_started
+    if _profile_started is not None:
+        started, _profile_started = _profile_started, None
+        print_startup_profile(started)
+
+
+def import_times(modules=PROFILED_MODULES):
+    """Import time of each of `modules` in a fresh interpreter.
+
+    Measured with `python -X importtime`: the modules of this process
+    are already imported, and timing them in place would need the entry
+    module to import them by hand. Each time includes the dependencies
+    that module imports first.
+    """
+    # only needed for --startup-profile
+    import subprocess
+
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         "import " + ", ".join(modules)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True,
+    )
+    times = {}
+    for line in done.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package,
+        # with nested imports indented
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2][1:] in modules:
+            times[parts[2][1:]] = int(parts[1]) / 1e6
+    return [(name, times[name]) for name in modules if name in times]
+
+
+def print_startup_profile(started):
+    since_main = time.perf_counter() - started
+    imported = import_times()
+    rows = [(f"import {name}", elapsed) for name, elapsed in imported]
+    rows.append(("imports total", sum(elapsed for _, elapsed in imported)))
+    for command_processor in _profiled:
+        for name in BotCommands.STORES:
+            elapsed = command_processor.load_times.get(name)
+            rows.append((
+                f"load {name}",
+                "not loaded" if elapsed is None else elapsed,
+            ))
+    rows.append(("since main()", since_main))
+    print("Startup profile:")
+    for label, elapsed in rows:
+        if isinstance(elapsed, float):
+            elapsed = f"{elapsed * 1000:8.1f} ms"
+        print(f"    {label.ljust(24)}{elapsed}")
+
+
+def run_once(argv, output_format="table"):
+    """Run the command given on the command line and exit.
+
+    Commands that cannot change anything open the stores read-only.
+    Returns the process exit code.
+    """
+    console_line = argv_to_line(argv)
+    command, _ = parse_input(console_line)
+    spec = BotCommands.registry.get(command)
+    command_processor = BotCommands(
+        read_only=spec is not None and spec.read_only
+    )
+    _profiled.append(command_processor)
+    run_command(
+        command_processor, console_line, input, output_format=output_format
+    )
+    command_processor.flush()
+    return 0 if spec is not None else 2
+
+
+def argv_to_line(argv):
+    # shell words with spaces become quoted params of parse_input
+    return " ".join(f'"{arg}"' if " " in arg else arg for arg in argv)
+
+
+def run_script(lines, command_processor=None, output_format="table"):
+    """Run commands read line by line from `lines`.
+
+    Prompts of interactive commands are answered by the lines that
+    follow the command. Blank lines and lines starting with '#' between
+    commands are skipped. Store writes are deferred to a single write
+    once the script ends.
+    """
+    if command_processor is None:
+        command_processor = BotCommands()
+    lines = (line.rstrip("\r\n") for line in lines)
+
+    def answer(prompt):
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError from None
+
+    with command_processor.batch():
+        for console_line in lines:
+            console_line = console_line.strip()
+            if not console_line or console_line.startswith("#"):
+                continue
+            run_command(
+                command_processor, console_line, answer,
+                output_format=output_format,
+            )
+            if command_processor.done:
+                break
+    return command_processor
+
+
+def run_command(
+    command_processor, console_line, ask, page_size=None,
+    output_format="table",
+):
+    metrics = command_processor.metrics
+    if metrics is None:
+        return _run_command(
+            command_processor, console_line, ask, page_size, output_format
+        )
+    stopwatch = Stopwatch()
+    _run_command(
+        command_processor, console_line, stopwatch.waiting(ask), page_size,
+        output_format,
+    )
+    command, _ = parse_input(console_line)
+    if command in command_processor.registry:
+        metrics.record(command, stopwatch.elapsed())
+
+
+def _run_command(
+    command_processor, console_line, ask, page_size, output_format
+):
+    session = execute(command_processor, console_line)
+    try:
+        prompt = next(session)
+        while True:
             try:
-                result = handler(params)
-                if isinstance(result, Generator):
-                    try:
-                        answ = next(result)
-                        while True:
-                            answ = result.send(input(answ))
-                    except StopIteration as done:
-                        print(done)
-                else:
-                    print(result)
-            except Exception as e:
-                print(f"Command failed. Unexpected error occurred: {e}")
-        else:
-            possible_commands = command_processor.find_similar(command)
-            if possible_commands:
-                cmd_list = " or ".join(possible_commands)
-                suggest = (
-                    f"Did you mean {Fore.RED}{cmd_list}"
-                    f"{Style.RESET_ALL}? "
-                )
-            else:
-                suggest = ""
-            print(
-                f"Command not recognized. {suggest}"
-                f"Type 'help' to print available commands"
+                answer = ask(prompt)
+            except EOFError:
+                session.close()
+                print(f"Command aborted: no answer for '{prompt}'")
+                return
+            prompt = session.send(answer)
+    except StopIteration as done:
+        try:
+            show(render(done.value, output_format), ask, page_size)
+        except Exception as e:
+            # listings are formatted while they are shown, after
+            # execute() has returned
+            command, _ = parse_input(console_line)
+            print(command_failed(command_processor, command, e))
+
+
+def terminal_page_size():
+    # leave a line for the pager prompt
+    return max(shutil.get_terminal_size().lines - 1, 1)
+
+
+def show(chunks, ask, page_size=None):
+    """Print rendered output as it comes, pausing every `page_size` lines."""
+    shown = 0
+    for chunk in chunks:
+        if page_size and shown >= page_size:
+            shown = 0
+            if ask(MORE_PROMPT).strip().lower() == "q":
+                chunks.close()
+                break
+        sys.stdout.write(chunk)
+        shown += chunk.count("\n")
+    print()
+
+
+def execute(command_processor, console_line):
+    """Run one command line as a generator.
+
+    Prompts of interactive commands are yielded and answers are sent
+    back in; the text to show the user is the return value.
+    """
+    command, params = parse_input(console_line)
+    handler = command_processor.handler_for(command)
+    if handler is None:
+        possible_commands = command_processor.find_similar(command)
+        if possible_commands:
+            from colorama import Fore, Style
+
+            cmd_list = " or ".join(possible_commands)
+            suggest = (
+                f"Did you mean {Fore.RED}{cmd_list}"
+                f"{Style.RESET_ALL}? "
             )
+        else:
+            suggest = ""
+        return (
+            f"Command not recognized. {suggest}"
+            f"Type 'help' to print available commands"
+        )
+    try:
+        result = handler(params)
+        if isinstance(result, Generator):
+            result = yield from result
+            return "" if result is None else str(result)
+        if isinstance(result, Listing):
+            return result
+        return str(result)
+    except Exception as e:
+        return command_failed(command_processor, command, e)
+
+
+def command_failed(command_processor, command, error):
+    """Record a failed command and return the message to show."""
+    if command_processor.metrics is not None:
+        command_processor.metrics.record_error(command)
+    return f"Command failed. Unexpected error occurred: {error}"
 
 
 def parse_input(line):
@@ -61,4 +341,4 @@ def parse_input(line):
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
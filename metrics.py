@@ -0,0 +1,156 @@
+import math
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class Histogram:
+    """Latency histogram with log-spaced buckets.
+
+    Each doubling of latency is split into STEPS buckets, so percentiles
+    are within ~4.5% of the exact value while memory stays bounded no
+    matter how many samples are recorded.
+    """
+
+    STEPS = 16
+    LOWEST = 1e-6
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        bucket = math.ceil(
+            math.log2(max(seconds, self.LOWEST) / self.LOWEST) * self.STEPS
+        )
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(self.count * p / 100), 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # upper bound of the bucket, never above the real maximum
+                return min(self.LOWEST * 2 ** (bucket / self.STEPS), self.max)
+        return self.max
+
+
+class Stats:
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class Metrics:
+    """Per-command latency, call and error counts, and store save times.
+
+    Shared by every session of a process; the lock only guards updates
+    since saves are recorded from write-behind threads.
+    """
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self):
+        self.commands = {}
+        self.saves = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, table, name):
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = Stats()
+        return stats
+
+    def record(self, command, seconds):
+        with self._lock:
+            stats = self._stats(self.commands, command)
+            stats.calls += 1
+            stats.latency.record(seconds)
+
+    def record_error(self, command):
+        with self._lock:
+            self._stats(self.commands, command).errors += 1
+
+    def record_save(self, store, seconds):
+        with self._lock:
+            stats = self._stats(self.saves, store)
+            stats.calls += 1
+            stats.latency.record(seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "commands": _summarize(self.commands, self.PERCENTILES),
+                "saves": _summarize(self.saves, self.PERCENTILES),
+            }
+
+    def report(self):
+        summary = self.summary()
+        if not summary["commands"] and not summary["saves"]:
+            return "No commands recorded yet"
+        columns = [f"p{p}" for p in self.PERCENTILES] + ["max"]
+        lines = []
+        for title, rows in (
+            ("Command", summary["commands"]), ("Store save", summary["saves"])
+        ):
+            if not rows:
+                continue
+            lines.append(
+                f"{title:<20}{'calls':>7}{'errors':>7}"
+                + "".join(f"{column + ' ms':>10}" for column in columns)
+            )
+            for name, row in rows.items():
+                lines.append(
+                    f"{name:<20}{row['calls']:>7}{row['errors']:>7}"
+                    + "".join(f"{row[c + '_ms']:>10.2f}" for c in columns)
+                )
+        return "\n".join(lines)
+
+
+def _summarize(table, percentiles):
+    summary = {}
+    for name in sorted(table):
+        stats = table[name]
+        row = {"calls": stats.calls, "errors": stats.errors}
+        for p in percentiles:
+            row[f"p{p}_ms"] = stats.latency.percentile(p) * 1000
+        row["max_ms"] = stats.latency.max * 1000
+        summary[name] = row
+    return summary
+
+
+class Stopwatch:
+    """Time spent running a command, leaving out waits for user input."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.waited = 0.0
+
+    @contextmanager
+    def paused(self):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.waited += perf_counter() - start
+
+    def waiting(self, ask):
+        def timed_ask(prompt):
+            with self.paused():
+                return ask(prompt)
+        return timed_ask
+
+    def elapsed(self):
+        return perf_counter() - self.started - self.waited
@@ -1,15 +1,171 @@
+import os
 import pickle
+import re
+from math import log
+from collections import Counter, UserDict
 from pickle import UnpicklingError
-from pathlib import Path
 from datetime import datetime
 import config
+from indexes import TagIndex, TitleIndex
+from persistence import WriteBehind, atomic_dump
+from results import DatedNoteList, NoteList, SearchHitList, TagList, page
+
+
+WORD_RE = re.compile(r"\w+")
+
+
+def search_terms(text):
+    return [word.lower() for word in WORD_RE.findall(text)]
+
+
+class NoteStorage(UserDict):
+    """In-memory {title: note} mapping with the lookups Notes uses.
+
+    Assignments and deletions keep the secondary indexes current; a note
+    edited in place is re-indexed by assigning it back.
+    """
+
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, notes=None):
+        self.titles = TitleIndex()
+        self.tags = TagIndex()
+        self.indexes = [self.titles, self.tags]
+        # insertion sequence, to report index hits in the usual order
+        self._order = {}
+        self._next_seq = 0
+        super().__init__()
+        if notes:
+            self.data.update(notes)
+            for title in self.data:
+                self._order[title] = self._next_seq
+                self._next_seq += 1
+            for index in self.indexes:
+                index.rebuild(self.data.items())
+
+    def __setitem__(self, title, note):
+        if title in self.data:
+            self._unindex(title)
+        else:
+            self._order[title] = self._next_seq
+            self._next_seq += 1
+        self.data[title] = note
+        for index in self.indexes:
+            index.add(title, note)
+
+    def __delitem__(self, title):
+        del self.data[title]
+        del self._order[title]
+        self._unindex(title)
+
+    def _unindex(self, title):
+        for index in self.indexes:
+            index.remove(title)
+
+    def _in_order(self, titles):
+        return [
+            (title, self.data[title])
+            for title in sorted(titles, key=self._order.__getitem__)
+        ]
+
+    def find_key(self, title):
+        titles = self.titles.lookup(title)
+        if not titles:
+            return None
+        # several titles may differ only in case: the oldest one wins
+        return min(titles, key=self._order.__getitem__)
+
+    def with_tags(self, tags, match_all=False):
+        if not tags:
+            return list(self.data.items()) if match_all else []
+        return self._in_order(self.tags.lookup(tags, match_all))
+
+    def tag_counts(self):
+        return dict(self.tags.counts)
+
+    def search(self, query, limit):
+        terms = set(search_terms(query))
+        if not terms or not self.data:
+            return []
+
+        matches = []
+        doc_freq = Counter()
+        total_len = 0
+        for title, note in self.data.items():
+            tokens = search_terms(f"{title} {note['content']}")
+            total_len += len(tokens)
+            counts = Counter(tokens)
+            present = terms.intersection(counts)
+            doc_freq.update(present)
+            if present == terms:
+                matches.append((title, note, counts, len(tokens)))
+
+        docs = len(self.data)
+        avg_len = total_len / docs or 1
+        k1, b = self.BM25_K1, self.BM25_B
+        hits = []
+        for title, note, counts, doc_len in matches:
+            score = 0.0
+            for term in terms:
+                idf = log(
+                    (docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5) + 1
+                )
+                tf = counts[term]
+                score += idf * tf * (k1 + 1) / (
+                    tf + k1 * (1 - b + b * doc_len / avg_len)
+                )
+            hits.append((title, _snippet(note['content'], terms), score))
+        hits.sort(key=lambda hit: hit[2], reverse=True)
+        return hits[:limit]
+
+
+def _snippet(text, terms, width=10):
+    words = text.split()
+    first = next(
+        (i for i, word in enumerate(words)
+         if terms.intersection(search_terms(word))),
+        0,
+    )
+    start = max(0, first - width // 2)
+    piece = [
+        f"[{word}]" if terms.intersection(search_terms(word)) else word
+        for word in words[start:start + width]
+    ]
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if start + width < len(words) else ""
+    return prefix + " ".join(piece) + suffix
 
 
 class Notes:
-    def __init__(self):
+    def __init__(self, read_only=False):
+        # read-only notes skip the tags migration and never save
+        self.read_only = read_only
         self.storage_file = config.NOTES_STORAGE
-        self.notes = self._load_from_file()
-        self._migrate_notes()
+        self.backend = config.NOTES_BACKEND
+        self.writer = WriteBehind(self._write, config.WRITE_BEHIND_DELAY)
+        if self.backend == "sqlite":
+            self.notes = self._open_sqlite()
+        else:
+            self.notes = NoteStorage(self._load_from_file())
+            if not read_only:
+                self._migrate_notes()
+
+    def _open_sqlite(self):
+        from sqlite_storage import SqliteNotesStorage
+
+        if self.read_only:
+            if not os.path.exists(config.NOTES_SQLITE):
+                return NoteStorage(self._load_from_file())
+            return SqliteNotesStorage(config.NOTES_SQLITE, read_only=True)
+        notes = SqliteNotesStorage(config.NOTES_SQLITE)
+        if not notes and os.path.exists(self.storage_file):
+            # first run on the sqlite backend: import the pickled notes
+            for title, note in self._load_from_file().items():
+                note.setdefault('tags', [])
+                notes[title] = note
+            notes.commit()
+        return notes
 
     @staticmethod
     def title_validator(title):
@@ -47,7 +203,7 @@ class Notes:
         return all(tag and len(tag) <= 20 for tag in tags)
 
     def _load_from_file(self):
-        if Path(self.storage_file).exists():
+        if os.path.exists(self.storage_file):
             try:
                 with open(self.storage_file, 'rb') as f:
                     return pickle.load(f)
@@ -56,8 +212,21 @@ class Notes:
         return {}
 
     def _save_to_file(self):
-        with open(self.storage_file, 'wb') as f:
-            pickle.dump(self.notes, f)
+        if self.read_only:
+            raise RuntimeError("Notes are opened read-only")
+        self.writer.schedule()
+
+    def flush(self):
+        self.writer.flush()
+
+    def deferred_writes(self):
+        return self.writer.deferred()
+
+    def _write(self):
+        if self.backend == "sqlite":
+            self.notes.commit()
+            return
+        atomic_dump(self.notes.data.copy(), self.storage_file)
 
     def _migrate_notes(self):
         migrated = False
@@ -69,11 +238,7 @@ class Notes:
             self._save_to_file()
 
     def _find_note_key(self, title):
-        title_lower = title.lower()
-        for key in self.notes.keys():
-            if key.lower() == title_lower:
-                return key
-        return None
+        return self.notes.find_key(title)
 
     def add_note(self, title, content, tags=""):
         if title not in self.notes:
@@ -139,7 +304,7 @@ class Notes:
         if new_title and new_title != found_key:
             if not self.title_validator(new_title):
                 return "Error: Invalid title format."
-            if self._find_note_key(new_title):
+            if self._find_note_key(new_title) not in (None, found_key):
                 return f"Note '{new_title}' already exists"
         else:
             new_title = None
@@ -345,25 +510,23 @@ class Notes:
         if not found_key:
             return f"Note '{title}' not found"
 
-        note = self.notes[found_key]
+        note = self.notes[found_key].copy()
 
         if new_title is not None and new_title != found_key:
-            if self._find_note_key(new_title):
+            if self._find_note_key(new_title) not in (None, found_key):
                 return f"Note '{new_title}' already exists"
-            self.notes[new_title] = note.copy()
             del self.notes[found_key]
             found_key = new_title
 
         if new_content is not None:
-            self.notes[found_key]['content'] = new_content
+            note['content'] = new_content
 
         if new_tags is not None:
             tags_list = self.normalize_tags(new_tags)
-            self.notes[found_key]['tags'] = tags_list
+            note['tags'] = tags_list
 
-        self.notes[found_key]['modified'] = (
-            datetime.now().strftime(config.DATETIME_FORMAT)
-        )
+        note['modified'] = datetime.now().strftime(config.DATETIME_FORMAT)
+        self.notes[found_key] = note
         self._save_to_file()
         return "Note updated successfully"
 
@@ -394,6 +557,7 @@ class Notes:
 
         note['tags'] = list(existing_tags)
         note['modified'] = datetime.now().strftime(config.DATETIME_FORMAT)
+        self.notes[found_key] = note
         self._save_to_file()
 
         tags_display = ', '.join(note['tags'])
@@ -415,135 +579,62 @@ class Notes:
 
         note['tags'] = list(current_tags)
         note['modified'] = datetime.now().strftime(config.DATETIME_FORMAT)
+        self.notes[found_key] = note
         self._save_to_file()
 
         tags_display = ', '.join(note['tags']) if note['tags'] else 'none'
         return f"Tags removed. Current tags: {tags_display}"
 
     def search_notes_by_tag(self, tag):
-        tag_lower = tag.lower()
-        found_notes = []
-
-        for title, note in self.notes.items():
-            note_tags = [t.lower() for t in note.get('tags', [])]
-            if tag_lower in note_tags:
-                content_preview = note["content"][:50]
-                if len(note["content"]) > 50:
-                    content_preview += "..."
-                found_notes.append(
-                    (title, content_preview, note.get('tags', []))
-                )
-
-        if found_notes:
-            result = (
-                f"Found {len(found_notes)} note(s) with tag '{tag}':\n"
-            )
-            for title, preview, tags in found_notes:
-                tags_str = ', '.join(tags) if tags else 'none'
-                result += (
-                    f"  - {title}: {preview}\n"
-                    f"    Tags: {tags_str}\n"
-                )
-            return result
-        else:
-            return f"No notes found with tag '{tag}'"
+        found_notes = self.notes.with_tags({tag.lower()})
+        return NoteList(
+            found_notes,
+            header=f"Found {len(found_notes)} note(s) with tag '{tag}':\n",
+            empty=f"No notes found with tag '{tag}'",
+        )
 
     def search_notes_by_tags(self, tags_str, match_all=False):
         tags_list = self.normalize_tags(tags_str)
         search_tags = set(tag.lower() for tag in tags_list)
-        found_notes = []
-
-        for title, note in self.notes.items():
-            note_tags = set(t.lower() for t in note.get('tags', []))
-
-            if match_all:
-                if search_tags.issubset(note_tags):
-                    found_notes.append((title, note))
-            else:
-                if search_tags & note_tags:
-                    found_notes.append((title, note))
-
-        if found_notes:
-            match_type = "all" if match_all else "any"
-            result = (
+        found_notes = self.notes.with_tags(search_tags, match_all)
+        match_type = "all" if match_all else "any"
+        return NoteList(
+            found_notes,
+            header=(
                 f"Found {len(found_notes)} note(s) with {match_type} "
                 f"tags '{tags_str}':\n"
-            )
-            for title, note in found_notes:
-                content_preview = note["content"][:50]
-                if len(note["content"]) > 50:
-                    content_preview += "..."
-                if note.get('tags'):
-                    tags_str_display = ', '.join(note.get('tags', []))
-                else:
-                    tags_str_display = 'none'
-                result += (
-                    f"  - {title}: {content_preview}\n"
-                    f"    Tags: {tags_str_display}\n"
-                )
-            return result
-        else:
-            return "No notes found with specified tags"
+            ),
+            empty="No notes found with specified tags",
+        )
 
     def list_all_tags(self):
-        tag_counts = {}
-
-        for note in self.notes.values():
-            for tag in note.get('tags', []):
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-
-        if not tag_counts:
-            return "No tags found"
-
-        sorted_tags = sorted(tag_counts.items())
-
-        result = "All tags:\n"
-        for tag, count in sorted_tags:
-            result += f"  - {tag} ({count})\n"
-
-        return result
+        return TagList(
+            sorted(self.notes.tag_counts().items()),
+            header="All tags:\n",
+            empty="No tags found",
+        )
 
     def sort_notes_by_tag(self, tag):
-        tag_lower = tag.lower()
-        found_notes = []
-
-        for title, note in self.notes.items():
-            note_tags = [t.lower() for t in note.get('tags', [])]
-            if tag_lower in note_tags:
-                found_notes.append((title, note))
-
-        if not found_notes:
-            return f"No notes found with tag '{tag}'"
-
+        found_notes = self.notes.with_tags({tag.lower()})
         found_notes.sort(key=lambda x: x[1]['modified'], reverse=True)
+        return DatedNoteList(
+            found_notes,
+            header=f"Notes with tag '{tag}' (sorted by date):\n",
+            empty=f"No notes found with tag '{tag}'",
+        )
 
-        result = f"Notes with tag '{tag}' (sorted by date):\n"
-        for title, note in found_notes:
-            content_preview = note["content"][:50]
-            if len(note["content"]) > 50:
-                content_preview += "..."
-            result += (
-                f"  - {title} (modified: {note['modified']})\n"
-                f"    {content_preview}\n"
-            )
-
-        return result
-
-    def list_all_notes(self):
-        if not self.notes:
-            return "No notes found"
+    def list_all_notes(self, limit=None, offset=0):
+        return NoteList(
+            page(self.notes.items(), limit, offset),
+            header="Your notes:\n",
+            empty="No notes found",
+        )
 
-        note_list = "Your notes:\n"
-        for title, note in self.notes.items():
-            content_preview = note["content"][:50]
-            if len(note["content"]) > 50:
-                content_preview += "..."
-            if note.get('tags'):
-                tags_str = ', '.join(note.get('tags', []))
-            else:
-                tags_str = 'none'
-            note_list += (
-                f"  - {title}: {content_preview}\n"
-                f"    Tags: {tags_str}\n"
-            )
-        return note_list
+    def search_notes(self, query, limit=None):
+        limit = limit or config.NOTES_SEARCH_LIMIT
+        hits = self.notes.search(query, limit)
+        return SearchHitList(
+            hits,
+            header=f"Found {len(hits)} note(s) matching '{query}':\n",
+            empty=f"No notes found matching '{query}'",
+        )
@@ -0,0 +1,235 @@
+import atexit
+import os
+import pickle
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pickle import UnpicklingError
+
+
+def atomic_dump(obj, path):
+    """Pickle obj into a temp file next to path and rename it over path.
+
+    Readers see either the old or the new file, never a half-written one.
+    """
+    # only needed once something is saved, kept out of startup
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory):
+    # makes the rename itself durable; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Append-only log of pickled change records kept next to a snapshot."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, records):
+        """Append records durably, or leave the file as it was.
+
+        A failed append (a full disk, say) is cut back to the old size:
+        a partial record left behind would stop replay() there, and the
+        records appended after it on retry would be dropped with it.
+        """
+        if not records:
+            return
+        data = b"".join(pickle.dumps(record) for record in records)
+        with open(self.path, 'ab', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(size)
+                raise
+
+    def replay(self, repair=True):
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            good = 0
+            while True:
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    break
+                except (UnpicklingError, ValueError, AttributeError):
+                    break
+                good = f.tell()
+                yield record
+            torn = good < os.fstat(f.fileno()).st_size
+        if torn and repair:
+            # a crash mid-append left a partial record: drop it so new
+            # records are not appended behind unreadable bytes
+            os.truncate(self.path, good)
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def clear(self):
+        if self.size():
+            open(self.path, 'wb').close()
+
+
+class IdAllocator:
+    """Monotonic id counter; an id is never handed out twice.
+
+    The counter only moves forward, so ids of deleted records are not
+    reused. The owner persists `next_id` next to its data.
+    """
+
+    def __init__(self, next_id=1):
+        self.next_id = next_id
+        self._lock = threading.Lock()
+
+    def allocate(self):
+        with self._lock:
+            allocated = self.next_id
+            self.next_id += 1
+        return allocated
+
+    def reserve(self, count):
+        """A block of `count` consecutive ids, as a range."""
+        with self._lock:
+            first = self.next_id
+            self.next_id += count
+        return range(first, first + count)
+
+    def seen(self, used_id):
+        # ids found in stored data are never allocated again
+        if used_id >= self.next_id:
+            self.next_id = used_id + 1
+
+
+class WriteBehind:
+    """Coalesces save requests into a single background write.
+
+    The first schedule() arms a timer; every request arriving before it
+    fires is served by the same write. flush() writes pending changes
+    immediately and runs for every live writer at interpreter exit.
+    With delay <= 0 writes happen synchronously. Inside deferred() no
+    write happens until the outermost block exits. `observe`, when set,
+    is called with the duration of every write.
+    """
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, write, delay):
+        self._write = write
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._held = 0
+        self.observe = None
+        WriteBehind._instances.add(self)
+
+    @property
+    def pending(self):
+        return self._dirty
+
+    def schedule(self):
+        with self._lock:
+            self._dirty = True
+            if self._held:
+                return
+            if self.delay <= 0 or self._timer is not None:
+                timer = None
+            else:
+                timer = self._timer = threading.Timer(self.delay, self._run)
+                timer.daemon = True
+        if self.delay <= 0:
+            self._run()
+        elif timer is not None:
+            timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._run(force=True)
+
+    @contextmanager
+    def deferred(self):
+        with self._lock:
+            self._held += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._held -= 1
+                release = not self._held
+            if release:
+                self.flush()
+
+    def _run(self, force=False):
+        with self._write_lock:
+            with self._lock:
+                if self._held and not force:
+                    # a timer armed before deferred(); the write is
+                    # done when the block exits
+                    self._timer = None
+                    return
+                dirty, self._dirty = self._dirty, False
+                self._timer = None
+            if not dirty:
+                return
+            try:
+                if self.observe is None:
+                    self._write()
+                    return
+                start = time.perf_counter()
+                self._write()
+                self.observe(time.perf_counter() - start)
+            except BaseException:
+                # still pending: the next schedule() or flush() retries
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    @classmethod
+    def flush_all(cls):
+        for writer in list(cls._instances):
+            writer.flush()
+
+
+atexit.register(WriteBehind.flush_all)
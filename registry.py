@@ -0,0 +1,156 @@
+from bisect import bisect_left
+from collections import namedtuple
+from collections.abc import Mapping
+from functools import cached_property
+from types import MappingProxyType
+
+
+# help is None when the helper has no 'help' entry; params is
+# ((param_name, validator or None), ...) and None for commands without
+# a helper: those only accept at most one parameter. read_only commands
+# never change a store (see read_only()).
+# (a plain namedtuple: importing typing costs more than the registry)
+class Command(namedtuple(
+    "Command", ["name", "handler", "helper", "help", "params", "read_only"]
+)):
+    __slots__ = ()
+
+    @property
+    def usage(self):
+        from colorama import Fore, Style
+
+        help_string = (
+            f"{Fore.RED}{self.name}{Style.RESET_ALL} command: {self.help}"
+            if self.help is not None else ""
+        )
+        return (
+            f"{help_string}\nCommand usage: {self.name} <"
+            + "> <".join(param for param, _ in self.params)
+            + ">"
+        )
+
+
+class CommandRegistry(Mapping):
+    """Immutable command name -> Command table of a CommandSet class.
+
+    Built once from the `<command>_handler` / `<command>_helper` method
+    pairs, so dispatch, validation and help never go through dir().
+    """
+
+    def __init__(self, commands):
+        self._commands = MappingProxyType(dict(commands))
+
+    @cached_property
+    def help_text(self):
+        from colorama import Fore, Style
+
+        return "".join(
+            f"    {Fore.RED}{name.ljust(20)}{Style.RESET_ALL}"
+            f"{cmd.help or ''}\n"
+            for name, cmd in sorted(self._commands.items())
+        )
+
+    def __getitem__(self, name):
+        return self._commands[name]
+
+    def __iter__(self):
+        return iter(self._commands)
+
+    def __len__(self):
+        return len(self._commands)
+
+    @cached_property
+    def suggester(self):
+        return CommandSuggester(self._commands)
+
+    def suggest(self, command):
+        return self.suggester.suggest(command)
+
+    @classmethod
+    def from_class(cls, commands_cls):
+        # helpers only describe commands, a bare instance is enough to
+        # call them without loading any store
+        prototype = object.__new__(commands_cls)
+        commands = {}
+        for attr in sorted(dir(commands_cls)):
+            if not attr.endswith("_handler"):
+                continue
+            name = attr.removesuffix("_handler")
+            helper = name + "_helper"
+            read_only = getattr(
+                getattr(commands_cls, attr), "read_only", False
+            )
+            if not hasattr(commands_cls, helper):
+                commands[name] = Command(
+                    name, attr, None, None, None, read_only
+                )
+                continue
+            meta = getattr(commands_cls, helper)(prototype)
+            params = tuple(
+                (param, value if callable(value) else None)
+                for param, value in meta.items() if param != 'help'
+            )
+            commands[name] = Command(
+                name, attr, helper, meta.get('help'), params, read_only
+            )
+        for alias, target in commands_cls.aliases.items():
+            commands[alias] = commands[target]._replace(
+                name=alias, help=f"alias for {target}"
+            )
+        return cls(commands)
+
+
+class CommandSuggester:
+    """'Did you mean' lookups over a frozen, sorted list of command names.
+
+    A command scores 1 when it starts with the query, 2 when it contains
+    it and its edit distance otherwise; the best scoring commands are
+    suggested unless the best score exceeds the query length. Prefixes
+    are found by bisection and distances are computed by rapidfuzz only
+    up to the best score already known.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(sorted(names))
+
+    def suggest(self, command):
+        from rapidfuzz import process
+        from rapidfuzz.distance import Levenshtein
+
+        names = self.names
+        scores = {}
+        i = bisect_left(names, command)
+        while i < len(names) and names[i].startswith(command):
+            scores[names[i]] = 1
+            i += 1
+        for name in names:
+            if command in name:
+                scores.setdefault(name, 2)
+        bound = min(scores.values(), default=len(command))
+        for name, dist, _ in process.extract(
+            command, names, scorer=Levenshtein.distance,
+            score_cutoff=bound, limit=None,
+        ):
+            scores.setdefault(name, dist)
+        best = min(scores.values(), default=None)
+        if best is None or len(command) < best:
+            return []
+        return sorted(name for name, score in scores.items() if score == best)
+
+
+def read_only(handler):
+    """Mark a command handler as never changing the stores."""
+    handler.read_only = True
+    return handler
+
+
+class CommandSet:
+    """Base for command classes: collects their registry at class creation."""
+
+    # alias -> command name, dispatched to the command's handler
+    aliases = {}
+    registry = CommandRegistry({})
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.registry = CommandRegistry.from_class(cls)
@@ -0,0 +1,306 @@
+import csv
+import io
+import json
+import re
+from abc import ABC, abstractmethod
+from itertools import islice
+import config
+
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def contact_json(contact_id, contact):
+    data = {"id": contact_id}
+    for field in ("name", "phone", "email", "dob", "addr"):
+        try:
+            value = getattr(contact, field)
+        except KeyError:
+            value = None
+        if field == "dob" and value is not None:
+            value = value.strftime(config.DOB_FORMAT)
+        data[field] = value
+    return data
+
+
+def note_json(title, note):
+    return {
+        "title": title,
+        "content": note["content"],
+        "tags": note.get("tags", []),
+        "created": note.get("created"),
+        "modified": note.get("modified"),
+    }
+
+
+class Message(str):
+    """Text result of a command; anything that is not a listing."""
+
+    fields = ("message",)
+
+    def table(self):
+        yield str(self)
+
+    def records(self):
+        yield {"message": ANSI_RE.sub("", self)}
+
+    def close(self):
+        pass
+
+
+class Listing(ABC):
+    """Items of a listing command, formatted only while they are shown.
+
+    Renderers pull one item at a time, either as a table row or as a
+    record for JSON/CSV, so the first line appears at once and a
+    listing is never held in memory as a whole. A listing can be
+    rendered once; str() renders the rest of it as a table.
+    """
+
+    fields = ()
+
+    def __init__(self, items, header="", empty=""):
+        self._items = iter(items)
+        self.header = header
+        self.empty = empty
+
+    @abstractmethod
+    def row(self, item):
+        """Table text of one item."""
+
+    @abstractmethod
+    def record(self, item):
+        """{field: value} of one item for JSON and CSV."""
+
+    def table(self):
+        first = next(self._items, None)
+        if first is None:
+            if self.empty:
+                yield self.empty
+            return
+        if self.header:
+            yield self.header
+        yield self.row(first)
+        for item in self._items:
+            yield self.row(item)
+
+    def records(self):
+        for item in self._items:
+            yield self.record(item)
+
+    def __str__(self):
+        return "".join(self.table())
+
+    def close(self):
+        close = getattr(self._items, "close", None)
+        if close is not None:
+            close()
+
+
+class ContactList(Listing):
+    """(id, Contact) pairs."""
+
+    fields = ("id", "name", "phone", "email", "dob", "addr")
+
+    def row(self, item):
+        id, contact = item
+        return (
+            f"{id}\t"
+            f"{contact.name}\t"
+            f"{contact.dob.strftime('%Y.%m.%d')}\t"
+            f"{contact.email}\t"
+            f"{contact.phone}\t"
+            f"{contact.addr}\n"
+        )
+
+    def record(self, item):
+        return contact_json(*item)
+
+
+class ScoredContactList(ContactList):
+    """(id, Contact, similarity score) triples of find_contact."""
+
+    fields = ("score",) + ContactList.fields
+
+    def row(self, item):
+        id, contact, score = item
+        return f"{score:.0f}%\t" + super().row((id, contact))
+
+    def record(self, item):
+        id, contact, score = item
+        return {"score": round(score, 1), **contact_json(id, contact)}
+
+
+class NoteList(Listing):
+    """(title, note) pairs."""
+
+    fields = ("title", "content", "tags", "created", "modified")
+
+    @staticmethod
+    def preview(note):
+        content_preview = note["content"][:50]
+        if len(note["content"]) > 50:
+            content_preview += "..."
+        return content_preview
+
+    def row(self, item):
+        title, note = item
+        tags_str = ', '.join(note.get('tags', [])) or 'none'
+        return (
+            f"  - {title}: {self.preview(note)}\n"
+            f"    Tags: {tags_str}\n"
+        )
+
+    def record(self, item):
+        return note_json(*item)
+
+
+class DatedNoteList(NoteList):
+    """Notes shown with their modification time instead of tags."""
+
+    def row(self, item):
+        title, note = item
+        return (
+            f"  - {title} (modified: {note['modified']})\n"
+            f"    {self.preview(note)}\n"
+        )
+
+
+class SearchHitList(Listing):
+    """(title, snippet, score) hits of the full-text note search."""
+
+    fields = ("title", "snippet", "score")
+
+    def row(self, item):
+        title, snippet, score = item
+        return f"  - {title} (score: {score:.2f})\n    {snippet}\n"
+
+    def record(self, item):
+        return dict(zip(self.fields, item))
+
+
+class TagList(Listing):
+    """(tag, number of notes) pairs."""
+
+    fields = ("tag", "count")
+
+    def row(self, item):
+        tag, count = item
+        return f"  - {tag} ({count})\n"
+
+    def record(self, item):
+        tag, count = item
+        return {"tag": tag, "count": count}
+
+
+class AgeBrackets(Listing):
+    """(first age, number of contacts) pairs of `width`-year brackets."""
+
+    fields = ("from_age", "to_age", "count")
+
+    def __init__(self, items, width, header="", empty=""):
+        super().__init__(items, header, empty)
+        self.width = width
+
+    def row(self, item):
+        first, count = item
+        return f"  {first}-{first + self.width - 1}: {count}\n"
+
+    def record(self, item):
+        first, count = item
+        return {
+            "from_age": first, "to_age": first + self.width - 1,
+            "count": count,
+        }
+
+
+def render_table(result):
+    return result.table()
+
+
+def render_json(result):
+    indent = config.JSON_INDENT
+    dump = json.JSONEncoder(
+        indent=indent, ensure_ascii=config.JSON_ENSURE_ASCII
+    ).encode
+    if not isinstance(result, Listing):
+        yield dump(next(result.records()))
+        return
+    if indent is None:
+        separator, item_prefix, end = ", ", "", "]"
+    else:
+        pad = " " * indent if isinstance(indent, int) else indent
+        separator, item_prefix, end = ",", "\n" + pad, "\n]"
+    yield "["
+    prefix = ""
+    for record in result.records():
+        text = dump(record)
+        if indent is not None:
+            text = text.replace("\n", item_prefix)
+        yield prefix + item_prefix + text
+        prefix = separator
+    yield end if prefix else "]"
+
+
+def render_csv(result):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, result.fields, lineterminator="\n")
+
+    def flush(line_prefix):
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line_prefix + line.removesuffix("\n")
+
+    writer.writeheader()
+    yield flush("")
+    for record in result.records():
+        writer.writerow({
+            field: ", ".join(value) if isinstance(value, list) else value
+            for field, value in record.items()
+        })
+        yield flush("\n")
+
+
+RENDERERS = {
+    "table": render_table,
+    "json": render_json,
+    "csv": render_csv,
+}
+
+
+def render(result, output_format="table"):
+    """Text chunks of a command result in the given output format."""
+    if not isinstance(result, (Message, Listing)):
+        result = Message("" if result is None else result)
+    return RENDERERS[output_format](result)
+
+
+def page(items, limit=None, offset=0):
+    """Slice an iterable of items without materializing it."""
+    stop = None if limit is None else offset + limit
+    return islice(items, offset, stop)
+
+
+def parse_paging(params):
+    """Read `--limit N` / `--offset N` options from command params.
+
+    Returns (limit, offset, other params); raises ValueError on bad
+    values or unknown options.
+    """
+    limit, offset, rest = None, 0, []
+    params = iter(params)
+    for param in params:
+        if param in ("--limit", "--offset"):
+            value = int(next(params, ""))
+            if value < 0:
+                raise ValueError(param)
+            if param == "--limit":
+                limit = value
+            else:
+                offset = value
+        elif param.startswith("--"):
+            raise ValueError(param)
+        else:
+            rest.append(param)
+    return limit, offset, rest
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import config
+from commands import BotCommands
+from main import command_failed, execute, parse_input
+from metrics import Stopwatch
+
+
+class BotServer:
+    """Serves many command sessions over one shared set of stores.
+
+    Each connection gets its own BotCommands (so `exit` only ends that
+    session) on top of the shared Contactbook and Notes; the "last
+    contact" of del_last_contact and edit_last_contact is per session.
+    Commands run on the event loop, so every step of a command sees a
+    consistent store; saving is left to a single writer task that
+    flushes both stores after changes. The flush runs on the loop too:
+    on another thread a commit could land between the statements of
+    one mutation.
+
+    Protocol: one JSON object per line. The client sends
+    {"input": "<command line or answer>"}, the server answers with
+    {"prompt": "..."} while a command waits for input and with
+    {"output": "...", "done": <session ended>} when it finishes.
+    """
+
+    def __init__(self, commands=None, delay=None):
+        self.commands = commands if commands is not None else BotCommands()
+        self.delay = config.WRITE_BEHIND_DELAY if delay is None else delay
+        self._dirty = asyncio.Event()
+
+    def session(self):
+        return BotCommands(shared=self.commands)
+
+    async def handle(self, reader, writer):
+        session = self.session()
+        try:
+            while not session.done:
+                message = await _receive(reader)
+                if message is None:
+                    break
+                if not await self._run(session, message, reader, writer):
+                    break
+        finally:
+            writer.close()
+
+    async def _run(self, session, message, reader, writer):
+        line = message.get("input", "")
+        stopwatch = Stopwatch()
+        command = execute(session, line)
+        try:
+            prompt = next(command)
+            while True:
+                with stopwatch.paused():
+                    await _send(writer, {"prompt": prompt})
+                    message = await _receive(reader)
+                if message is None:
+                    command.close()
+                    return False
+                prompt = command.send(message.get("input", ""))
+        except StopIteration as done:
+            self._dirty.set()
+            # listings are streamed lazily, the protocol sends them whole
+            try:
+                output = str(done.value)
+            except Exception as e:
+                command, _ = parse_input(line)
+                output = command_failed(session, command, e)
+            self._record(session, line, stopwatch)
+            await _send(writer, {"output": output, "done": session.done})
+        return True
+
+    @staticmethod
+    def _record(session, line, stopwatch):
+        if session.metrics is None or not line.strip():
+            return
+        command, _ = parse_input(line)
+        if command in session.registry:
+            session.metrics.record(command, stopwatch.elapsed())
+
+    async def _writer(self):
+        while True:
+            await self._dirty.wait()
+            # coalesce the changes of commands arriving meanwhile
+            await asyncio.sleep(self.delay)
+            self._dirty.clear()
+            self.commands.flush()
+
+    async def serve(self, path=None, host=None, port=None, started=None):
+        if port is not None:
+            server = await asyncio.start_server(
+                self.handle, host or config.SERVER_HOST, port
+            )
+        else:
+            path = path or config.SERVER_SOCKET
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self.handle, path)
+        # stores only save through the writer task while serving
+        with self.commands.batch():
+            writer_task = asyncio.create_task(self._writer())
+            try:
+                async with server:
+                    if started is not None:
+                        started.set_result(server)
+                    await server.serve_forever()
+            finally:
+                writer_task.cancel()
+                if port is None:
+                    os.unlink(path)
+
+
+async def _receive(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+    await writer.drain()
+
+
+def run_server(path=None, host=None, port=None, ready=None):
+    where = f"{host or config.SERVER_HOST}:{port}" if port else (
+        path or config.SERVER_SOCKET
+    )
+
+    async def serve():
+        started = asyncio.get_running_loop().create_future()
+        if ready is not None:
+            started.add_done_callback(lambda _: ready())
+        await BotServer().serve(path, host, port, started=started)
+
+    print(f"Serving on {where}, press Ctrl+C to stop")
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -25,7 +25,11 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/goit-pycore-project",
-    py_modules=["main", "commands", "contactbook", "notes", "config"],
+    py_modules=[
+        "main", "commands", "contactbook", "notes", "config", "persistence",
+        "sqlite_storage", "indexes", "registry", "server", "client",
+        "http_api", "results", "metrics", "importers",
+    ],
     packages=find_packages(),
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -42,9 +46,14 @@ setup(
     python_requires=">=3.8",
     setup_requires=["setuptools>=40.0.0"],
     install_requires=requirements,
+    extras_require={
+        # vectorized queries over the PHONEBOOK_COLUMNS mirror
+        "columns": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "cli-bot=main:main",
+            "cli-bot-client=client:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,501 @@
+import json
+import sqlite3
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from contactbook import Contact, birthday_windows
+from notes import search_terms
+from indexes import FuzzyMatcher
+
+
+CONTACT_FIELDS = ("name", "addr", "email", "phone", "dob")
+
+# column -> (function, field) it is derived from: lower-cased copies for
+# search() and the case-folded name for case-insensitive lookups, kept
+# in the table so queries need no per-row Python callback. sqlite
+# lower() only folds ASCII, names are mostly cyrillic.
+DERIVED_COLUMNS = {
+    "name_folded": ("casefold", "name"),
+    "name_lower": ("lower", "name"),
+    "addr_lower": ("lower", "addr"),
+    "email_lower": ("lower", "email"),
+}
+# column search() matches for each field; phone and dob have no letters
+SEARCH_COLUMNS = {
+    "name": "name_lower",
+    "addr": "addr_lower",
+    "email": "email_lower",
+    "phone": "phone",
+    "dob": "dob",
+}
+
+
+class SqliteContactStorage(MutableMapping):
+    """{id: Contact} mapping kept in an sqlite database.
+
+    Contacts are built on access, so the book is never loaded as a whole.
+    Mutations are written immediately but only become durable on commit().
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            addr TEXT,
+            email TEXT,
+            phone TEXT,
+            dob TEXT,
+            dob_month INTEGER,
+            dob_day INTEGER,
+            name_folded TEXT,
+            name_lower TEXT,
+            addr_lower TEXT,
+            email_lower TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        );
+    """
+
+    # substring search scans anyway, so phone and email are not indexed
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS contacts_name ON contacts (name);
+        CREATE INDEX IF NOT EXISTS contacts_name_folded
+            ON contacts (name_folded);
+        CREATE INDEX IF NOT EXISTS contacts_birthday
+            ON contacts (dob_month, dob_day);
+        DROP INDEX IF EXISTS contacts_phone;
+        DROP INDEX IF EXISTS contacts_email;
+    """
+
+    def __init__(self, path, read_only=False):
+        # commits run on the write-behind thread
+        self.db = _connect(path, read_only)
+        self.db.create_function("py_lower", 1, _lower, deterministic=True)
+        self.db.create_function(
+            "py_casefold", 1, _casefold, deterministic=True
+        )
+        if not read_only:
+            self.db.executescript(self.SCHEMA)
+            self._add_derived_columns()
+            self.db.executescript(self.INDEXES)
+        # a read-only database from before the derived columns computes
+        # them per row instead
+        self.columns = {
+            column: column if column in self._table_columns()
+            else f"py_{function}({field})"
+            for column, (function, field) in DERIVED_COLUMNS.items()
+        }
+        self.fuzzy = FuzzyMatcher(self._distinct_names)
+
+    def _table_columns(self):
+        cursor = self.db.execute("PRAGMA table_info(contacts)")
+        return {row[1] for row in cursor}
+
+    def _add_derived_columns(self):
+        # databases created before the derived columns get them filled
+        # once; the Python functions are only needed here
+        missing = DERIVED_COLUMNS.keys() - self._table_columns()
+        if not missing:
+            return
+        for column in DERIVED_COLUMNS:
+            if column in missing:
+                self.db.execute(
+                    f"ALTER TABLE contacts ADD COLUMN {column} TEXT"
+                )
+        self.db.execute("UPDATE contacts SET " + ", ".join(
+            f"{column} = py_{function}({field})"
+            for column, (function, field) in DERIVED_COLUMNS.items()
+        ))
+        self.db.commit()
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def bulk(self):
+        # sqlite maintains its indexes per row in O(log n)
+        return nullcontext(self)
+
+    @property
+    def next_id(self):
+        """Id counter of the contact book, see persistence.IdAllocator."""
+        try:
+            row = self.db.execute(
+                "SELECT value FROM meta WHERE key = 'next_id'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # read-only database created before the meta table
+            row = None
+        if row is None:
+            row = self.db.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM contacts"
+            ).fetchone()
+        return row[0]
+
+    @next_id.setter
+    def next_id(self, value):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('next_id', ?)", (value,)
+        )
+
+    def _distinct_names(self):
+        cursor = self.db.execute(
+            "SELECT DISTINCT name FROM contacts WHERE name IS NOT NULL"
+        )
+        return [row[0] for row in cursor]
+
+    @staticmethod
+    def _to_row(contact_id, contact):
+        data = contact.fields()
+        dob = data.get("dob")
+        return (
+            contact_id,
+            data.get("name"),
+            data.get("addr"),
+            data.get("email"),
+            data.get("phone"),
+            dob.isoformat(sep=" ") if dob else None,
+            dob.month if dob else None,
+            dob.day if dob else None,
+            *(
+                _FUNCTIONS[function](data.get(field))
+                for function, field in DERIVED_COLUMNS.values()
+            ),
+        )
+
+    @staticmethod
+    def _from_row(row):
+        fields = dict(zip(CONTACT_FIELDS, row))
+        if fields["dob"] is not None:
+            fields["dob"] = datetime.fromisoformat(fields["dob"])
+        return Contact._restore(
+            {k: v for k, v in fields.items() if v is not None}
+        )
+
+    def _select(self, where="", params=()):
+        cursor = self.db.execute(
+            "SELECT id, name, addr, email, phone, dob FROM contacts "
+            f"{where} ORDER BY id",
+            params,
+        )
+        return {row[0]: self._from_row(row[1:]) for row in cursor}
+
+    def __getitem__(self, contact_id):
+        row = self.db.execute(
+            "SELECT name, addr, email, phone, dob FROM contacts WHERE id = ?",
+            (contact_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(contact_id)
+        return self._from_row(row)
+
+    def __setitem__(self, contact_id, contact):
+        self.fuzzy.invalidate()
+        self.db.execute(
+            "INSERT OR REPLACE INTO contacts "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._to_row(contact_id, contact),
+        )
+
+    def __delitem__(self, contact_id):
+        self.fuzzy.invalidate()
+        cursor = self.db.execute(
+            "DELETE FROM contacts WHERE id = ?", (contact_id,)
+        )
+        if not cursor.rowcount:
+            raise KeyError(contact_id)
+
+    def __contains__(self, contact_id):
+        return self.db.execute(
+            "SELECT 1 FROM contacts WHERE id = ?", (contact_id,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        cursor = self.db.execute("SELECT id FROM contacts ORDER BY id")
+        return (row[0] for row in cursor)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def items(self):
+        cursor = self.db.execute(
+            "SELECT id, name, addr, email, phone, dob FROM contacts "
+            "ORDER BY id"
+        )
+        return ((row[0], self._from_row(row[1:])) for row in cursor)
+
+    def values(self):
+        return (contact for _, contact in self.items())
+
+    def find_by_name(self, name, ignore_case=False):
+        if ignore_case:
+            return self._select(
+                f"WHERE {self.columns['name_folded']} = ?",
+                (name.casefold(),),
+            )
+        return self._select("WHERE name = ?", (name,))
+
+    def find_similar_names(self, name, limit, score_cutoff):
+        return self.fuzzy.match(name, limit, score_cutoff)
+
+    def search(self, key, value):
+        if key not in SEARCH_COLUMNS:
+            return {}
+        column = SEARCH_COLUMNS[key]
+        # key is checked against the column whitelist above
+        return self._select(
+            f"WHERE instr({self.columns.get(column, column)}, ?) > 0",
+            (str(value).lower(),),
+        )
+
+    def birthdays(self, today, days):
+        windows = birthday_windows(today, days)
+        if not windows:
+            return {}
+        where = " OR ".join(
+            "(dob_month, dob_day) BETWEEN (?, ?) AND (?, ?)" for _ in windows
+        )
+        params = [part for low, high in windows for part in (*low, *high)]
+        return self._select(f"WHERE {where}", params)
+
+    def born_between(self, first, last):
+        # dob is stored as ISO text, so years compare as strings
+        return self._select(
+            "WHERE dob >= ? AND dob < ?", (f"{first:04d}", f"{last + 1:04d}")
+        )
+
+    def age_histogram(self, today, width):
+        cursor = self.db.execute(
+            "SELECT MAX(age, 0) / ? AS bracket, COUNT(*) FROM ("
+            "  SELECT ? - CAST(substr(dob, 1, 4) AS INTEGER)"
+            "    - ((dob_month, dob_day) > (?, ?)) AS age"
+            "  FROM contacts WHERE dob IS NOT NULL"
+            ") GROUP BY bracket ORDER BY bracket",
+            (width, today.year, today.month, today.day),
+        )
+        return [(bracket * width, count) for bracket, count in cursor]
+
+
+class SqliteNotesStorage(MutableMapping):
+    """{title: note} mapping kept in sqlite with an FTS5 full-text index.
+
+    Tags live in a join table so tag queries are index lookups, and
+    title/content are mirrored into an external-content FTS5 table by
+    triggers for BM25-ranked search.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE,
+            title_folded TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created TEXT,
+            modified TEXT
+        );
+        CREATE INDEX IF NOT EXISTS notes_title_folded
+            ON notes (title_folded);
+        CREATE TABLE IF NOT EXISTS note_tags (
+            note_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            tag_folded TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS note_tags_folded
+            ON note_tags (tag_folded, note_id);
+        CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, content,
+            content='notes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO notes_fts (rowid, title, content)
+            VALUES (new.id, new.title, new.content);
+        END;
+    """
+
+    SELECT = """
+        SELECT title, content, created, modified,
+            (SELECT json_group_array(tag) FROM (
+                SELECT tag FROM note_tags
+                WHERE note_id = notes.id ORDER BY position
+            ))
+        FROM notes
+    """
+
+    def __init__(self, path, read_only=False):
+        # commits run on the write-behind thread
+        self.db = _connect(path, read_only)
+        if not read_only:
+            self.db.executescript(self.SCHEMA)
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _from_row(row):
+        title, content, created, modified, tags = row
+        return title, {
+            "content": content,
+            "created": created,
+            "modified": modified,
+            "tags": json.loads(tags),
+        }
+
+    def _select(self, where="", params=()):
+        cursor = self.db.execute(
+            f"{self.SELECT} {where} ORDER BY id", params
+        )
+        return [self._from_row(row) for row in cursor]
+
+    def _note_id(self, title):
+        row = self.db.execute(
+            "SELECT id FROM notes WHERE title = ?", (title,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def __getitem__(self, title):
+        row = self.db.execute(
+            f"{self.SELECT} WHERE title = ?", (title,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(title)
+        return self._from_row(row)[1]
+
+    def __setitem__(self, title, note):
+        note_id = self._note_id(title)
+        values = (
+            note["content"], note.get("created"), note.get("modified"),
+        )
+        if note_id is None:
+            note_id = self.db.execute(
+                "INSERT INTO notes "
+                "(title, title_folded, content, created, modified) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (title, title.lower(), *values),
+            ).lastrowid
+        else:
+            self.db.execute(
+                "UPDATE notes SET content = ?, created = ?, modified = ? "
+                "WHERE id = ?",
+                (*values, note_id),
+            )
+            self.db.execute(
+                "DELETE FROM note_tags WHERE note_id = ?", (note_id,)
+            )
+        self.db.executemany(
+            "INSERT INTO note_tags VALUES (?, ?, ?, ?)",
+            [
+                (note_id, position, tag, tag.lower())
+                for position, tag in enumerate(note.get("tags", []))
+            ],
+        )
+
+    def __delitem__(self, title):
+        note_id = self._note_id(title)
+        if note_id is None:
+            raise KeyError(title)
+        self.db.execute("DELETE FROM note_tags WHERE note_id = ?", (note_id,))
+        self.db.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+
+    def __contains__(self, title):
+        return self._note_id(title) is not None
+
+    def __iter__(self):
+        cursor = self.db.execute("SELECT title FROM notes ORDER BY id")
+        return (row[0] for row in cursor)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def items(self):
+        cursor = self.db.execute(f"{self.SELECT} ORDER BY id")
+        return (self._from_row(row) for row in cursor)
+
+    def values(self):
+        return (note for _, note in self.items())
+
+    def find_key(self, title):
+        row = self.db.execute(
+            "SELECT title FROM notes WHERE title_folded = ? LIMIT 1",
+            (title.lower(),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def with_tags(self, tags, match_all=False):
+        if not tags:
+            return self._select() if match_all else []
+        placeholders = ", ".join("?" for _ in tags)
+        subquery = (
+            "SELECT note_id FROM note_tags "
+            f"WHERE tag_folded IN ({placeholders})"
+        )
+        params = list(tags)
+        if match_all:
+            subquery += (
+                " GROUP BY note_id HAVING COUNT(DISTINCT tag_folded) = ?"
+            )
+            params.append(len(tags))
+        return self._select(f"WHERE id IN ({subquery})", params)
+
+    def tag_counts(self):
+        return dict(self.db.execute(
+            "SELECT tag, COUNT(*) FROM note_tags GROUP BY tag"
+        ))
+
+    def search(self, query, limit):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms)
+        cursor = self.db.execute(
+            """
+            SELECT notes.title,
+                snippet(notes_fts, 1, '[', ']', '...', 10),
+                bm25(notes_fts)
+            FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+            WHERE notes_fts MATCH ?
+            ORDER BY bm25(notes_fts)
+            LIMIT ?
+            """,
+            (match, limit),
+        )
+        # bm25() is negative, lower is better
+        return [(title, snippet, -rank) for title, snippet, rank in cursor]
+
+
+def _connect(path, read_only):
+    if read_only:
+        uri = Path(path).absolute().as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+def _lower(value):
+    return value.lower() if value is not None else None
+
+
+def _casefold(value):
+    return value.casefold() if value is not None else None
+
+
+_FUNCTIONS = {"lower": _lower, "casefold": _casefold}
@@ -84,6 +84,38 @@ def notes_with_one(empty_notes: Notes) -> Notes:
     return empty_notes
 
 
+# ---------- ФІКСТУРА ТИМЧАСОВИХ СХОВИЩ ----------
+@pytest.fixture
+def tmp_storage(tmp_path, monkeypatch):
+    """
+    Перенаправляє файли контактів і нотаток (pickle, журнал, sqlite)
+    у tmp_path; журнал контактів увімкнено.
+
+    Повертає функцію для інших налаштувань, напр.
+    tmp_storage(PHONEBOOK_BACKEND="sqlite"): параметр змінюється і в
+    config, і в contactbook, який імпортує його значення напряму.
+    """
+    import config
+    import contactbook
+
+    def configure(**settings):
+        for name, value in settings.items():
+            for module in (config, contactbook):
+                if hasattr(module, name):
+                    monkeypatch.setattr(module, name, value)
+        return tmp_path
+
+    configure(
+        PHONEBOOK_STORAGE=str(tmp_path / "book.pkl"),
+        PHONEBOOK_JOURNAL=str(tmp_path / "book.journal"),
+        PHONEBOOK_SQLITE=str(tmp_path / "book.db"),
+        PHONEBOOK_JOURNAL_MODE=True,
+        NOTES_STORAGE=str(tmp_path / "notes.pkl"),
+        NOTES_SQLITE=str(tmp_path / "notes.db"),
+    )
+    return configure
+
+
 # ---------- ФІКСТУРА ДЛЯ BotCommands ----------
 @pytest.fixture
 def bot() -> BotCommands:
@@ -1,4 +1,5 @@
 import pytest
+from rapidfuzz.distance import Levenshtein
 
 from commands import BotCommands
 
@@ -47,9 +48,15 @@ class StubContactbook:
     def del_last(self):
         return "DEL_LAST"
 
+    def session(self):
+        return self
+
     def all_contacts(self):
         return "ALL_CONTACTS"
 
+    def find_contact(self, name, limit=None, score_cutoff=None):
+        return f"FIND_{name}_{limit}_{score_cutoff}"
+
 
 class StubNotes:
     """
@@ -94,6 +101,9 @@ class StubNotes:
     def sort_notes_by_tag(self, tag):
         return f"SORT_BY_TAG_{tag}"
 
+    def search_notes(self, query):
+        return f"SEARCH_NOTES_{query}"
+
 
 # ---------- ФІКСТУРА З ПІДМІНЕНИМИ ЗАЛЕЖНОСТЯМИ ДЛЯ BotCommands ----------
 @pytest.fixture
@@ -266,6 +276,19 @@ def test_all_contacts_handler(stubbed_bot: BotCommands):
     assert result == "ALL_CONTACTS"
 
 
+def test_find_contact_handler_parses_optional_params(stubbed_bot: BotCommands):
+    """
+    find_contact_handler передає ліміт та мінімальну оцінку, якщо вони є.
+    """
+    assert stubbed_bot.find_contact_handler(["Ivn"]) == "FIND_Ivn_None_None"
+    assert stubbed_bot.find_contact_handler(["Ivn", "3", "70"]) == (
+        "FIND_Ivn_3_70.0"
+    )
+    assert stubbed_bot.find_contact_handler(["Ivn", "x"]) == (
+        "Invalid limit or cutoff format"
+    )
+
+
 # ---------- ТЕСТИ ДЛЯ КОМАНД З НОТАТКАМИ ----------
 def test_add_note_handler_delegates_to_notes(stubbed_bot: BotCommands):
     """
@@ -379,6 +402,14 @@ def test_sort_notes_by_tag_handler(stubbed_bot: BotCommands):
     assert result == "SORT_BY_TAG_tag1"
 
 
+def test_search_notes_handler_joins_query_words(stubbed_bot: BotCommands):
+    """
+    search_notes_handler склеює всі параметри в один пошуковий запит.
+    """
+    result = stubbed_bot.search_notes_handler(["buy", "milk"])
+    assert result == "SEARCH_NOTES_buy milk"
+
+
 # ---------- ЗАГАЛЬНІ КОМАНДИ (exit/close/help/find_similar) ----------      
 def test_close_handler_uses_exit_handler(stubbed_bot: BotCommands):
     """
@@ -397,3 +428,131 @@ def test_find_similar_returns_empty_for_too_short_query(stubbed_bot: BotCommands
     """
     suggestions = stubbed_bot.find_similar("x")
     assert suggestions == []
+
+
+# ---------- РЕЄСТР КОМАНД ----------
+def test_registry_is_built_once_per_class():
+    """
+    Реєстр команд будується при створенні класу і не змінюється.
+    """
+    registry = BotCommands.registry
+    assert "add_contact" in registry
+    assert registry["add_contact"].handler == "add_contact_handler"
+    assert registry["add_contact"].params == (("name", None),)
+    with pytest.raises(TypeError):
+        registry._commands["hack"] = None
+
+
+def test_registry_includes_subclass_commands(stubbed_bot: BotCommands):
+    """
+    Підклас отримує власний реєстр з новими командами,
+    базовий клас при цьому не змінюється.
+    """
+    class PluginCommands(BotCommands):
+        def ping_handler(self, params):
+            return "pong"
+
+        def ping_helper(self):
+            return {'help': "check bot"}
+
+    assert "ping" in PluginCommands.registry
+    assert "ping" not in BotCommands.registry
+    assert PluginCommands.registry["ping"].help == "check bot"
+
+
+def test_handler_for_uses_registry(stubbed_bot: BotCommands):
+    """
+    handler_for повертає зв'язаний обробник або None для невідомої команди.
+    """
+    handler = stubbed_bot.handler_for("add_contact")
+    assert handler(["Ivan"]) == "ADD_CONTACT_OK"
+    assert stubbed_bot.handler_for("unknown") is None
+    assert stubbed_bot.handler_for("add_contact_helper") is None
+
+
+def _brute_force_similar(commands, command):
+    # попередня реалізація find_similar: відстань до кожної команди
+    similarity = {
+        cmd: (
+            1 if cmd.startswith(command)
+            else (2 if command in cmd else Levenshtein.distance(command, cmd))
+        )
+        for cmd in commands
+    }
+    best_similarity = min(similarity.values())
+    if len(command) < best_similarity:
+        return []
+    return sorted(
+        cmd for cmd, sm in similarity.items() if sm == best_similarity
+    )
+
+
+@pytest.mark.parametrize("command", [
+    "add_contat", "x", "ad", "note", "tags", "hlp", "exti", "search_note",
+    "contact", "del", "zzzzzzzzzz", "edit_contact_i", "lst_notes",
+])
+def test_find_similar_matches_brute_force(stubbed_bot: BotCommands, command):
+    """
+    Індекс підказок дає ті самі результати, що й повний перебір.
+    """
+    expected = _brute_force_similar(stubbed_bot.get_avail_commands(), command)
+    assert stubbed_bot.find_similar(command) == expected
+
+
+def test_alias_dispatches_and_is_suggested(stubbed_bot: BotCommands):
+    """
+    Аліас quit викликає обробник exit і бере участь у підказках.
+    """
+    handler = stubbed_bot.handler_for("quit")
+    assert handler([]) == "Bye!"
+    assert stubbed_bot.done is True
+    assert "quit" in stubbed_bot.find_similar("qiut")
+    assert "quit" in stubbed_bot.help_handler([])
+
+
+def test_find_similar_covers_plugin_commands():
+    """
+    Команди з підкласу теж потрапляють у підказки.
+    """
+    class PluginCommands(BotCommands):
+        def weather_report_handler(self, params):
+            return "sunny"
+
+    assert PluginCommands.registry.suggest("weather") == ["weather_report"]
+    assert "weather_report" not in BotCommands.registry.suggest("weather")
+
+
+# ---------- ЛІНИВЕ ЗАВАНТАЖЕННЯ СХОВИЩ ----------
+def test_stores_load_on_first_use(monkeypatch):
+    """
+    Сховища створюються лише при першому зверненні,
+    команда для контактів не завантажує нотатки.
+    """
+    import commands
+
+    monkeypatch.setattr(
+        commands, "Contactbook", lambda read_only: StubContactbook()
+    )
+    monkeypatch.setattr(commands, "Notes", lambda read_only: StubNotes())
+    bot = BotCommands()
+    assert bot.loaded_stores() == []
+
+    assert bot.add_contact_handler(["Ivan"]) == "ADD_CONTACT_OK"
+    assert set(bot.load_times) == {"contactbook"}
+    assert bot.loaded_stores() == [bot.contactbook]
+
+
+def test_session_shares_stores_of_parent(monkeypatch):
+    """
+    Сесія з shared бере сховища батьківського BotCommands.
+    """
+    import commands
+
+    monkeypatch.setattr(
+        commands, "Contactbook", lambda read_only: StubContactbook()
+    )
+    parent = BotCommands()
+    session = BotCommands(shared=parent)
+    assert session.contactbook is parent.contactbook
+    assert session.load_times == {}
+    assert set(parent.load_times) == {"contactbook"}
@@ -94,7 +94,7 @@ def test_field_validator_known_and_unknown_field():
 
 # ---------- ТЕСТИ РОБОТИ СЕТТЕРІВ ТА ЗБЕРІГАННЯ ДАНИХ В Contact ----------
 def test_contact_setters_store_valid_values():
-    """При ініціалізації валідні значення зберігаються у внутрішньому словнику."""
+    """При ініціалізації валідні значення зберігаються у полях контакту."""
     today_str = date.today().strftime(DOB_FORMAT)
     c = Contact(
         name="Ivan",
@@ -149,13 +149,13 @@ def test_dob_setter_invalid_raises_value_error():
 # ---------- ТЕСТИ ДЛЯ Contactbook: ПОШУК ТА ВИВІД ----------
 def test_get_contact_found(book_with_one_contact: Contactbook):
     """get_contact повертає рядок з даними, якщо контакт знайдений."""
-    txt = book_with_one_contact.get_contact("Ivan")
+    txt = str(book_with_one_contact.get_contact("Ivan"))
     assert "Ivan" in txt
 
 
 def test_get_contact_not_found(empty_book: Contactbook):
     """Для неіснуючого імені get_contact повертає порожній рядок."""
-    txt = empty_book.get_contact("NoName")
+    txt = str(empty_book.get_contact("NoName"))
     assert txt == ""
 
 
@@ -240,13 +240,13 @@ def test_edit_last_contact_not_found(empty_book: Contactbook):
 # ---------- ТЕСТИ: ПОШУК ТА ВИДАЛЕННЯ КОНТАКТІВ ----------
 def test_search_contacts_found(book_with_one_contact: Contactbook):
     """search_contacts знаходить контакт за частиною email-а."""
-    result = book_with_one_contact.search_contacts("email", "ivan@")
+    result = str(book_with_one_contact.search_contacts("email", "ivan@"))
     assert "Ivan" in result
 
 
 def test_search_contacts_not_found(book_with_one_contact: Contactbook):
     """Якщо збігів немає — повертається текстове повідомлення."""
-    result = book_with_one_contact.search_contacts("email", "other@")
+    result = str(book_with_one_contact.search_contacts("email", "other@"))
     assert result == "No contacts found matching the given criteria."
 
 
@@ -336,7 +336,7 @@ def test_upcoming_birthdays_includes_today_birthday(book_with_one_contact: Conta
     dob_str = today.replace(year=today.year - 20).strftime(DOB_FORMAT)
     contact.dob = dob_str
 
-    result = book_with_one_contact.upcoming_birthdays(1)
+    result = str(book_with_one_contact.upcoming_birthdays(1))
     assert "Contacts having birthdays in 1 days:" in result
     assert "Ivan" in result
 
@@ -351,3 +351,535 @@ def test_birthday_for_year_feb_29_to_feb_28_on_non_leap_year(empty_book: Contact
     assert bday.year == 2021
     assert bday.month == 2
     assert bday.day == 28
+
+
+# ---------- ТЕСТИ: ЖУРНАЛ ЗМІН ----------
+@pytest.fixture
+def journaled_book_cls(tmp_storage):
+    """
+    Книга з журналом у тимчасовій директорії: реальний запис снапшоту
+    та журналу без доступу до storage/.
+    """
+    return Contactbook
+
+
+def _add(book, name, phone="+380501234567"):
+    gen = book.add_contact(name)
+    next(gen)
+    gen.send(phone)
+    gen.send(f"{name.lower()}@example.com")
+    gen.send("2000.01.15")
+    with pytest.raises(StopIteration):
+        gen.send("Kyiv")
+
+
+def test_journal_replays_add_edit_delete(journaled_book_cls):
+    """Зміни записуються в журнал і відтворюються при наступному запуску."""
+    book = journaled_book_cls()
+    _add(book, "Ivan")
+    _add(book, "Petro")
+    book.flush()
+    assert book.journal.size() > 0
+
+    gen = book.edit_by_id(1)
+    next(gen)
+    gen.send("+380671234567")
+    gen.send("")
+    gen.send("")
+    with pytest.raises(StopIteration):
+        gen.send("")
+
+    book.last_id = 2
+    gen = book.del_by_id(2)
+    next(gen)
+    with pytest.raises(StopIteration):
+        gen.send("y")
+    book.flush()
+
+    reloaded = journaled_book_cls()
+    assert list(reloaded.storage) == [1]
+    assert reloaded.storage[1].phone == "+380671234567"
+    assert reloaded.storage[1].email == "ivan@example.com"
+
+
+def test_failed_journal_write_is_retried(journaled_book_cls, monkeypatch):
+    """Зміни з невдалого запису в журнал не губляться і пишуться знову."""
+    book = journaled_book_cls()
+    append = book.journal.append
+    calls = []
+
+    def failing_append(records):
+        calls.append(records)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        append(records)
+
+    monkeypatch.setattr(book.journal, "append", failing_append)
+    with book.deferred_writes():
+        _add(book, "Ivan")
+        with pytest.raises(OSError):
+            book.flush()
+    assert calls[1] == calls[0]
+
+    reloaded = journaled_book_cls()
+    assert reloaded.storage[1].name == "Ivan"
+
+
+def test_journal_compacts_into_snapshot(journaled_book_cls, monkeypatch):
+    """Після перевищення ліміту журнал згортається у снапшот."""
+    import contactbook
+
+    monkeypatch.setattr(contactbook, "PHONEBOOK_JOURNAL_MAX_SIZE", 0)
+    book = journaled_book_cls()
+    _add(book, "Ivan")
+    book.flush()
+    assert book.journal.size() == 0
+
+    reloaded = journaled_book_cls()
+    assert reloaded.storage[1].name == "Ivan"
+
+
+class _OldContact:
+    """Пікл у форматі Contact до переходу на __slots__."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __reduce__(self):
+        import copyreg
+
+        return (
+            copyreg._reconstructor, (Contact, object, None),
+            {"_data": self.data},
+        )
+
+
+def test_old_pickles_are_migrated(journaled_book_cls, tmp_path):
+    """
+    Снапшот зі старими контактами ({'_data': ...}) завантажується,
+    дата народження зберігається як ordinal, новий снапшот компактніший.
+    """
+    import pickle
+
+    old = {
+        1: _OldContact({
+            "name": "Ivan", "phone": "+380501234567",
+            "email": "ivan@example.com", "dob": datetime(2000, 1, 15),
+            "addr": "Kyiv",
+        }),
+        2: _OldContact({"name": "Petro", "phone": "+380671234567"}),
+    }
+    (tmp_path / "book.pkl").write_bytes(pickle.dumps(old))
+
+    book = journaled_book_cls()
+    ivan, petro = book.storage[1], book.storage[2]
+    assert not hasattr(ivan, "__dict__")
+    assert ivan.dob == datetime(2000, 1, 15)
+    assert ivan._dob == date(2000, 1, 15).toordinal()
+    assert petro.fields() == {"name": "Petro", "phone": "+380671234567"}
+    with pytest.raises(KeyError):
+        petro.email
+
+    book.compact()
+    assert len((tmp_path / "book.pkl").read_bytes()) < len(pickle.dumps(old))
+    reloaded = journaled_book_cls()
+    assert reloaded.storage[1].fields() == ivan.fields()
+    assert reloaded.storage[2].name == "Petro"
+
+
+def _delete(book, contact_id):
+    gen = book.del_by_id(contact_id)
+    next(gen)
+    with pytest.raises(StopIteration):
+        gen.send("y")
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_ids_are_not_reused_after_delete(journaled_book_cls, compact):
+    """
+    Id видаленого останнього контакту не видається повторно — ні одразу,
+    ні після перезапуску з журналу чи зі снапшоту.
+    """
+    book = journaled_book_cls()
+    _add(book, "Ivan")
+    _add(book, "Petro")
+    _delete(book, 2)
+    assert list(book.storage) == [1]
+    _add(book, "Olena")
+    assert book.last_id == 3
+    _delete(book, 3)
+    if compact:
+        book.compact()
+    book.flush()
+
+    reloaded = journaled_book_cls()
+    assert list(reloaded.storage) == [1]
+    _add(reloaded, "Taras")
+    assert reloaded.last_id == 4
+    assert reloaded.storage[4].name == "Taras"
+
+
+def test_del_by_id_deletes_given_id(journaled_book_cls):
+    """del_by_id видаляє саме переданий id, а не останній показаний."""
+    book = journaled_book_cls()
+    _add(book, "Ivan")
+    _add(book, "Petro")
+    assert book.last_id == 2
+    _delete(book, 1)
+    assert list(book.storage) == [2]
+
+
+def test_reserved_ids_survive_restart(journaled_book_cls):
+    """Зарезервований блок id зберігається і не видається повторно."""
+    book = journaled_book_cls()
+    _add(book, "Ivan")
+    assert book.reserve_ids(3) == range(2, 5)
+    assert book.reserve_ids(0) == range(5, 5)
+    book.flush()
+
+    reloaded = journaled_book_cls()
+    assert reloaded.ids.next_id == 5
+    _add(reloaded, "Petro")
+    assert reloaded.last_id == 5
+
+
+def test_old_snapshot_without_counter_loads(journaled_book_cls, tmp_path):
+    """Снапшот без лічильника (простий dict) продовжує нумерацію з max id."""
+    import pickle
+
+    contact = Contact()
+    contact.name = "Ivan"
+    (tmp_path / "book.pkl").write_bytes(pickle.dumps({1: contact, 7: contact}))
+
+    book = journaled_book_cls()
+    assert book.ids.next_id == 8
+    book.compact()
+    with open(tmp_path / "book.pkl", "rb") as f:
+        assert pickle.load(f)["next_id"] == 8
+
+
+# ---------- ТЕСТИ: SQLITE-БЕКЕНД ----------
+@pytest.fixture
+def sqlite_book_cls(tmp_storage):
+    """Перемикає Contactbook на sqlite-бекенд у тимчасовій директорії."""
+    tmp_storage(PHONEBOOK_BACKEND="sqlite")
+    return Contactbook
+
+
+def test_sqlite_backend_queries_and_persistence(sqlite_book_cls):
+    """Пошук за ім'ям, полями та днями народження працює через sqlite."""
+    book = sqlite_book_cls()
+    _add(book, "Ivan")
+    _add(book, "Petro", phone="+380671234567")
+
+    assert "Ivan" in str(book.get_contact("Ivan"))
+    assert str(book.get_contact("ivan")) == ""
+    assert "Petro" in str(book.search_contacts("phone", "067"))
+    assert "Ivan" not in str(book.search_contacts("phone", "067"))
+
+    gen = book.edit_by_id(1)
+    next(gen)
+    gen.send("")
+    gen.send("new@example.com")
+    gen.send("")
+    with pytest.raises(StopIteration):
+        gen.send("")
+    book.flush()
+
+    reloaded = sqlite_book_cls()
+    assert len(reloaded.storage) == 2
+    assert reloaded.storage[1].email == "new@example.com"
+    assert isinstance(reloaded.storage[1].dob, datetime)
+
+
+def test_sqlite_lookups_use_stored_folded_columns(tmp_path):
+    """
+    Регістронезалежний пошук у sqlite працює за збереженими колонками
+    без Python-функцій на кожен рядок; стара база доповнюється ними
+    при відкритті на запис, а лише для читання — працює як раніше.
+    """
+    import sqlite3
+    from sqlite_storage import SqliteContactStorage
+
+    path = str(tmp_path / "book.db")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE contacts (
+            id INTEGER PRIMARY KEY, name TEXT, addr TEXT, email TEXT,
+            phone TEXT, dob TEXT, dob_month INTEGER, dob_day INTEGER
+        );
+        CREATE INDEX contacts_phone ON contacts (phone);
+        CREATE INDEX contacts_email ON contacts (email);
+        INSERT INTO contacts (id, name, addr, email, phone)
+        VALUES (1, 'Іван', 'Київ', 'Ivan@Example.com', '+380501234567');
+    """)
+    db.commit()
+    db.close()
+
+    legacy = SqliteContactStorage(path, read_only=True)
+    assert list(legacy.find_by_name("ІВАН", ignore_case=True)) == [1]
+    legacy.close()
+
+    storage = SqliteContactStorage(path)
+    storage[2] = Contact._restore({"name": "Петро", "addr": "Львів"})
+    for function in ("py_lower", "py_casefold"):
+        storage.db.create_function(function, 1, None)
+    assert list(storage.find_by_name("ІВАН", ignore_case=True)) == [1]
+    assert list(storage.search("email", "IVAN@")) == [1]
+    assert list(storage.search("addr", "ЛЬВ")) == [2]
+    plan = storage.db.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM contacts WHERE name_folded = ?",
+        ("іван",),
+    ).fetchall()
+    assert "contacts_name_folded" in str(plan)
+    indexes = {row[1] for row in storage.db.execute(
+        "SELECT type, name FROM sqlite_master WHERE type = 'index'"
+    )}
+    assert not indexes & {"contacts_phone", "contacts_email"}
+
+
+def test_sqlite_id_counter_persists(sqlite_book_cls):
+    """Лічильник id зберігається в таблиці meta sqlite-бази."""
+    book = sqlite_book_cls()
+    _add(book, "Ivan")
+    _add(book, "Petro")
+    _delete(book, 2)
+    assert book.reserve_ids(2) == range(3, 5)
+    book.flush()
+
+    reloaded = sqlite_book_cls()
+    assert reloaded.storage.next_id == 5
+    _add(reloaded, "Olena")
+    assert reloaded.last_id == 5
+
+
+def test_birthday_windows_wrap_new_year_and_feb_29():
+    """Вікно через Новий рік ділиться на два, 29.02 враховується як 28.02."""
+    from contactbook import birthday_windows
+
+    assert birthday_windows(date(2024, 12, 30), 5) == [
+        ((12, 30), (12, 31)), ((1, 1), (1, 3)),
+    ]
+    assert birthday_windows(date(2025, 2, 20), 9) == [((2, 20), (2, 29))]
+    assert birthday_windows(date(2025, 2, 20), 0) == []
+
+
+def test_sqlite_birthdays_match_in_memory_scan(sqlite_book_cls):
+    """Результати sqlite-запиту збігаються з повним перебором у пам'яті."""
+    from contactbook import ContactStorage
+
+    book = sqlite_book_cls()
+    for i, dob in enumerate(["2000.01.02", "1999.12.31", "2000.02.29",
+                             "1990.06.15"], start=1):
+        contact = Contact(name="A", phone="+380501234567",
+                          email="a@example.com", dob=dob, addr="")
+        book.storage[i] = contact
+    memory = ContactStorage(dict(book.storage.items()))
+
+    for today in [date(2025, 12, 30), date(2025, 2, 27), date(2024, 6, 1)]:
+        for days in [1, 3, 10, 400]:
+            assert (sorted(book.storage.birthdays(today, days))
+                    == sorted(memory.birthdays(today, days)))
+
+
+# ---------- ТЕСТИ: ІНДЕКС ІМЕН ----------
+def test_name_index_follows_add_replace_delete(empty_book: Contactbook):
+    """Індекс імен оновлюється при додаванні, заміні та видаленні."""
+    today_str = date.today().strftime(DOB_FORMAT)
+    storage = empty_book.storage
+    storage[1] = Contact(name="Ivan", dob=today_str)
+    storage[2] = Contact(name="ivan", dob=today_str)
+
+    assert list(storage.find_by_name("Ivan")) == [1]
+    assert list(storage.find_by_name("IVAN", ignore_case=True)) == [1, 2]
+
+    renamed = storage[2]
+    renamed.name = "Petro"
+    storage[2] = renamed
+    assert list(storage.find_by_name("ivan", ignore_case=True)) == [1]
+    assert list(storage.find_by_name("Petro")) == [2]
+
+    del storage[1]
+    assert storage.find_by_name("Ivan") == {}
+    assert storage.names.exact == {"Petro": {2}}
+
+
+# ---------- ТЕСТИ: ІНДЕКС ДНІВ НАРОДЖЕННЯ ----------
+def test_birthday_index_matches_next_birthday_scan(empty_book: Contactbook):
+    """Запит по індексу збігається з перебором через _next_birthday."""
+    from datetime import timedelta
+
+    storage = empty_book.storage
+    dobs = ["2000.01.01", "1999.12.31", "2000.02.29", "1990.02.28",
+            "1990.03.01", "1985.06.15", "2001.12.25"]
+    for i, dob in enumerate(dobs, start=1):
+        storage[i] = Contact(name="A", dob=dob)
+    del storage[7]
+
+    for today in [date(2025, 12, 25), date(2025, 2, 27), date(2024, 2, 28),
+                  date(2024, 12, 31), date(2025, 6, 15)]:
+        for days in [1, 2, 3, 7, 60, 365, 366]:
+            expected = {
+                id for id, c in storage.items()
+                if today <= empty_book._next_birthday(c.dob, today).date()
+                < today + timedelta(days=days)
+            }
+            assert set(storage.birthdays(today, days)) == expected
+
+
+def test_bulk_rebuilds_indexes_once():
+    """
+    У блоці bulk() індекси не оновлюються на кожен контакт, а після
+    виходу збігаються з покроковим додаванням.
+    """
+    from contactbook import ContactStorage
+
+    contacts = [
+        Contact(name=name, dob=dob) for name, dob in [
+            ("Ivan", "1990.05.17"), ("Petro", "1985.01.02"),
+            ("ivan", "2000.12.31"), ("Olena", "1990.05.17"),
+        ]
+    ]
+    one_by_one = ContactStorage(columns=True)
+    bulk = ContactStorage(columns=True)
+    for contact_id, contact in enumerate(contacts, start=1):
+        one_by_one[contact_id] = contact
+    bulk[1] = contacts[0]
+    with bulk.bulk():
+        for contact_id, contact in enumerate(contacts[1:], start=2):
+            bulk[contact_id] = contact
+        assert bulk.birthday_index.keys == [(5, 17, 1)]
+    assert bulk.birthday_index.keys == one_by_one.birthday_index.keys
+    assert bulk.names.folded == one_by_one.names.folded
+    assert set(bulk.birthdays(date(2025, 5, 17), 1)) == {1, 4}
+
+
+# ---------- ТЕСТИ: КОЛОНКОВЕ ДЗЕРКАЛО ----------
+def _age(dob, today):
+    before_birthday = (dob.month, dob.day) > (today.month, today.day)
+    return today.year - dob.year - before_birthday
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_columns_match_index_and_scan(vectorized, monkeypatch):
+    """
+    Колонкове дзеркало (з NumPy та без) дає ті самі дні народження,
+    що й індекс, а вікові групи та роки народження — як перебір,
+    після додавання, зміни та видалення контактів.
+    """
+    import indexes
+    from collections import Counter
+    from contactbook import ContactStorage
+
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(indexes, "_numpy", lambda: None)
+
+    dobs = ["2000.01.01", "1999.12.31", "2000.02.29", "1990.02.28",
+            "1990.03.01", "1985.06.15", "2001.12.25", "1950.07.04"]
+    contacts = {
+        i: Contact(name="A", dob=dob) for i, dob in enumerate(dobs, start=1)
+    }
+    plain = ContactStorage(contacts)
+    mirrored = ContactStorage(contacts, columns=True)
+    for storage in (plain, mirrored):
+        del storage[7]
+        storage[2] = Contact(name="B", dob="1975.05.05")
+        storage[9] = Contact(name="C", dob="2010.11.11")
+        storage[10] = Contact(name="D")
+    assert len(mirrored.columns) == 8
+
+    for today in [date(2025, 12, 25), date(2025, 2, 27), date(2024, 2, 28)]:
+        for days in [1, 3, 7, 60, 366]:
+            assert (list(mirrored.birthdays(today, days))
+                    == list(plain.birthdays(today, days)))
+
+        dated = {id: c.dob for id, c in plain.items() if id != 10}
+        for width in [1, 10, 25]:
+            expected = Counter(
+                _age(dob, today) // width * width for dob in dated.values()
+            )
+            assert mirrored.age_histogram(today, width) == sorted(
+                expected.items()
+            )
+            assert plain.age_histogram(today, width) == sorted(
+                expected.items()
+            )
+
+    assert list(mirrored.born_between(1985, 2000)) == [1, 3, 4, 5, 6]
+    assert list(plain.born_between(2001, 2001)) == []
+
+
+def test_sqlite_columnar_queries_match_memory(sqlite_book_cls):
+    """born_between та age_histogram у sqlite збігаються з пам'яттю."""
+    from contactbook import ContactStorage
+
+    book = sqlite_book_cls()
+    for i, dob in enumerate(["2000.01.02", "1999.12.31", "2000.02.29",
+                             "1990.06.15"], start=1):
+        book.storage[i] = Contact(name="A", phone="+380501234567",
+                                  email="a@example.com", dob=dob, addr="")
+    memory = ContactStorage(dict(book.storage.items()), columns=True)
+
+    assert list(book.storage.born_between(1999, 2000)) == [1, 2, 3]
+    for today in [date(2025, 12, 30), date(2025, 2, 28), date(2024, 6, 15)]:
+        assert (book.storage.age_histogram(today, 5)
+                == memory.age_histogram(today, 5))
+
+
+# ---------- ТЕСТИ: ТРИГРАМНИЙ ІНДЕКС ПОШУКУ ----------
+def test_trigram_search_matches_scan_and_tracks_changes(empty_book):
+    """Пошук через індекс дає ті ж результати і бачить зміни контактів."""
+    storage = empty_book.storage
+    emails = ["ivan@example.com", "petro@mail.ua", "olena@example.org"]
+    for i, email in enumerate(emails, start=1):
+        storage[i] = Contact(name="A", email=email, dob="2000.01.01")
+
+    assert list(storage.search("email", "EXAMPLE")) == [1, 3]
+    assert list(storage.search("email", "ua")) == [2]
+    assert list(storage.search("email", "@")) == [1, 2, 3]
+    assert storage.search("email", "nothing") == {}
+    assert storage.search("unknown", "a") == {}
+
+    contact = storage[2]
+    contact.email = "petro@example.net"
+    storage[2] = contact
+    del storage[1]
+    assert list(storage.search("email", "example")) == [2, 3]
+    assert list(storage.search("dob", "2000-01")) == [2, 3]
+
+
+# ---------- ТЕСТИ: НЕЧІТКИЙ ПОШУК ----------
+def test_find_contact_tolerates_typos(empty_book: Contactbook):
+    """find_contact знаходить контакт за іменем з помилкою, з оцінкою."""
+    for i, name in enumerate(["Ivan", "Petro", "Ivanna"], start=1):
+        empty_book.storage[i] = Contact(
+            name=name, phone="+380501234567", email="a@example.com",
+            dob="2000.01.01", addr="Kyiv",
+        )
+
+    txt = str(empty_book.find_contact("Ivna"))
+    assert "Ivan" in txt
+    assert "Petro" not in txt
+    assert "%" in txt
+    assert "\tIvan\t" in txt
+
+    assert str(empty_book.find_contact("Zzzzz")) == (
+        "No contacts similar to 'Zzzzz'"
+    )
+    assert str(empty_book.find_contact("Ivna", limit=1)).count("\n") == 1
+
+
+def test_fuzzy_cache_is_invalidated_on_mutation(empty_book: Contactbook):
+    """Кеш імен для нечіткого пошуку скидається при зміні книги."""
+    storage = empty_book.storage
+    storage[1] = Contact(name="Ivan", dob="2000.01.01")
+    assert storage.find_similar_names("Olna", 5, 60) == []
+
+    storage[2] = Contact(name="Olena", dob="2000.01.01")
+    assert [n for n, _ in storage.find_similar_names("Olna", 5, 60)] == [
+        "Olena"
+    ]
+    del storage[2]
+    assert storage.find_similar_names("Olna", 5, 60) == []
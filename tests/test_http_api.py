@@ -0,0 +1,209 @@
+import json
+import threading
+from datetime import date
+from http.client import HTTPConnection
+
+import pytest
+
+from commands import BotCommands
+from http_api import ApiServer, ReadWriteLock
+
+
+@pytest.fixture
+def api(tmp_storage):
+    """
+    HTTP API на випадковому порту з реальними сховищами
+    у тимчасовій директорії. Повертає функцію запиту.
+    """
+    server = ApiServer(("127.0.0.1", 0), BotCommands(), quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = HTTPConnection(*server.server_address[:2], timeout=5)
+
+    def request(method, path, body=None):
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        conn.request(method, path, data, headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    yield request
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    server.commands.flush()
+
+
+IVAN = {
+    "name": "Ivan",
+    "phone": "0501234567",
+    "email": "ivan@example.com",
+    "dob": "2000.01.15",
+    "addr": "Kyiv",
+}
+
+
+def test_contact_crud(api):
+    """
+    Створення, читання, зміна та видалення контакту через API.
+    """
+    status, created = api("POST", "/contacts", IVAN)
+    assert status == 201
+    assert created["id"] == 1
+    assert created["phone"] == "+380501234567"
+
+    status, contact = api("GET", "/contacts/1")
+    assert status == 200 and contact["name"] == "Ivan"
+
+    status, contact = api("PATCH", "/contacts/1", {"addr": "Lviv"})
+    assert status == 200 and contact["addr"] == "Lviv"
+
+    status, found = api("GET", "/contacts?name=Ivan")
+    assert [c["addr"] for c in found] == ["Lviv"]
+
+    status, found = api("GET", "/contacts/search?field=email&value=IVAN@")
+    assert [c["id"] for c in found] == [1]
+
+    assert api("DELETE", "/contacts/1") == (200, {"deleted": 1})
+    assert api("GET", "/contacts/1")[0] == 404
+    assert api("GET", "/contacts") == (200, [])
+
+
+def test_contact_validation_errors(api):
+    """
+    Некоректні поля повертають 400 з переліком полів.
+    """
+    status, error = api("POST", "/contacts", {**IVAN, "email": "bad"})
+    assert status == 400
+    assert error["error"] == "Invalid fields: email"
+
+    status, error = api("POST", "/contacts", {"name": "Ivan"})
+    assert status == 400
+    assert "phone" in error["error"] and "dob" in error["error"]
+
+    api("POST", "/contacts", IVAN)
+    status, _ = api("PATCH", "/contacts/1", {"dob": "3000.01.01"})
+    assert status == 400
+    assert api("GET", "/unknown")[0] == 404
+    assert api("DELETE", "/contacts")[0] == 405
+
+
+def test_birthdays_endpoint(api):
+    """
+    /contacts/birthdays повертає контакти з днем народження у вікні.
+    """
+    # 2000 — високосний рік, тож 29 лютого теж підходить
+    today = date.today().replace(year=2000)
+    api("POST", "/contacts", {**IVAN, "dob": today.strftime("%Y.%m.%d")})
+
+    status, found = api("GET", "/contacts/birthdays?days=1")
+    assert status == 200 and [c["name"] for c in found] == ["Ivan"]
+    assert api("GET", "/contacts/birthdays?days=x")[0] == 400
+    assert api("GET", "/contacts/birthdays?days=999999999")[0] == 400
+    assert api("GET", "/contacts/birthdays?days=-1")[0] == 400
+
+
+def test_notes_and_tags(api):
+    """
+    Нотатки: створення, пошук за тегами та текстом, зміна, видалення.
+    """
+    status, note = api("POST", "/notes", {
+        "title": "Shopping", "content": "Buy milk", "tags": ["food", "urgent"]
+    })
+    assert status == 201 and note["tags"] == ["food", "urgent"]
+    assert api("POST", "/notes", {"title": "Shopping", "content": "x"})[0] \
+        == 409
+    api("POST", "/notes", {
+        "title": "Work", "content": "Report", "tags": "urgent"
+    })
+
+    assert api("GET", "/tags") == (200, {"food": 1, "urgent": 2})
+    status, found = api("GET", "/notes?tag=FOOD&tag=urgent&all=1")
+    assert [n["title"] for n in found] == ["Shopping"]
+    status, hits = api("GET", "/notes/search?q=milk")
+    assert [h["title"] for h in hits] == ["Shopping"]
+
+    status, note = api("PATCH", "/notes/shopping", {"title": "Groceries"})
+    assert status == 200 and note["title"] == "Groceries"
+    assert api("GET", "/notes/Shopping")[0] == 404
+
+    for body in ({"content": 123}, {"content": ""}, {"content": [1, 2]}):
+        assert api("PATCH", "/notes/Groceries", body) == (
+            400, {"error": "Invalid fields: content"}
+        )
+    assert api("PATCH", "/notes/Groceries", {"tags": [1]})[0] == 400
+    assert api("POST", "/notes", {
+        "title": "Bad", "content": "x", "tags": {"a": 1}
+    }) == (400, {"error": "Invalid fields: tags"})
+    status, note = api("PATCH", "/notes/Groceries", {"tags": ["milk"]})
+    assert status == 200 and note["content"] == "Buy milk"
+    assert api("DELETE", "/notes/Groceries") == (200, {"deleted": "Groceries"})
+    assert [n["title"] for n in api("GET", "/notes")[1]] == ["Work"]
+
+
+def test_read_write_lock_allows_concurrent_readers():
+    """
+    Кілька читачів тримають блокування одночасно,
+    письменник чекає, доки всі вийдуть.
+    """
+    lock = ReadWriteLock()
+    both_reading = threading.Barrier(2, timeout=5)
+    order = []
+
+    def reader():
+        with lock.read():
+            both_reading.wait()
+            order.append("read")
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join(5)
+
+    def writer():
+        with lock.write():
+            order.append("write")
+
+    with lock.read():
+        writer_thread = threading.Thread(target=writer)
+        writer_thread.start()
+        writer_thread.join(0.1)
+        assert writer_thread.is_alive()
+    writer_thread.join(5)
+    assert order == ["read", "read", "write"]
+
+
+def test_store_writes_hold_the_write_lock(tmp_storage):
+    """
+    Сховища зберігаються окремим потоком під блокуванням на запис,
+    тож commit не потрапляє між інструкціями однієї зміни.
+    """
+    from contactbook import Contactbook
+
+    server = ApiServer(
+        ("127.0.0.1", 0), BotCommands(), quiet=True, delay=0
+    )
+    flush = server.commands.flush
+    flushes = []
+    server.commands.flush = lambda: (
+        flushes.append(server.lock._writer), flush()
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = HTTPConnection(*server.server_address[:2], timeout=5)
+    conn.request(
+        "POST", "/contacts", json.dumps(IVAN),
+        {"Content-Type": "application/json"},
+    )
+    assert conn.getresponse().status == 201
+    conn.close()
+    server.shutdown()
+    thread.join(5)
+    server.server_close()
+
+    assert flushes and all(flushes)
+    assert [c.name for c in Contactbook().storage.values()] == ["Ivan"]
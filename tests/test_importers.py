@@ -0,0 +1,169 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from contactbook import Contactbook
+from importers import (
+    batches, check_batch, checked_batches, read_csv, read_jsonl, read_vcard,
+)
+
+
+@pytest.fixture
+def import_book(tmp_storage):
+    """Книга з журналом у тимчасовій директорії та малими пакетами імпорту."""
+    tmp_storage(IMPORT_BATCH_SIZE=2)
+    return Contactbook
+
+
+def test_csv_and_jsonl_readers():
+    """CSV читається за заголовком, зайві колонки ігноруються."""
+    csv_file = io.StringIO(
+        "ID,Name,Phone\n"
+        "1,Ivan,+380501234567\n"
+        "2,Petro\n"
+    )
+    assert list(read_csv(csv_file)) == [
+        (2, {"name": "Ivan", "phone": "+380501234567"}),
+        (3, {"name": "Petro"}),
+    ]
+
+    jsonl_file = io.StringIO('{"name": "Ivan", "id": 1}\n\nnot json\n[1]\n')
+    assert list(read_jsonl(jsonl_file)) == [
+        (1, {"name": "Ivan"}), (3, None), (4, None),
+    ]
+
+
+def test_vcard_reader():
+    """
+    vCard: згорнуті рядки, групи та параметри властивостей, адреса
+    з компонентів і дата народження у форматі ISO.
+    """
+    vcf = io.StringIO(
+        "BEGIN:VCARD\r\n"
+        "VERSION:3.0\r\n"
+        "FN:Taras\r\n"
+        "item1.TEL;TYPE=cell:+38 050 765 43 21\r\n"
+        "TEL;TYPE=work:+380441234567\r\n"
+        "EMAIL:taras@exa\r\n"
+        " mple.com\r\n"
+        "BDAY:19991231\r\n"
+        "ADR;TYPE=home:;;Khreshchatyk 1\\, apt 2;Kyiv;;01001;Ukraine\r\n"
+        "END:VCARD\r\n"
+    )
+    assert list(read_vcard(vcf)) == [(1, {
+        "name": "Taras",
+        "phone": "+38 050 765 43 21",
+        "email": "taras@example.com",
+        "dob": "1999.12.31",
+        "addr": "Khreshchatyk 1, apt 2, Kyiv, 01001, Ukraine",
+    })]
+
+
+def test_check_batch_normalizes_and_rejects():
+    """Валідні рядки нормалізуються, решта відхиляються з переліком полів."""
+    accepted, rejected = check_batch([
+        (2, {"name": "Ivan", "phone": "0501234567",
+             "email": "ivan@example.com", "dob": "1990.05.17"}),
+        (3, {"name": "Petro Ivanenko", "phone": "12"}),
+        (4, None),
+    ])
+    assert accepted == [{
+        "addr": "", "name": "Ivan", "phone": "+380501234567",
+        "email": "ivan@example.com", "dob": datetime(1990, 5, 17),
+    }]
+    assert rejected == [
+        (3, {"name": "Petro Ivanenko", "phone": "12"},
+         ["name", "phone", "email", "dob"]),
+        (4, None, ["format"]),
+    ]
+
+
+def test_checked_batches_in_process_pool():
+    """Пакети, перевірені в пулі процесів, повертаються в порядку подання."""
+    rows = [
+        (i, {"name": "Ivan", "phone": f"05012345{i:02d}",
+             "email": "ivan@example.com", "dob": "1990.05.17"})
+        for i in range(1, 40)
+    ] + [(40, None)]
+    expected = list(map(check_batch, batches(rows, 3)))
+    assert list(checked_batches(batches(rows, 3), workers=2)) == expected
+    assert expected[-1] == ([], [(40, None, ["format"])])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_import_contacts_writes_once(
+    import_book, tmp_storage, tmp_path, workers
+):
+    """
+    Файл імпортується пакетами (також у пулі процесів), відхилені рядки
+    потрапляють у файл .rejects, а всі прийняті контакти зберігаються
+    одним записом у порядку файлу.
+    """
+    tmp_storage(IMPORT_WORKERS=workers)
+    source = tmp_path / "contacts.csv"
+    rows = ["name,phone,email,dob,addr"] + [
+        f"{name},050123456{i},{name.lower()}@example.com,1990.05.1{i},Kyiv"
+        for i, name in enumerate(["Ivan", "Petro", "Olena", "Taras", "Anna"])
+    ]
+    rows.insert(3, "Bad,1,bad,1990.13.01,")
+    source.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+    book = import_book()
+    writes = []
+    book.writer.observe = writes.append
+    assert book.import_contacts(str(source)) == (
+        f"Imported 5 contacts, 1 rejected (see {source}.rejects)"
+    )
+    assert len(writes) == 1
+    assert book.last_id == 5
+
+    rejects = (tmp_path / "contacts.csv.rejects").read_text(encoding="utf-8")
+    record = json.loads(rejects)
+    assert record["line"] == 4
+    assert record["invalid"] == ["phone", "email", "dob"]
+
+    reloaded = import_book()
+    assert [c.name for c in reloaded.storage.values()] == [
+        "Ivan", "Petro", "Olena", "Taras", "Anna",
+    ]
+    assert reloaded.storage[3].phone == "+380501234562"
+    assert reloaded.ids.next_id == 6
+
+
+def test_import_contacts_errors(import_book, tmp_path):
+    """Невідомий формат і відсутній файл не змінюють книгу."""
+    book = import_book()
+    assert book.import_contacts("contacts.xlsx").startswith(
+        "Unknown file format"
+    )
+    assert book.import_contacts(str(tmp_path / "missing.csv")).startswith(
+        "Cannot open"
+    )
+    assert len(book.storage) == 0
+
+
+def test_import_contacts_compacts_instead_of_journaling(
+    import_book, tmp_path
+):
+    """
+    Імпортовані рядки не накопичуються в журналі змін: після імпорту
+    зберігається знімок книги, а журнал порожній.
+    """
+    source = tmp_path / "contacts.jsonl"
+    source.write_text("".join(
+        json.dumps({"name": f"Ivan{chr(97 + i)}", "phone": f"05012345{i:02d}",
+                    "email": "ivan@example.com", "dob": "1990.05.17"}) + "\n"
+        for i in range(9)
+    ), encoding="utf-8")
+
+    book = import_book()
+    pending = []
+    write = book.writer._write
+    book.writer._write = lambda: (pending.append(len(book._changes)), write())
+    assert book.import_contacts(str(source)) == "Imported 9 contacts"
+    # one write: a reserve record per batch of two and the snapshot request
+    assert pending == [6]
+    assert book.journal.size() == 0
+    assert len(import_book().storage) == 9
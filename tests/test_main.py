@@ -0,0 +1,316 @@
+import io
+
+import pytest
+
+from commands import BotCommands
+from main import argv_to_line, parse_input, run_script
+
+
+@pytest.fixture
+def file_bot(tmp_storage, monkeypatch) -> BotCommands:
+    """
+    BotCommands з реальними сховищами у тимчасовій директорії,
+    запис у файли рахується через лічильник.
+    """
+    from contactbook import Contactbook
+
+    tmp_storage(WRITE_BEHIND_DELAY=0)
+
+    writes = []
+    original = Contactbook._write
+    monkeypatch.setattr(
+        Contactbook, "_write",
+        lambda self: writes.append(1) or original(self),
+    )
+    bot = BotCommands()
+    bot.writes = writes
+    return bot
+
+
+SCRIPT = """\
+# два контакти, відповіді на запити йдуть наступними рядками
+add_contact Ivan
++380501234567
+ivan@example.com
+2000.01.15
+Kyiv
+
+add_contact Petro
++380671234567
+petro@example.com
+1999.12.31
+
+add_note Shopping "Buy milk" food
+"""
+
+
+def test_parse_input_quoted_params():
+    """
+    parse_input розбиває рядок на команду та параметри з лапками.
+    """
+    assert parse_input('Add-Note Title "long content" tag') == (
+        "add_note", ["Title", "long content", "tag"]
+    )
+
+
+def test_run_script_answers_prompts_and_writes_once(file_bot, capsys):
+    """
+    Скрипт виконує команди по черзі, відповіді на запити беруться
+    зі скрипту, а запис у сховище відбувається один раз наприкінці.
+    """
+    run_script(io.StringIO(SCRIPT), file_bot)
+
+    out = capsys.readouterr().out
+    assert out.count("Contact added") == 2
+    assert [c.name for c in file_bot.contactbook.storage.values()] == [
+        "Ivan", "Petro"
+    ]
+    assert file_bot.contactbook.storage[2].addr == ""
+    assert "Shopping" in file_bot.notes.notes
+    assert file_bot.writes == [1]
+
+
+def test_run_script_aborts_command_without_answers(file_bot, capsys):
+    """
+    Якщо скрипт закінчився посеред запитів, команда переривається
+    і нічого не зберігається.
+    """
+    run_script(io.StringIO("add_contact Ivan\n+380501234567\n"), file_bot)
+
+    out = capsys.readouterr().out
+    assert "Command aborted" in out
+    assert len(file_bot.contactbook.storage) == 0
+
+
+def test_run_script_aborted_edit_keeps_contact(file_bot, capsys):
+    """
+    Перерване редагування не змінює контакт ані в пам'яті, ані у файлі.
+    """
+    from contactbook import Contactbook
+
+    add_ivan = SCRIPT.split("\n\n")[0]
+    script = add_ivan + "\n\nedit_contact Ivan\n0671234567\n"
+    run_script(io.StringIO(script), file_bot)
+
+    assert "Command aborted" in capsys.readouterr().out
+    assert file_bot.contactbook.storage[1].phone == "+380501234567"
+    assert Contactbook().storage[1].phone == "+380501234567"
+
+
+def test_run_script_stops_on_exit(file_bot, capsys):
+    """
+    Команда exit завершує виконання скрипту.
+    """
+    run_script(io.StringIO("exit\nadd_contact Ivan\n"), file_bot)
+
+    out = capsys.readouterr().out
+    assert "Bye!" in out
+    assert "Enter phone" not in out
+    assert len(file_bot.contactbook.storage) == 0
+
+
+def test_argv_to_line_keeps_words_with_spaces():
+    """
+    Аргументи з пробілами з командного рядка стають одним параметром.
+    """
+    line = argv_to_line(["Add-Note", "Shopping list", "Buy milk"])
+    assert parse_input(line) == (
+        "add_note", ["Shopping list", "Buy milk"]
+    )
+
+
+def test_run_once_read_only_command(file_bot, monkeypatch, capsys):
+    """
+    Команда, що нічого не змінює, відкриває сховища лише для читання
+    і не чіпає пошкоджений хвіст журналу.
+    """
+    import main
+
+    run_script(io.StringIO(SCRIPT), file_bot)
+    journal = file_bot.contactbook.journal
+    with open(journal.path, "ab") as f:
+        f.write(b"\x80torn")
+    size = journal.size()
+
+    created = []
+    original_init = BotCommands.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        created.append(self)
+
+    monkeypatch.setattr(BotCommands, "__init__", tracking_init)
+    capsys.readouterr()
+    assert main.run_once(["get_contact", "Petro"]) == 0
+
+    assert "petro@example.com" in capsys.readouterr().out
+    bot = created[0]
+    assert bot.contactbook.read_only
+    assert "notes" not in bot.load_times
+    assert journal.size() == size
+    with pytest.raises(RuntimeError):
+        bot.contactbook._save_to_file()
+
+
+def test_run_once_unknown_command_exit_code(file_bot, capsys):
+    """
+    Невідома команда повертає ненульовий код виходу.
+    """
+    import main
+
+    assert main.run_once(["get_contat", "Ivan"]) == 2
+    assert "Did you mean" in capsys.readouterr().out
+
+
+def test_sqlite_read_only_storage(tmp_path):
+    """
+    Sqlite-сховище, відкрите лише для читання, не дозволяє запис.
+    """
+    import sqlite3
+
+    from contactbook import Contact
+    from sqlite_storage import SqliteContactStorage
+
+    path = str(tmp_path / "book.db")
+    storage = SqliteContactStorage(path)
+    storage[1] = Contact._restore({"name": "Ivan"})
+    storage.commit()
+    storage.close()
+
+    read_only = SqliteContactStorage(path, read_only=True)
+    assert read_only.find_by_name("Ivan")[1].name == "Ivan"
+    with pytest.raises(sqlite3.OperationalError):
+        read_only[2] = Contact._restore({"name": "Petro"})
+
+
+def test_listing_paging_options(file_bot, capsys):
+    """
+    all_contacts та list_notes приймають --limit і --offset,
+    некоректні опції повертають підказку.
+    """
+    run_script(io.StringIO(
+        SCRIPT
+        + "all_contacts --limit 1 --offset 1\n"
+        + "list_notes --offset 1\n"
+        + "all_contacts --limit x\n"
+    ), file_bot)
+
+    out = capsys.readouterr().out.split("Note created", 1)[1]
+    assert "Petro" in out and "Ivan" not in out
+    assert "No notes found" in out
+    assert "Invalid paging options" in out
+
+
+def test_pager_stops_listing_on_quit(capsys):
+    """
+    Пейджер зупиняється після 'q', решта рядків не генерується.
+    """
+    from main import MORE_PROMPT, show
+
+    produced = []
+
+    def rows():
+        for i in range(100):
+            produced.append(i)
+            yield f"row {i}\n"
+
+    prompts = []
+    show(rows(), lambda p: prompts.append(p) or "q", page_size=2)
+
+    out = capsys.readouterr().out
+    assert out == "row 0\nrow 1\n\n"
+    assert prompts == [MORE_PROMPT]
+    assert produced == [0, 1, 2]
+
+
+def test_stats_command_reports_latency(file_bot, capsys):
+    """
+    stats показує кількість викликів, помилки та час збереження,
+    а з --json — ті самі дані у форматі JSON.
+    """
+    import json
+
+    run_script(io.StringIO(
+        SCRIPT + "get_contact\nlist_notes\nlist_notes\n"
+    ), file_bot)
+    capsys.readouterr()
+
+    run_script(io.StringIO("stats --json\n"), file_bot)
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["commands"]["add_contact"]["calls"] == 2
+    assert summary["commands"]["list_notes"]["calls"] == 2
+    assert summary["commands"]["get_contact"]["errors"] == 1
+    assert summary["commands"]["list_notes"]["p99_ms"] >= 0
+    assert summary["saves"]["contactbook"]["calls"] == 1
+
+    run_script(io.StringIO("stats\n"), file_bot)
+    assert "list_notes" in capsys.readouterr().out
+
+
+def test_listing_render_error_is_reported(file_bot, capsys):
+    """
+    Помилка під час виведення списку (контакт без дати народження)
+    повідомляється як збій команди і рахується в метриках.
+    """
+    from contactbook import Contact
+    from main import run_command
+
+    file_bot.contactbook.storage[1] = Contact(name="Ivan")
+    run_command(file_bot, "all_contacts", input)
+
+    assert "Command failed" in capsys.readouterr().out
+    summary = file_bot.metrics.summary()
+    assert summary["commands"]["all_contacts"]["errors"] == 1
+
+
+def test_stats_disabled(monkeypatch):
+    """
+    Якщо метрики вимкнено, команди не вимірюються.
+    """
+    import config
+
+    monkeypatch.setattr(config, "METRICS_ENABLED", False)
+    bot = BotCommands()
+    assert bot.metrics is None
+    assert "disabled" in bot.stats_handler([])
+
+
+def test_startup_profile_printed_once(monkeypatch, capsys):
+    """
+    --startup-profile друкує звіт один раз, з часом імпорту модулів,
+    виміряним в окремому інтерпретаторі.
+    """
+    import main
+
+    monkeypatch.setattr(main, "_profiled", [])
+    main.main(["--startup-profile", "help"])
+    out = capsys.readouterr().out
+    assert out.count("Startup profile:") == 1
+    assert "import contactbook" in out and "imports total" in out
+    assert dict(main.import_times(("config", "notes")))["notes"] > 0
+
+
+def test_startup_profile_at_first_prompt(tmp_storage, monkeypatch, capsys):
+    """
+    В інтерактивному режимі звіт --startup-profile друкується перед
+    першим запитом, а не після завершення сесії.
+    """
+    import main
+
+    class Terminal(io.StringIO):
+        def isatty(self):
+            return True
+
+    output_at_prompt = []
+
+    def fake_input(prompt):
+        output_at_prompt.append(capsys.readouterr().out)
+        return "exit"
+
+    monkeypatch.setattr(main, "_profiled", [])
+    monkeypatch.setattr(main.sys, "stdin", Terminal())
+    monkeypatch.setattr("builtins.input", fake_input)
+    main.main(["--startup-profile"])
+
+    assert "Startup profile:" in output_at_prompt[0]
+    assert "Startup profile:" not in capsys.readouterr().out
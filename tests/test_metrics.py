@@ -0,0 +1,38 @@
+import random
+
+from metrics import Histogram, Metrics, Stopwatch
+
+
+def test_histogram_percentiles_are_close():
+    """Перцентилі з гістограми відрізняються від точних не більше ніж на 5%."""
+    samples = [random.uniform(0.0001, 2.0) for _ in range(10_000)]
+    histogram = Histogram()
+    for sample in samples:
+        histogram.record(sample)
+
+    samples.sort()
+    for p in (50, 95, 99):
+        exact = samples[int(len(samples) * p / 100) - 1]
+        assert abs(histogram.percentile(p) - exact) / exact < 0.05
+    assert histogram.percentile(100) == max(samples)
+    assert len(histogram.buckets) < 300
+
+
+def test_metrics_summary_and_stopwatch():
+    """Зведення містить виклики, помилки та час збереження сховищ."""
+    metrics = Metrics()
+    metrics.record("help", 0.002)
+    metrics.record("help", 0.004)
+    metrics.record_error("help")
+    metrics.record_save("notes", 0.01)
+
+    summary = metrics.summary()
+    assert summary["commands"]["help"]["calls"] == 2
+    assert summary["commands"]["help"]["errors"] == 1
+    assert summary["saves"]["notes"]["calls"] == 1
+    assert "help" in metrics.report()
+
+    stopwatch = Stopwatch()
+    with stopwatch.paused():
+        sum(range(100_000))
+    assert stopwatch.elapsed() < stopwatch.waited
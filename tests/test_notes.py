@@ -374,12 +374,16 @@ def test_search_notes_by_tags_from_command_any_vs_all(empty_notes: Notes):
     empty_notes.add_note("N1", "C1", "tag1, tag2")
     empty_notes.add_note("N2", "C2", "tag2, tag3")
 
-    res_any = empty_notes.search_notes_by_tags_from_command(["tag1", "tag3"])
+    res_any = str(
+        empty_notes.search_notes_by_tags_from_command(["tag1", "tag3"])
+    )
     assert "Found" in res_any
     assert "N1" in res_any
     assert "N2" in res_any
 
-    res_all = empty_notes.search_notes_by_tags_from_command(["tag1", "tag3", "--all"])
+    res_all = str(empty_notes.search_notes_by_tags_from_command(
+        ["tag1", "tag3", "--all"]
+    ))
     assert "No notes found with specified tags" in res_all or "Found 0" in res_all
 
 
@@ -416,7 +420,7 @@ def test_search_notes_by_tag_found(empty_notes: Notes):
     """Пошук за одним тегом: знаходимо лише ті нотатки, що містять цей тег."""
     empty_notes.add_note("T1", "Body1", "tag1")
     empty_notes.add_note("T2", "Body2", "tag2")
-    res = empty_notes.search_notes_by_tag("tag1")
+    res = str(empty_notes.search_notes_by_tag("tag1"))
     assert "Found 1 note(s) with tag 'tag1':" in res
     assert "T1" in res
     assert "T2" not in res
@@ -424,7 +428,7 @@ def test_search_notes_by_tag_found(empty_notes: Notes):
 
 def test_search_notes_by_tag_not_found(empty_notes: Notes):
     """Якщо жодна нотатка не містить тег — повертається повідомлення про це."""
-    res = empty_notes.search_notes_by_tag("no_such_tag")
+    res = str(empty_notes.search_notes_by_tag("no_such_tag"))
     assert res == "No notes found with tag 'no_such_tag'"
 
 
@@ -437,18 +441,18 @@ def test_search_notes_by_tags_any_and_all(empty_notes: Notes):
     empty_notes.add_note("N1", "C1", "a, b")
     empty_notes.add_note("N2", "C2", "b, c")
 
-    res_any = empty_notes.search_notes_by_tags("a c", match_all=False)
+    res_any = str(empty_notes.search_notes_by_tags("a c", match_all=False))
     assert "Found" in res_any
     assert "N1" in res_any
     assert "N2" in res_any
 
-    res_all = empty_notes.search_notes_by_tags("a c", match_all=True)
+    res_all = str(empty_notes.search_notes_by_tags("a c", match_all=True))
     assert res_all == "No notes found with specified tags"
 
 
 def test_list_all_tags_no_tags(empty_notes: Notes):
     """Якщо жодної нотатки з тегами немає — повертається 'No tags found'."""
-    res = empty_notes.list_all_tags()
+    res = str(empty_notes.list_all_tags())
     assert res == "No tags found"
 
 
@@ -456,7 +460,7 @@ def test_list_all_tags_with_notes(empty_notes: Notes):
     """list_all_tags повертає список усіх тегів з кількістю використань."""
     empty_notes.add_note("N1", "C1", "tag1,tag2")
     empty_notes.add_note("N2", "C2", "tag2,tag3")
-    res = empty_notes.list_all_tags()
+    res = str(empty_notes.list_all_tags())
     assert "All tags:" in res
     assert "tag1" in res
     assert "tag2" in res
@@ -468,18 +472,18 @@ def test_sort_notes_by_tag_found_and_not_found(empty_notes: Notes):
     empty_notes.add_note("N1", "C1", "tag1")
     empty_notes.add_note("N2", "C2", "tag1,tag2")
 
-    res = empty_notes.sort_notes_by_tag("tag1")
+    res = str(empty_notes.sort_notes_by_tag("tag1"))
     assert "Notes with tag 'tag1'" in res
     assert "N1" in res
     assert "N2" in res
 
-    res_none = empty_notes.sort_notes_by_tag("unknown")
+    res_none = str(empty_notes.sort_notes_by_tag("unknown"))
     assert res_none == "No notes found with tag 'unknown'"
 
 
 def test_list_all_notes_empty(empty_notes: Notes):
     """Якщо нотаток немає — list_all_notes повертає 'No notes found'."""
-    res = empty_notes.list_all_notes()
+    res = str(empty_notes.list_all_notes())
     assert res == "No notes found"
 
 
@@ -487,7 +491,103 @@ def test_list_all_notes_with_notes(empty_notes: Notes):
     """list_all_notes повертає короткий список всіх нот з прев'ю контенту."""
     empty_notes.add_note("N1", "C1", "")
     empty_notes.add_note("N2", "C2", "tagX")
-    res = empty_notes.list_all_notes()
+    res = str(empty_notes.list_all_notes())
     assert "Your notes:" in res
     assert "N1" in res
     assert "N2" in res
+
+
+# ---------- ПОВНОТЕКСТОВИЙ ПОШУК ----------
+def test_search_notes_ranks_and_highlights(empty_notes: Notes):
+    """search_notes повертає збіги з підсвіченим фрагментом, кращі першими."""
+    empty_notes.add_note("Shop", "buy milk and bread", "")
+    empty_notes.add_note("Milk", "milk milk milk everywhere", "")
+    empty_notes.add_note("Other", "nothing relevant here", "")
+
+    res = str(empty_notes.search_notes("milk"))
+    assert "Found 2 note(s) matching 'milk'" in res
+    assert res.index("Milk") < res.index("Shop")
+    assert "[milk]" in res
+    assert "Other" not in res
+
+    assert str(empty_notes.search_notes("absent")) == (
+        "No notes found matching 'absent'"
+    )
+
+
+@pytest.fixture
+def sqlite_notes(tmp_storage) -> Notes:
+    """Notes на sqlite-бекенді у тимчасовій директорії."""
+    tmp_storage(NOTES_BACKEND="sqlite")
+    return Notes()
+
+
+def test_sqlite_notes_tags_titles_and_search(sqlite_notes: Notes):
+    """Sqlite-бекенд підтримує теги, пошук заголовку та FTS-пошук."""
+    sqlite_notes.add_note("Shopping", "Buy milk", "food, urgent")
+    sqlite_notes.add_note("Work", "Finish the report", "urgent")
+
+    assert "Content: Buy milk" in sqlite_notes.get_note("shopping")
+    res = str(sqlite_notes.search_notes_by_tags("food urgent", match_all=True))
+    assert "Shopping" in res and "Work" not in res
+    assert "urgent (2)" in str(sqlite_notes.list_all_tags())
+
+    sqlite_notes.edit_note("work", "Job", "Write the report", None)
+    sqlite_notes.remove_tags("Shopping", "food")
+    assert "Job" in str(sqlite_notes.search_notes("report"))
+    assert "[report]" in str(sqlite_notes.search_notes("report"))
+    assert "food" not in str(sqlite_notes.list_all_tags())
+
+    sqlite_notes.flush()
+
+    reloaded = Notes()
+    assert list(reloaded.notes) == ["Shopping", "Job"]
+    assert reloaded.notes["Shopping"]["tags"] == ["urgent"]
+
+
+# ---------- ІНДЕКС ТЕГІВ ----------
+def test_tag_index_follows_all_mutations(notes_with_one: Notes):
+    """Індекс тегів і лічильники оновлюються при кожній зміні нотаток."""
+    notes = notes_with_one
+    notes.add_note("Second", "Body", "Test, work")
+    notes.add_note("Third", "Body", "work")
+
+    assert [t for t, _ in notes.notes.with_tags({"test"})] == [
+        "First", "Second",
+    ]
+    assert notes.notes.tag_counts() == {
+        "test": 1, "demo": 1, "Test": 1, "work": 2,
+    }
+
+    notes.edit_note("second", "Renamed", None, "demo")
+    notes.add_tags("Third", "test")
+    notes.remove_tags("First", "test")
+    notes.delete_note("First")
+
+    assert [t for t, _ in notes.notes.with_tags({"test", "work"}, True)] == [
+        "Third",
+    ]
+    assert [t for t, _ in notes.notes.with_tags({"demo", "work"})] == [
+        "Third", "Renamed",
+    ]
+    assert notes.notes.tag_counts() == {"demo": 1, "work": 1, "test": 1}
+    assert "No notes found" in str(notes.search_notes_by_tag("missing"))
+
+
+# ---------- ІНДЕКС ЗАГОЛОВКІВ ----------
+def test_title_index_follows_renames_and_deletes(notes_with_one: Notes):
+    """Пошук без урахування регістру працює після перейменувань/видалень."""
+    notes = notes_with_one
+    assert notes._find_note_key("FIRST") == "First"
+
+    assert notes.edit_note("first", "Renamed") == "Note updated successfully"
+    assert notes._find_note_key("first") is None
+    assert notes._find_note_key("RENAMED") == "Renamed"
+
+    # перейменування лише зі зміною регістру не є конфліктом
+    assert notes.edit_note("renamed", "RENAMED") == "Note updated successfully"
+    assert list(notes.notes) == ["RENAMED"]
+
+    notes.delete_note("renamed")
+    assert notes._find_note_key("renamed") is None
+    assert notes.notes.titles.titles == {}
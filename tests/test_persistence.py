@@ -0,0 +1,108 @@
+import pickle
+import threading
+
+import pytest
+
+from persistence import Journal, WriteBehind, atomic_dump
+
+
+def test_atomic_dump_replaces_file_without_leftovers(tmp_path):
+    """atomic_dump перезаписує файл і не залишає тимчасових файлів."""
+    path = tmp_path / "data.pkl"
+    path.write_bytes(b"old")
+
+    atomic_dump({"a": 1}, str(path))
+
+    with open(path, "rb") as f:
+        assert pickle.load(f) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["data.pkl"]
+
+
+def test_journal_drops_torn_tail(tmp_path):
+    """Обірваний останній запис відкидається, нові пишуться після валідних."""
+    journal = Journal(str(tmp_path / "j"))
+    journal.append([("add", 1, {}), ("add", 2, {})])
+    with open(journal.path, "ab") as f:
+        f.write(pickle.dumps(("add", 3, {}))[:-3])
+
+    assert [r[1] for r in journal.replay()] == [1, 2]
+    journal.append([("delete", 1, None)])
+    assert [r[1] for r in journal.replay()] == [1, 2, 1]
+
+
+def test_journal_failed_append_leaves_no_partial_record(tmp_path, monkeypatch):
+    """
+    Запис, обірваний посередині (закінчилось місце на диску), відкочується,
+    тож повторний запис не губиться за обірваним.
+    """
+    import persistence
+
+    journal = Journal(str(tmp_path / "j"))
+    journal.append([("add", 1, {})])
+
+    def full_disk(path, mode, buffering=-1):
+        f = open(path, mode, buffering=buffering)
+
+        def write(data):
+            f.__class__.write(f, data[:len(data) // 2])
+            raise OSError(28, "No space left on device")
+        f.write = write
+        return f
+
+    monkeypatch.setattr(persistence, "open", full_disk, raising=False)
+    with pytest.raises(OSError):
+        journal.append([("add", 2, {}), ("add", 3, {})])
+    monkeypatch.undo()
+
+    journal.append([("add", 2, {}), ("add", 3, {})])
+    assert [r[1] for r in journal.replay()] == [1, 2, 3]
+
+
+def test_write_behind_coalesces_until_flush():
+    """Серія запитів на збереження дає один запис після flush()."""
+    writes = []
+    writer = WriteBehind(lambda: writes.append(1), delay=60)
+    for _ in range(100):
+        writer.schedule()
+    assert writes == []
+    assert writer.pending
+
+    writer.flush()
+    writer.flush()
+    assert writes == [1]
+
+
+def test_write_behind_writes_in_background():
+    """Після закінчення вікна запис виконується у фоновому потоці."""
+    done = threading.Event()
+    writer = WriteBehind(done.set, delay=0.01)
+    writer.schedule()
+    assert done.wait(2)
+
+
+def test_write_behind_zero_delay_is_synchronous():
+    """З нульовою затримкою запис відбувається одразу."""
+    writes = []
+    writer = WriteBehind(lambda: writes.append(1), delay=0)
+    writer.schedule()
+    assert writes == [1]
+
+
+def test_write_behind_keeps_changes_after_failed_write():
+    """Якщо запис впав, зміни лишаються незбереженими і flush повторює їх."""
+    attempts = []
+
+    def write():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+
+    writer = WriteBehind(write, delay=60)
+    writer.schedule()
+    with pytest.raises(OSError):
+        writer.flush()
+    assert writer.pending
+
+    writer.flush()
+    assert len(attempts) == 2
+    assert not writer.pending
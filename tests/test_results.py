@@ -0,0 +1,74 @@
+import json
+
+from config import DOB_FORMAT
+from results import ContactList, Message, TagList, render
+
+
+def test_contact_list_renderers(book_with_one_contact):
+    """Один і той самий список контактів як таблиця, JSON та CSV."""
+    book = book_with_one_contact
+    dob = book.storage[1].dob.strftime(DOB_FORMAT)
+
+    table = "".join(render(book.all_contacts(), "table"))
+    assert table.startswith("1\tIvan\t")
+
+    data = json.loads("".join(render(book.all_contacts(), "json")))
+    assert data == [{
+        "id": 1, "name": "Ivan", "phone": "+380501234567",
+        "email": "ivan@example.com", "dob": dob, "addr": "Kyiv",
+    }]
+
+    csv_text = "".join(render(book.all_contacts(), "csv"))
+    assert csv_text.split("\n") == [
+        "id,name,phone,email,dob,addr",
+        f"1,Ivan,+380501234567,ivan@example.com,{dob},Kyiv",
+    ]
+    assert book.last_id == 1
+
+
+def test_empty_listing_and_messages():
+    """Порожній список дає [] у JSON, а текстові відповіді — без кольорів."""
+    empty = ContactList([], empty="No contacts")
+    assert "".join(render(empty, "table")) == "No contacts"
+    assert "".join(render(ContactList([]), "json")) == "[]"
+
+    colored = "Did you mean \x1b[31mexit\x1b[0m?"
+    assert json.loads("".join(render(colored, "json"))) == {
+        "message": "Did you mean exit?"
+    }
+    assert "".join(render(Message("a, b"), "csv")) == 'message\n"a, b"'
+
+
+def test_render_is_lazy():
+    """Рядки беруться з джерела лише тоді, коли їх виводять."""
+    taken = []
+
+    def tags():
+        for i in range(1000):
+            taken.append(i)
+            yield f"tag{i}", i
+
+    chunks = render(TagList(tags(), header="All tags:\n"), "json")
+    assert next(chunks) == "["
+    assert json.loads(next(chunks).lstrip("\n")) == {"tag": "tag0", "count": 0}
+    assert taken == [0]
+
+
+def test_search_results_are_structured(empty_book, empty_notes):
+    """find_contact та search_notes у JSON/CSV дають оцінку й поля."""
+    from contactbook import Contact
+
+    empty_book.storage[1] = Contact(
+        name="Ivan", phone="+380501234567", email="a@example.com",
+        dob="2000.01.01", addr="Kyiv",
+    )
+    found = "".join(render(empty_book.find_contact("Ivna"), "json"))
+    found = json.loads(found)
+    assert found[0]["name"] == "Ivan" and found[0]["score"] > 60
+    assert empty_book.last_id == 1
+
+    empty_notes.add_note("Shop", "buy milk and bread", "")
+    csv_text = "".join(render(empty_notes.search_notes("milk"), "csv"))
+    header, row = csv_text.split("\n")
+    assert header == "title,snippet,score"
+    assert row.startswith("Shop,") and "[milk]" in row
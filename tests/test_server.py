@@ -0,0 +1,223 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from client import BotClient
+from commands import BotCommands
+from server import BotServer
+
+
+@pytest.fixture
+def shared_bot(tmp_storage) -> BotCommands:
+    """
+    BotCommands з реальними сховищами у тимчасовій директорії.
+    """
+    return BotCommands()
+
+
+ANSWERS = ["+380501234567", "{}@example.com", "2000.01.15", "Kyiv"]
+
+
+async def _request(reader, writer, line):
+    writer.write(json.dumps({"input": line}).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def test_sessions_share_stores_and_writer_saves(shared_bot, tmp_path):
+    """
+    Дві одночасні сесії працюють з одними контактами,
+    а фонове завдання запису зберігає зміни в журнал.
+    """
+    sock = str(tmp_path / "bot.sock")
+
+    async def scenario():
+        server = BotServer(shared_bot, delay=0)
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(server.serve(sock, started=started))
+        await started
+
+        a = await asyncio.open_unix_connection(sock)
+        b = await asyncio.open_unix_connection(sock)
+        # сесія A чекає на телефон, поки сесія B додає свій контакт
+        reply = await _request(*a, "add_contact Ivan")
+        assert reply == {"prompt": "Enter phone: "}
+        reply = await _request(*b, "add_contact Petro")
+        for answer in ANSWERS:
+            reply = await _request(*b, answer.format("petro"))
+        assert reply == {"output": "Contact added", "done": False}
+        for answer in ANSWERS:
+            reply = await _request(*a, answer.format("ivan"))
+        assert reply["output"] == "Contact added"
+
+        reply = await _request(*b, "get_contact Ivan")
+        assert "ivan@example.com" in reply["output"]
+        reply = await _request(*a, "exit")
+        assert reply == {"output": "Bye!", "done": True}
+        assert await a[0].readline() == b""
+
+        for _ in range(100):
+            if shared_bot.contactbook.journal.size():
+                break
+            await asyncio.sleep(0.01)
+        b[1].close()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert shared_bot.contactbook.journal.size() > 0
+    assert not (tmp_path / "bot.sock").exists()
+
+
+def test_client_answers_prompts(shared_bot, tmp_path):
+    """
+    BotClient відповідає на запити команди через переданий ask.
+    """
+    sock = str(tmp_path / "bot.sock")
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+    tasks = []
+
+    async def serve():
+        started = loop.create_future()
+        task = asyncio.create_task(
+            BotServer(shared_bot, delay=0).serve(sock, started=started)
+        )
+        tasks.append(task)
+        await started
+        ready.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    thread = threading.Thread(
+        target=lambda: loop.run_until_complete(serve()), daemon=True
+    )
+    thread.start()
+    assert ready.wait(5)
+
+    client = BotClient(sock)
+    answers = iter(a.format("ivan") for a in ANSWERS)
+    reply = client.run("add_contact Ivan", lambda prompt: next(answers))
+    assert reply == {"output": "Contact added", "done": False}
+    assert "Ivan" in client.run("all_contacts")["output"]
+    client.close()
+
+    loop.call_soon_threadsafe(tasks[0].cancel)
+    thread.join(5)
+    assert not thread.is_alive()
+    loop.close()
+
+
+def test_listing_render_error_keeps_session(shared_bot, tmp_path):
+    """Помилка виведення списку повертається як відповідь, сесія триває."""
+    from contactbook import Contact
+
+    sock = str(tmp_path / "bot.sock")
+    shared_bot.contactbook.storage[1] = Contact(name="Ivan")
+
+    async def scenario():
+        server = BotServer(shared_bot, delay=0)
+        started = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(server.serve(sock, started=started))
+        await started
+
+        a = await asyncio.open_unix_connection(sock)
+        reply = await _request(*a, "all_contacts")
+        assert reply["output"].startswith("Command failed")
+        reply = await _request(*a, "exit")
+        assert reply == {"output": "Bye!", "done": True}
+        a[1].close()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+
+def test_last_contact_is_per_session(shared_bot):
+    """
+    del_last_contact сесії A видаляє контакт, який показала A,
+    а не той, що останнім показала сесія B.
+    """
+    from main import execute
+
+    a, b = BotCommands(shared=shared_bot), BotCommands(shared=shared_bot)
+    for name in ("Ivan", "Petro"):
+        session = execute(a, f"add_contact {name}")
+        next(session)
+        for answer in ANSWERS[:-1]:
+            session.send(answer.format(name.lower()))
+        with pytest.raises(StopIteration):
+            session.send(ANSWERS[-1])
+
+    str(b.contactbook.get_contact("Ivan"))
+    assert (a.contactbook.last_id, b.contactbook.last_id) == (2, 1)
+
+    session = execute(a, "del_last_contact")
+    assert "Petro" in next(session)
+    with pytest.raises(StopIteration):
+        session.send("y")
+    assert list(shared_bot.contactbook.storage) == [1]
+
+
+def test_edit_of_contact_deleted_meanwhile_is_discarded(shared_bot):
+    """
+    Якщо сесія B видалила контакт, поки A редагувала його,
+    зміни A не повертають контакт у книгу.
+    """
+    from main import execute
+
+    a, b = BotCommands(shared=shared_bot), BotCommands(shared=shared_bot)
+    session = execute(a, "add_contact Ivan")
+    next(session)
+    for answer in ANSWERS[:-1]:
+        session.send(answer.format("ivan"))
+    with pytest.raises(StopIteration):
+        session.send(ANSWERS[-1])
+
+    editing = execute(a, "edit_contact_id 1")
+    next(editing)
+    deleting = execute(b, "del_contact_id 1")
+    next(deleting)
+    with pytest.raises(StopIteration):
+        deleting.send("y")
+
+    editing.send("+380671234567")
+    editing.send("")
+    editing.send("")
+    with pytest.raises(StopIteration) as done:
+        editing.send("")
+    assert "deleted" in done.value.value
+    assert 1 not in shared_bot.contactbook.storage
+
+
+def test_edit_is_applied_only_when_finished(shared_bot):
+    """
+    Поки сесія A відповідає на запити редагування, інші сесії бачать
+    контакт без змін; якщо A відключилась, контакт не змінюється.
+    """
+    from main import execute
+
+    a, b = BotCommands(shared=shared_bot), BotCommands(shared=shared_bot)
+    session = execute(a, "add_contact Ivan")
+    next(session)
+    for answer in ANSWERS[:-1]:
+        session.send(answer.format("ivan"))
+    with pytest.raises(StopIteration):
+        session.send(ANSWERS[-1])
+
+    editing = execute(a, "edit_contact_id 1")
+    next(editing)
+    editing.send("+380671234567")
+    editing.send("petro@example.com")
+    assert b.contactbook.storage[1].phone == "+380501234567"
+    assert b.contactbook.storage.search("email", "petro") == {}
+    editing.close()
+
+    contact = shared_bot.contactbook.storage[1]
+    assert (contact.phone, contact.email) == (
+        "+380501234567", "ivan@example.com"
+    )